@@ -6,34 +6,91 @@
 # Ver LICENSE para términos completos.
 
 
-from flask import Flask, render_template, request, redirect, url_for, jsonify, send_from_directory, flash, render_template_string, send_file
+from flask import Flask, Request, render_template, request, redirect, url_for, jsonify, flash, render_template_string, Response, stream_with_context
 import threading
 import os
 import json
 import subprocess
 from werkzeug.utils import secure_filename
-import tempfile
 import shutil
-from datetime import datetime, UTC
+from datetime import datetime
 import atexit
 import signal
 import time
-import random
 import logging
 from logging.handlers import RotatingFileHandler
 import math
 import base64, urllib.parse
+import hashlib
 from pathlib import Path
+from collections import OrderedDict
 from settings import (
     ROOT_DIR, APP_DIR, CONTENT_DIR, VIDEO_DIR, THUMB_DIR,
     METADATA_FILE, TAGS_FILE, CONFIG_FILE, CANALES_FILE, CANAL_ACTIVO_FILE,
     SPLASH_DIR, SPLASH_STATE_FILE, INTRO_PATH, CHROME_PROFILE, CHROME_CACHE, 
-    PLAYS_FILE, USER, UPLOAD_STATUS, TMP_DIR
+    PLAYS_FILE, USER, TMP_DIR, IPC_SOCKET, THUMB_WORKERS, TRANSCODE_WORKERS, STAGING_DIR,
+    SERVER_MODE, SERVER_HOST, SERVER_PORT, SERVER_THREADS, X_SENDFILE, LOOKAHEAD,
 )                       
+from modules.state_store import state_store
+from modules.repository import repo
+from modules.tag_index import tag_index
+from modules.scheduler import schedulers
+from modules.rotation import rotation
+from modules.event_bus import event_bus
+from modules.ipc import IpcServer
+from modules.media_indexer import MediaIndexer
+from modules.thumbnail_queue import (
+    ThumbnailQueue, THUMB_SIZES, extraer_thumbnail, derivar_thumbnail, rutas_derivados,
+)
+from modules.media_probe import probe, probe_cache
+from modules.jobs import JobQueue
+from modules.ingest import HashingFile, ResumableUploads, normalizar
+from modules.governor import governor
+from modules import conformance
+from modules.metrics import metrics
+from modules.server import serve, enviar, mtime_version, versionado, UN_ANIO, UN_MES
 
 log = logging.getLogger('werkzeug')
 log.setLevel(logging.ERROR)  # solo errores visibles
+
+
+class IngestRequest(Request):
+    # Los archivos de un multipart se escriben directo en staging (mismo fs
+    # que VIDEO_DIR) y se hashean mientras llegan: nada de /tmp + copia.
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return HashingFile(STAGING_DIR, filename)
+
+
 app = Flask(__name__)
+app.request_class = IngestRequest
+app.config["USE_X_SENDFILE"] = X_SENDFILE
+# thumbnails con ?v=<mtime>: se cachean "para siempre" y un thumbnail nuevo cambia la URL.
+# Las versiones se recuerdan por video, atadas al mtime del JPEG: en cada
+# render de /gestion se mira sólo el JPEG (uno regenerado por el importador
+# cambia la entrada); generar_thumbnail y borrar_thumbnails las olvidan. Se
+# recuerdan juegos completos o los de videos cuyos WebP ya fallaron
+# (_sin_derivados); uno a medio generar se vuelve a mirar.
+_thumb_versiones = {}   # vid -> {None: v_jpg, "sm": v, "md": v}
+
+def _versiones_thumb(vid):
+    jpg = THUMB_DIR / f"{vid}.jpg"
+    v_jpg = mtime_version(jpg)
+    versiones = _thumb_versiones.get(vid)
+    if versiones is None or versiones[None] != v_jpg:
+        versiones = {None: v_jpg}
+        versiones.update({size: mtime_version(p) for size, p in rutas_derivados(jpg).items()})
+        if v_jpg and (all(versiones.values()) or vid in _sin_derivados):
+            _thumb_versiones[vid] = versiones
+        else:
+            _thumb_versiones.pop(vid, None)
+    return versiones
+
+def thumb_url(vid, size=None):
+    versiones = _versiones_thumb(vid)
+    v = versiones.get(size) if size in THUMB_SIZES else None
+    return url_for("serve_thumbnail", filename=f"{vid}.jpg", size=size, v=v or versiones[None])
+
+app.jinja_env.globals["thumb_url"] = thumb_url
 
 # --- LOGGING ---------------------------------------------------------------
 LOG_PATH = str(TMP_DIR / "tvargenta.log") 
@@ -65,6 +122,7 @@ MENU_TRIGGER_PATH = str(TMP_DIR / "trigger_menu.json")
 MENU_STATE_PATH  = str(TMP_DIR / "menu_state.json")
 MENU_NAV_PATH    = str(TMP_DIR / "trigger_menu_nav.json")
 MENU_SELECT_PATH = str(TMP_DIR / "trigger_menu_select.json")
+VOLUMEN_TRIGGER_PATH = str(TMP_DIR / "trigger_volumen.json")
 
 INTRO_FLAG  = "/tmp/tvargenta_show_intro"
 LAUNCH_FLAG      = str(TMP_DIR / "tvargenta_kiosk_launched")
@@ -125,7 +183,7 @@ except Exception:
 try:
     _maybe = get_next_splash_path()
     if _maybe and os.path.isfile(_maybe):
-        INTRO_PATH = _maybe
+        INTRO_PATH = Path(_maybe)
 except Exception:
     pass
 
@@ -160,20 +218,26 @@ DEFAULT_CANALES = {
     }
 }
 
-shown_videos_por_canal = {}
-
-# --- Anti-bounce / cooldown ---
-last_next_call = {}   # canal_id -> timestamp del último /api/next_video servido
-NEXT_COOLDOWN = 3.0   # segundos de ventana anti-encadenados
-STICKY_WINDOW = 3.0   # segundos
-last_choice_per_canal = {}  # canal_id -> {"video_id": str, "ts": float}
-
-# --- De-dupe primer NEXT por canal ---
-pending_pick = {}  # canal_id -> {"video_id": str, "ts": float}
-PENDING_TTL = 12.0  # segundos; reusar el mismo pick dentro de este tiempo
+# --- Single-flight de /api/next_video ---
+# El player manda ?slot=<token> por cada "siguiente" que pide; un reintento
+# del mismo pedido reusa el token. Por canal, un lock serializa las
+# decisiones (incluido el calentador) y un caché slot -> respuesta devuelve
+# siempre el mismo pick para el mismo slot: sin ventanas de tiempo.
+SLOTS_POR_CANAL = 32
+_canal_locks = {}
+_canal_locks_lock = threading.Lock()
+_slots = {}   # canal_id -> OrderedDict(slot -> respuesta de /api/next_video)
+
+def _canal_lock(canal_id):
+    with _canal_locks_lock:
+        lock = _canal_locks.get(canal_id)
+        if lock is None:
+            lock = _canal_locks[canal_id] = threading.Lock()
+        return lock
 
 _last_trigger_mtime_served = 0.0  # para /api/should_reload (one-shot)
 _last_menu_mtime_served = 0.0
+_last_volumen_mtime_served = 0.0
 _last_nav_mtime_served = 0.0
 _last_sel_mtime_served = 0.0
 
@@ -190,15 +254,8 @@ if os.path.exists(TRIGGER_PATH):
         _last_trigger_mtime_served = 0.0
         
 def _write_json_atomic(path, data):
-    path = Path(path)  # acepta str o Path
-    path.parent.mkdir(parents=True, exist_ok=True)
-
-    tmp = path.with_suffix(path.suffix + ".tmp")  # p.ej. plays.json.tmp
-    with tmp.open("w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-        f.flush()
-        os.fsync(f.fileno())
-    os.replace(tmp, path)  # atómico en el mismo fs
+    # tmp + fsync + rename + fsync del directorio, serializado con el resto de los writes
+    state_store.write_now(path, data)
 
 def _ensure_json(path, data):
     path = Path(path)
@@ -227,7 +284,7 @@ def _bootstrap_config_from_tags_if_empty():
                 cfg["tags_incluidos"] = todos
                 if not cfg.get("tags_prioridad"):
                     cfg["tags_prioridad"] = todos[:]
-                _write_json_atomic(CONFIG_FILE, cfg)  # ATÓMICO
+                save_config(cfg)  # ATÓMICO
                 logger.info(f"[BOOT] Config inicial poblada con {len(todos)} tags desde tags.json")
     except Exception as e:
         logger.warning(f"[BOOT] No pude poblar configuracion desde tags.json: {e}")
@@ -339,104 +396,110 @@ def launch_kiosk_once():
 
 
    
+# Todo el estado pasa por el repositorio (JSON o SQLite, ver modules/repository.py)
+repo.start()
+atexit.register(state_store.flush)
+atexit.register(repo.close)  # atexit es LIFO: cierra el repo y después flushea
+
 # Función para cargar canales
 def load_canales():
-    if os.path.exists(CANALES_FILE):
-        with open(CANALES_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {}
+    return repo.canales()
 
 # Función para guardar canales
 def save_canales(data):
-    with open(CANALES_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    repo.save_canales(data)
 
 def load_config():
-    if os.path.exists(CONFIG_FILE):
-        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {"tags_prioridad": [], "tags_incluidos": []}
+    return repo.config()
+
+def save_config(data):
+    repo.save_config(data)
     
 # Ruta para ver y gestionar tags
 def load_tags():
-    with open(TAGS_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return repo.tags()
 
 def save_tags(tags_data):
-    with open(TAGS_FILE, "w", encoding="utf-8") as f:
-        json.dump(tags_data, f, indent=2, ensure_ascii=False)
+    repo.save_tags(tags_data)
 
 _bootstrap_config_from_tags_if_empty()
 
 def get_canal_activo():
-    if os.path.exists(CANAL_ACTIVO_FILE):
-        with open(CANAL_ACTIVO_FILE, "r", encoding="utf-8") as f:
-            return json.load(f).get("canal_id", "base")
-    return "base"
+    return repo.canal_activo()
 
 def set_canal_activo(canal_id):
-    with open(CANAL_ACTIVO_FILE, "w", encoding="utf-8") as f:
-        json.dump({"canal_id": canal_id}, f, indent=2, ensure_ascii=False)
+    repo.set_canal_activo(canal_id)
 
 
-def sanity_check_thumbnails(video_id=None):
-    targets = [video_id] if video_id else metadata.keys()
-
-    for vid in targets:
-        video_path = os.path.join(VIDEO_DIR, vid + ".mp4")
-        thumbnail_path = os.path.join(CONTENT_DIR, "thumbnails", vid + ".jpg")
-
-        if os.path.exists(video_path) and not os.path.exists(thumbnail_path):
-            try:
-                print(f"🖼 Generando thumbnail para: {vid}")
-                subprocess.run([
-                    "ffmpeg",
-                    "-ss", "00:00:02",
-                    "-i", video_path,
-                    "-frames:v", "1",
-                    "-q:v", "4",
-                    thumbnail_path
-                ], check=True)
-                print(f"✅ Thumbnail generado: {thumbnail_path}")
-            except Exception as e:
-                print(f"⚠️ No se pudo generar thumbnail para {vid}. Se usará el por defecto. Error: {e}")
+_sin_derivados = set()  # videos cuyo JPEG no se pudo derivar (no reintentar hasta reiniciar)
 
-def get_video_resolution(filepath):
-    try:
-        result = subprocess.run([
-            "ffprobe", "-v", "error",
-            "-select_streams", "v:0",
-            "-show_entries", "stream=width,height",
-            "-of", "default=noprint_wrappers=1:nokey=1",
-            filepath
-        ], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
-
-        width, height = map(int, result.stdout.strip().split("\n"))
-        return width, height
-    except Exception as e:
-        print(f"⚠️ Error al obtener resolución de {filepath}: {e}")
-        return None, None
+def _faltan_derivados(vid, thumbnail_path):
+    if vid in _sin_derivados:
+        return False
+    if not repo.metadata().get(vid, {}).get("thumb_ph"):
+        return True
+    return not all(os.path.exists(p) for p in rutas_derivados(thumbnail_path).values())
 
-def escribir_estado(status):
-    with open(UPLOAD_STATUS, "w", encoding="utf-8") as f:
-        f.write(status)
+def _guardar_placeholder(vid, placeholder):
+    info = repo.metadata().get(vid)
+    if placeholder and info is not None and info.get("thumb_ph") != placeholder:
+        repo.put_video(vid, {**info, "thumb_ph": placeholder})
 
-def eliminar_estado():
-    if UPLOAD_STATUS.exists(): UPLOAD_STATUS.unlink()
+def generar_thumbnail(vid, forzar=False):
+    video_path = os.path.join(VIDEO_DIR, vid + ".mp4")
+    thumbnail_path = os.path.join(CONTENT_DIR, "thumbnails", vid + ".jpg")
 
-def sincronizar_videos():
-    archivos_video = {
-        os.path.splitext(f)[0] for f in os.listdir(VIDEO_DIR)
-        if f.lower().endswith(('.mp4', '.webm', '.mov'))
-    }
-    entradas_metadata = set(metadata.keys())
+    if os.path.exists(video_path) and (forzar or not os.path.exists(thumbnail_path)):
+        try:
+            print(f"🖼 Generando thumbnail para: {vid}")
+            _guardar_placeholder(vid, extraer_thumbnail(video_path, thumbnail_path))
+            print(f"✅ Thumbnail generado: {thumbnail_path}")
+        except Exception as e:
+            print(f"⚠️ No se pudo generar thumbnail para {vid}. Se usará el por defecto. Error: {e}")
+            return False
+    elif os.path.exists(thumbnail_path) and _faltan_derivados(vid, thumbnail_path):
+        # thumbnails de antes de los WebP: se derivan del JPEG, sin decodificar el video
+        try:
+            _guardar_placeholder(vid, derivar_thumbnail(thumbnail_path))
+        except Exception as e:
+            _sin_derivados.add(vid)
+            print(f"⚠️ No se pudieron derivar los WebP de {vid}: {e}")
+    _thumb_versiones.pop(vid, None)
+    return True
+
+# ffmpeg de thumbnails en paralelo (THUMB_WORKERS), fuera de los requests
+thumbnail_queue = ThumbnailQueue(generar_thumbnail, workers=THUMB_WORKERS)
+
+def pedir_thumbnail(vid, forzar=False):
+    thumbnail_path = os.path.join(CONTENT_DIR, "thumbnails", vid + ".jpg")
+    if forzar or not os.path.exists(thumbnail_path) or _faltan_derivados(vid, thumbnail_path):
+        thumbnail_queue.enqueue(vid, forzar)
+
+def borrar_thumbnails(vid):
+    """Borra el JPEG y sus derivados WebP. True si había algo."""
+    thumbnail_path = os.path.join(CONTENT_DIR, "thumbnails", vid + ".jpg")
+    borrado = False
+    for path in (thumbnail_path, *rutas_derivados(thumbnail_path).values()):
+        if os.path.exists(path):
+            os.remove(path)
+            print(f"🧹 Thumbnail eliminado: {path}")
+            borrado = True
+    _thumb_versiones.pop(vid, None)
+    return borrado
 
-    videos_validos = {k: v for k, v in metadata.items() if k in archivos_video}
-    videos_fantasmas = {k: v for k, v in metadata.items() if k not in archivos_video}
-    videos_nuevos = sorted(archivos_video - entradas_metadata)
+def sanity_check_thumbnails(video_id=None):
+    # sólo encola: la generación la hacen los workers de thumbnail_queue
+    targets = [video_id] if video_id else list(load_metadata().keys())
 
-    return videos_validos, videos_fantasmas, videos_nuevos
+    for vid in targets:
+        pedir_thumbnail(vid)
 
+def get_video_resolution(filepath):
+    info = probe(filepath)
+    if not info or not info.get("width"):
+        print(f"⚠️ Error al obtener resolución de {filepath}")
+        return None, None
+    return info["width"], info["height"]
 
 def backup_tags():
     if os.path.exists(TAGS_FILE):
@@ -457,34 +520,19 @@ def clean_config_tags(tags_data, config_data):
     return config_data
 
 def get_video_duration(filepath):
-    try:
-        result = subprocess.run([
-            "ffprobe", "-v", "error",
-            "-show_entries", "format=duration",
-            "-of", "default=noprint_wrappers=1:nokey=1",
-            filepath
-        ], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
-        return float(result.stdout.strip())
-    except Exception as e:
-        print(f"⚠️ No se pudo obtener duración de {filepath}: {e}")
+    info = probe(filepath)
+    if not info:
+        print(f"⚠️ No se pudo obtener duración de {filepath}")
         return 0
+    return info["duration"]
 
 
-def ensure_durations():
-    updated = False
-    for video_id, info in metadata.items():
-        if "duracion" not in info:
-            filepath = os.path.join(VIDEO_DIR, f"{video_id}.mp4")
-            if os.path.exists(filepath):
-                dur = get_video_duration(filepath)
-                metadata[video_id]["duracion"] = dur
-                updated = True
-    if updated:
-        with open(METADATA_FILE, "w", encoding="utf-8") as f:
-            json.dump(metadata, f, indent=2, ensure_ascii=False)
-        print("🕒 Duraciones actualizadas en metadata")
-
-def get_total_recuerdos():
+# Descubrimiento de archivos, duraciones y thumbnails en segundo plano:
+# /tv y /gestion sólo leen media_indexer.estado() (ver modules/media_indexer.py)
+media_indexer = MediaIndexer(VIDEO_DIR, repo, get_video_duration, pedir_thumbnail)
+media_indexer.start()
+
+def get_total_recuerdos(metadata):
     total_sec = sum(v.get("duracion", 0) for v in metadata.values())
     horas = int(total_sec // 3600)
     minutos = int((total_sec % 3600) // 60)
@@ -503,8 +551,7 @@ def load_ui_prefs():
 def save_ui_prefs(prefs):
     cfg = load_config()
     cfg["show_channel_name"] = bool(prefs.get("show_channel_name", True))
-    with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-        json.dump(cfg, f, indent=2, ensure_ascii=False)
+    save_config(cfg)
         
 
 
@@ -522,45 +569,21 @@ def _read_json(path, default):
 
 
 def load_plays():
-    return _read_json(PLAYS_FILE, {})
-
-def save_plays(d):
-    _write_json_atomic(PLAYS_FILE, d)
+    # JSON: snapshot plays.json + journal plays.log; SQLite: tabla plays
+    return repo.plays()
 
 def bump_play(video_id):
-    d = load_plays()
-    item = d.get(video_id, {"plays": 0, "last_played": None})
-    item["plays"] = int(item.get("plays", 0)) + 1
-    item["last_played"] = datetime.now(UTC).isoformat()
-    d[video_id] = item
-    save_plays(d)
-    return item
+    return repo.record_play(video_id)
 
 def load_metadata():
-    return _read_json(METADATA_FILE, {})
-
-def _iso_to_ts(iso_str):
-    try:
-        return datetime.fromisoformat(iso_str.replace("Z","")).timestamp()
-    except Exception:
-        return 0.0
+    return repo.metadata()
 
-def score_for_video(video_id, metadata, plays_map):
-    md = metadata.get(video_id, {})
-    dur = float(md.get("duracion", 0.0))  # segundos
-    minutes = max(1, math.ceil(dur / 60.0))
+def save_metadata(data):
+    repo.save_metadata(data)
 
-    pinfo = plays_map.get(video_id, {"plays": 0, "last_played": None})
-    plays = int(pinfo.get("plays", 0))
-    last_ts = _iso_to_ts(pinfo.get("last_played")) if pinfo.get("last_played") else 0.0
-
-    plays_norm = plays / minutes
-    # jitter muy pequeño para no ser determinista total
-    jitter = random.random() * 0.01
-
-    # Orden principal: menor plays_norm primero (más justo),
-    # luego menos reciente (last_ts chico), luego jitter
-    return (plays_norm, last_ts, jitter)
+def load_tag_index():
+    # Reconstruye el índice sólo si la metadata cambió por fuera de la app
+    return tag_index.sync(load_metadata(), repo.generation())
 
 def _load_splash_state():
     """Lee /srv/tvargenta/Splash/splash_state.json -> {"index": int}"""
@@ -579,11 +602,7 @@ def _load_splash_state():
 def _save_splash_state(state: dict):
     """Escribe de forma atómica el estado de rotación."""
     try:
-        path = Path(SPLASH_STATE_FILE)
-        tmp = path.with_suffix(path.suffix + ".tmp")
-        with tmp.open("w", encoding="utf-8") as f:
-            json.dump(state, f, ensure_ascii=False, indent=2)
-        os.replace(tmp, path)
+        _write_json_atomic(SPLASH_STATE_FILE, state)
         logger.info(f"[SPLASH] state save -> {state}")
     except Exception as e:
         logger.error(f"[SPLASH] state save error: {e}")
@@ -619,18 +638,16 @@ def _touch_frontend_ping(stage: str = None):
 
 def _ctx_gestion():
     # Carga y saneos mínimos para que el dashboard esté al día
-    global metadata
     metadata = load_metadata()
-    ensure_durations()
-    sanity_check_thumbnails()
-    vids_ok, vids_fantasmas, vids_nuevos = sincronizar_videos()
+    vids_ok, vids_fantasmas, vids_nuevos = media_indexer.estado(metadata)
     return dict(
         videos=vids_ok,
         fantasmas=vids_fantasmas,
         nuevos=vids_nuevos,
+        escaneando=media_indexer.escaneando,
         tags=load_tags(),
         config=load_config(),
-        recuerdos=get_total_recuerdos()
+        recuerdos=get_total_recuerdos(metadata)
     )
 
 
@@ -652,6 +669,7 @@ def root():
 
 @app.route("/video/<video_id>")
 def video_detail(video_id):
+    metadata = load_metadata()
     video = metadata.get(video_id)
     if not video:
         return "Video no encontrado", 404
@@ -659,6 +677,7 @@ def video_detail(video_id):
 
 @app.route("/edit/<video_id>", methods=["GET", "POST"])
 def edit_video(video_id):
+    metadata = load_metadata()
     if request.method == "POST":
         form = request.form
         tags = form.get("tags", "")
@@ -669,8 +688,8 @@ def edit_video(video_id):
             "fecha": form.get("fecha"),
             "modo": form.getlist("modo")
         }
-        with open(METADATA_FILE, "w", encoding="utf-8") as f:
-            json.dump(metadata, f, indent=2, ensure_ascii=False)
+        repo.put_video(video_id, metadata[video_id])
+        load_tag_index().update_video(video_id, metadata[video_id]["tags"])
         return redirect(url_for("index"))
 
     # Cargar video y tags
@@ -698,54 +717,61 @@ def edit_video(video_id):
 
 @app.route("/api/videos")
 def api_videos():
-    return jsonify(metadata)
+    return jsonify(load_metadata())
 
 @app.route("/thumbnails/<filename>")
 def serve_thumbnail(filename):
-    return send_from_directory(os.path.join(CONTENT_DIR, "thumbnails"), filename)
+    # ?size=sm|md: derivado WebP de <vid>.jpg (si todavía no existe, el JPEG)
+    size = request.args.get("size")
+    if size in THUMB_SIZES and filename.endswith(".jpg"):
+        derivado = rutas_derivados(filename)[size]
+        if (THUMB_DIR / derivado).is_file():
+            filename = derivado
+    if versionado():
+        return enviar(THUMB_DIR, filename, max_age=UN_ANIO, inmutable=True)
+    return enviar(THUMB_DIR, filename, max_age=3600)
 
 @app.route("/videos/<filename>")
 def serve_video(filename):
-    return send_from_directory(os.path.join(CONTENT_DIR, "videos"), filename)
+    # sin max_age: un remux/conformidad reescribe el archivo con el mismo nombre
+    return enviar(VIDEO_DIR, filename)
 
 @app.route("/delete_full/<video_id>")
 def delete_full_video(video_id):
     video_path = os.path.join(VIDEO_DIR, video_id + ".mp4")
     if os.path.exists(video_path):
         os.remove(video_path)
+        probe_cache.forget(video_path)
         print(f"🧨 Video eliminado: {video_path}")
     else:
         print(f"⚠️ Video no encontrado para: {video_id}")
+    rotation.forget(video_id)   # aunque el archivo ya no estuviera
 
-    thumbnail_path = os.path.join(CONTENT_DIR, "thumbnails", video_id + ".jpg")
-    if os.path.exists(thumbnail_path):
-        os.remove(thumbnail_path)
-        print(f"🧹 Thumbnail eliminado: {thumbnail_path}")
+    borrar_thumbnails(video_id)
 
+    metadata = load_metadata()
     if video_id in metadata:
-        del metadata[video_id]
-        with open(METADATA_FILE, "w", encoding="utf-8") as f:
-            json.dump(metadata, f, indent=2, ensure_ascii=False)
+        repo.delete_video(video_id)
+        load_tag_index().remove_video(video_id)
         print(f"✅ Metadata eliminada: {video_id}")
 
+    media_indexer.request_scan()
     return redirect(url_for("index"))
 
 @app.route("/delete/<video_id>")
 def delete_video_metadata(video_id):
+    metadata = load_metadata()
     removed_any = False
     if video_id in metadata:
-        del metadata[video_id]
-        with open(METADATA_FILE, "w", encoding="utf-8") as f:
-            json.dump(metadata, f, indent=2, ensure_ascii=False)
+        repo.delete_video(video_id)
+        load_tag_index().remove_video(video_id)
+        rotation.forget(video_id)
         print(f"✅ Metadata eliminada para: {video_id}")
         removed_any = True
     else:
         print(f"ℹ️ No hay metadata para: {video_id}")
 
-    thumbnail_path = os.path.join(CONTENT_DIR, "thumbnails", video_id + ".jpg")
-    if os.path.exists(thumbnail_path):
-        os.remove(thumbnail_path)
-        print(f"🧹 Thumbnail eliminado: {thumbnail_path}")
+    if borrar_thumbnails(video_id):
         removed_any = True
     else:
         print(f"ℹ️ No se encontró thumbnail para: {video_id}")
@@ -765,61 +791,181 @@ def upload():
 
     print(f"📥 Archivos recibidos: {[f.filename for f in files]}")
 
+    job_ids, rechazados = [], []
     for file in files:
+        staging = file.stream
+        if not isinstance(staging, HashingFile):
+            # por si el form llegó sin pasar por IngestRequest
+            staging = HashingFile(STAGING_DIR, file.filename)
+            shutil.copyfileobj(file.stream, staging)
+        staging.close()
+
         if not file.filename.lower().endswith(".mp4"):
-            escribir_estado(f"❌ Archivo no permitido: {file.filename}")
+            rechazados.append(file.filename)
+            staging.discard()
             continue
 
-        escribir_estado("📥 Recibiendo archivo...")
-
         filename = secure_filename(file.filename)
-        video_id = os.path.splitext(filename)[0]
-        final_path = os.path.join(VIDEO_DIR, video_id + ".mp4")
+        job_ids.append(encolar_upload(filename, str(staging.path), staging.hexdigest()))
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as tmp:
-            temp_path = tmp.name
-            file.save(temp_path)
+    if request.accept_mimetypes.best == "application/json" or request.headers.get("X-Requested-With"):
+        return jsonify({"jobs": job_ids, "rechazados": rechazados}), 202
+    return redirect(url_for("index"))
 
-        print(f"🔄 Procesando: {filename}")
-        try:
-            escribir_estado("📐 Comprobando resolución...")
-            width, height = get_video_resolution(temp_path)
-            duracion = get_video_duration(temp_path)
-            metadata[video_id] = metadata.get(video_id, {})
-            metadata[video_id]["duracion"] = duracion
-            if width == 800 and height == 480:
-                shutil.copy(temp_path, final_path)
-                escribir_estado("✅ Video ya estaba en 800x480. Copiado directo")
-                print(f"✅ Video ya estaba en 800x480. Copiado directo: {final_path}")
-            else:
-                escribir_estado("✂️ Redimensionando video...")
-                subprocess.run([
-                    "ffmpeg", "-i", temp_path,
-                    "-vf", "scale=800:480:force_original_aspect_ratio=decrease,pad=800:480:(ow-iw)/2:(oh-ih)/2",
-                    "-c:a", "copy",
-                    "-y", final_path
-                ], check=True)
-                print(f"🎛 Video procesado con resize y crop: {final_path}")
-        except Exception as e:
-            escribir_estado(f"⚠️ Error al procesar {filename}")
-            print(f"⚠️ Error al procesar {filename}: {e}")
-        finally:
-            os.remove(temp_path)
 
-        escribir_estado("🖼 Generando thumbnail...")
-        sanity_check_thumbnails(video_id)
-        escribir_estado("✅ ¡Listo che! 🧉")
+def encolar_upload(filename, staging_path, sha256):
+    # el probe/remux/transcode/thumbnail corre en la cola, el request vuelve ya
+    video_id = os.path.splitext(filename)[0]
+    return upload_jobs.submit(
+        filename, lambda job: procesar_upload(job, video_id, staging_path, sha256)
+    )
 
-    eliminar_estado()
-    return redirect(url_for("index"))
 
-@app.route("/upload_status")
-def upload_status():
+def procesar_upload(job, video_id, staging_path, sha256=None):
+    """
+    Job de la cola de uploads. El archivo ya está en STAGING_DIR y
+    `normalizar` lo deja en VIDEO_DIR (rename atómico si ya estaba conforme,
+    remux faststart o resize/pad a 800x480; ver modules/ingest.py).
+    """
+    final_path = os.path.join(VIDEO_DIR, video_id + ".mp4")
+    print(f"🔄 Procesando: {video_id}")
+    progreso = lambda pct, fps, speed, eta: job.update(percent=pct, fps=fps, speed=speed, eta_s=eta)
+    try:
+        job.update(etapa="Comprobando resolución")
+        info = probe(staging_path, cache=False) or {}  # un solo ffprobe por archivo
+        duracion = info.get("duration", 0)
+        accion = normalizar(staging_path, final_path, info,
+                            on_etapa=lambda texto: job.update(etapa=texto, percent=0.0),
+                            on_progress=progreso)
+        print(f"✅ Video listo ({accion}): {final_path}")
+    finally:
+        if os.path.exists(staging_path):
+            os.remove(staging_path)
+
+    # los que se movieron/remuxaron pueden traer GOP largo: revisar y arreglar
+    job.update(etapa="Revisando arranque rápido", percent=None, eta_s=None)
+    conformidad = conformance.revisar(final_path, corregir=True, on_progress=progreso)
+
+    info_video = {**load_metadata().get(video_id, {}), "duracion": duracion}
+    if conformidad:
+        info_video["conformidad"] = conformidad
+    if sha256:
+        info_video["sha256"] = sha256
+    repo.put_video(video_id, info_video)
+    load_tag_index().update_video(video_id, info_video.get("tags", []))
+
+    job.update(etapa="Thumbnail en cola")
+    sanity_check_thumbnails(video_id)
+    media_indexer.request_scan()
+    return {"video_id": video_id}
+
+
+# --- Upload por partes, reanudable ------------------------------------------
+# POST /api/uploads {filename, size, last_modified} -> {upload_id, offset}
+# PUT  /api/uploads/<id> con Content-Range: bytes ini-fin/total -> {offset}
+# GET  /api/uploads/<id> -> {offset}: si se cortó, seguir desde ahí
+resumable_uploads = ResumableUploads(STAGING_DIR)
+UPLOAD_CHUNK = 8 * 1024 * 1024
+
+@app.route("/api/uploads", methods=["POST"])
+def api_uploads_create():
+    data = request.get_json(force=True)
+    filename = secure_filename(data.get("filename", ""))
+    size = int(data.get("size", 0))
+    if not filename.lower().endswith(".mp4") or size <= 0:
+        return jsonify({"error": f"Archivo no permitido: {data.get('filename')}"}), 400
+    upload_id, offset = resumable_uploads.create(filename, size, str(data.get("last_modified", "")))
+    return jsonify({"upload_id": upload_id, "offset": offset, "chunk": UPLOAD_CHUNK})
+
+@app.route("/api/uploads/<upload_id>", methods=["GET", "PUT"])
+def api_uploads_chunk(upload_id):
+    try:
+        estado = resumable_uploads.status(upload_id)
+    except ValueError:
+        estado = None
+    if estado is None:
+        return jsonify({"error": "Upload no encontrado"}), 404
+    if request.method == "GET":
+        return jsonify(estado)
+
+    rango = request.headers.get("Content-Range", "")   # bytes 0-8388607/2147483648
     try:
-        with open(UPLOAD_STATUS, "r", encoding="utf-8") as f:
-            return f.read()
-    except FileNotFoundError:
-        return "Sin actividad"
+        start = int(rango.split()[1].split("-")[0])
+    except (IndexError, ValueError):
+        return jsonify({"error": "Falta Content-Range"}), 400
+
+    offset, aceptado = resumable_uploads.append(upload_id, start, request.stream)
+    if not aceptado:
+        return jsonify({"offset": offset}), 409
+    if offset < estado["size"]:
+        return jsonify({"offset": offset})
+
+    completo = resumable_uploads.complete(upload_id)
+    if completo is None:
+        return jsonify({"error": "Tamaño final no coincide", "offset": offset}), 409
+    part_path, filename, sha256 = completo
+    return jsonify({"offset": offset, "job": encolar_upload(filename, str(part_path), sha256)}), 202
+
+
+# --- Conformidad de arranque rápido (faststart / keyframes) --------------
+def revisar_biblioteca(job, corregir=False):
+    """Job: revisa (y opcionalmente arregla) todos los videos de la biblioteca."""
+    metadata = load_metadata()
+    ids = [vid for vid in metadata if os.path.exists(os.path.join(VIDEO_DIR, vid + ".mp4"))]
+    lentos = arreglados = 0
+    for i, vid in enumerate(ids):
+        # baja prioridad: entre archivo y archivo, los uploads pasan primero
+        if upload_jobs.activos():
+            job.update(etapa="Esperando a que terminen los uploads")
+            upload_jobs.esperar_inactiva()
+        job.update(etapa=f"Revisando {vid}", percent=round(i / len(ids) * 100, 1))
+        estado = conformance.revisar(os.path.join(VIDEO_DIR, vid + ".mp4"), corregir=corregir)
+        if estado is None:
+            continue
+        lentos += estado["estado"] == "lento"
+        arreglados += bool(estado.get("arreglo"))
+        repo.put_video(vid, {**load_metadata().get(vid, {}), "conformidad": estado})
+    return {"revisados": len(ids), "lentos": lentos, "arreglados": arreglados}
+
+@app.route("/api/conformance", methods=["GET", "POST"])
+def api_conformance():
+    if request.method == "POST":
+        data = request.get_json(silent=True) or {}
+        corregir = bool(data.get("corregir", False))
+        job_id = library_jobs.submit("Revisión de arranque rápido",
+                                    lambda job: revisar_biblioteca(job, corregir))
+        return jsonify({"job": job_id}), 202
+    # GET: resumen de lo ya revisado
+    resumen = {"ok": 0, "lento": 0, "sin_revisar": 0, "lentos": []}
+    for vid, info in load_metadata().items():
+        estado = (info.get("conformidad") or {}).get("estado")
+        if estado is None:
+            resumen["sin_revisar"] += 1
+        else:
+            resumen[estado] = resumen.get(estado, 0) + 1
+            if estado == "lento":
+                resumen["lentos"].append({"video_id": vid, "motivos": info["conformidad"]["motivos"]})
+    return jsonify(resumen)
+
+
+# Uploads/transcodes en segundo plano; progreso por /api/jobs
+upload_jobs = JobQueue(workers=TRANSCODE_WORKERS)
+# Pasadas sobre toda la biblioteca: cola propia, así no tapan los uploads
+library_jobs = JobQueue(workers=1, prefijo="b")
+
+@app.route("/api/jobs")
+def api_jobs():
+    ids = request.args.get("ids")
+    ids = set(ids.split(",")) if ids else None
+    return jsonify({"jobs": upload_jobs.list(ids) + library_jobs.list(ids),
+                    "activos": upload_jobs.activos() + library_jobs.activos()})
+
+@app.route("/api/jobs/<job_id>")
+def api_job(job_id):
+    job = upload_jobs.get(job_id) or library_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job no encontrado"}), 404
+    return jsonify(job)
         
 @app.route("/tags")
 def tags():
@@ -847,20 +993,16 @@ def add_tag():
     save_tags(tags_data)
 
     # Agregar a configuracion.json si no existe
-    config_path = os.path.join(CONTENT_DIR, "configuracion.json")
-    if os.path.exists(config_path):
-        with open(config_path, "r", encoding="utf-8") as f:
-            config = json.load(f)
-    else:
-        config = {"tags_prioridad": [], "tags_incluidos": []}
+    config = load_config()
+    config.setdefault("tags_prioridad", [])
+    config.setdefault("tags_incluidos", [])
 
     if tag not in config["tags_prioridad"]:
         config["tags_prioridad"].append(tag)
     if tag not in config["tags_incluidos"]:
         config["tags_incluidos"].append(tag)
 
-    with open(config_path, "w", encoding="utf-8") as f:
-        json.dump(config, f, indent=2, ensure_ascii=False)
+    save_config(config)
 
     return redirect(url_for("tags", from_edit=return_to))
 
@@ -891,27 +1033,17 @@ def delete_tag():
     if group in tags_data and tag in tags_data[group]["tags"]:
         tags_data[group]["tags"].remove(tag)
 
-        # También eliminarlo de todos los metadata
-        for video in metadata.values():
-            if tag in video.get("tags", []):
-                video["tags"].remove(tag)
-
-        # Guardar ambos archivos
+        # También eliminarlo de todos los metadata y guardar ambos
         save_tags(tags_data)
-        with open(METADATA_FILE, "w", encoding="utf-8") as f:
-            json.dump(metadata, f, indent=2, ensure_ascii=False)
+        index = load_tag_index()
+        repo.remove_tags([tag])
+        index.remove_tags([tag])
 
         # Eliminar de configuracion.json también
-        config_path = os.path.join(CONTENT_DIR, "configuracion.json")
-        if os.path.exists(config_path):
-            with open(config_path, "r", encoding="utf-8") as f:
-                config = json.load(f)
-
-            config["tags_prioridad"] = [t for t in config.get("tags_prioridad", []) if t != tag]
-            config["tags_incluidos"] = [t for t in config.get("tags_incluidos", []) if t != tag]
-
-            with open(config_path, "w", encoding="utf-8") as f:
-                json.dump(config, f, indent=2, ensure_ascii=False)
+        config = load_config()
+        config["tags_prioridad"] = [t for t in config.get("tags_prioridad", []) if t != tag]
+        config["tags_incluidos"] = [t for t in config.get("tags_incluidos", []) if t != tag]
+        save_config(config)
 
     return redirect(url_for("tags", from_edit=return_to))
 
@@ -933,8 +1065,9 @@ def delete_group():
         tags_to_remove = tags_data[group]["tags"]
 
         # Eliminar del metadata
-        for video in metadata.values():
-            video["tags"] = [t for t in video.get("tags", []) if t not in tags_to_remove]
+        index = load_tag_index()
+        repo.remove_tags(tags_to_remove)
+        index.remove_tags(tags_to_remove)
 
         # Eliminar del tags.json
         del tags_data[group]
@@ -944,12 +1077,7 @@ def delete_group():
         config = load_config()
         config["tags_prioridad"] = [t for t in config.get("tags_prioridad", []) if t not in tags_to_remove]
         config["tags_incluidos"] = [t for t in config.get("tags_incluidos", []) if t not in tags_to_remove]
-        with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-            json.dump(config, f, indent=2, ensure_ascii=False)
-
-        # Guardar metadata
-        with open(METADATA_FILE, "w", encoding="utf-8") as f:
-            json.dump(metadata, f, indent=2, ensure_ascii=False)
+        save_config(config)
 
         print(f"🗑 Grupo eliminado: {group} (y sus tags)")
 
@@ -960,13 +1088,14 @@ def delete_group():
 def configuracion():
     tags_data = load_tags()
     config_data = load_config()
+    antes = (list(config_data.get("tags_prioridad", [])), list(config_data.get("tags_incluidos", [])))
 
     # 💡 Sanity check: remover tags que ya no existen
     config_data = clean_config_tags(tags_data, config_data)
 
     # Guardar si hubo algún cambio
-    with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-        json.dump(config_data, f, indent=2, ensure_ascii=False)
+    if antes != (config_data["tags_prioridad"], config_data["tags_incluidos"]):
+        save_config(config_data)
 
     return render_template("configuracion.html", tags=tags_data, config=config_data)
 
@@ -980,14 +1109,13 @@ def guardar_configuracion():
     # Solo mantener en prioridad los tags incluidos
     orden_final = [tag.strip() for tag in prioridad.split(",") if tag.strip() and tag.strip() in incluidos]
 
-    config = {
-        "tags_prioridad": orden_final,
-        "tags_incluidos": incluidos
-    }
+    # Conservar el resto de las claves (p.ej. show_channel_name)
+    config = dict(load_config())
+    config["tags_prioridad"] = orden_final
+    config["tags_incluidos"] = incluidos
 
     try:
-        with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-            json.dump(config, f, indent=2, ensure_ascii=False)
+        save_config(config)
         print("✅ Configuración guardada")
     except Exception as e:
         print(f"❌ Error al guardar configuración: {e}")
@@ -998,24 +1126,16 @@ def guardar_configuracion():
 def vertele():
     canales = load_canales()
 
-    canal_activo_path = str(CANAL_ACTIVO_FILE)
-    canal_activo = None
+    canal_activo = get_canal_activo()
 
-    if not os.path.exists(canal_activo_path):
+    if canal_activo not in canales:
         # Elegí un id real: primero el de DEFAULT_CANAL_ACTIVO si existe, si no, el primer canal disponible
         preferido = DEFAULT_CANAL_ACTIVO.get("canal_id", "1")
         if preferido not in canales:
             preferido = next(iter(canales.keys()), "1")
-        with open(canal_activo_path, "w", encoding="utf-8") as f:
-            json.dump({"canal_id": preferido}, f, ensure_ascii=False, indent=2)
+        if preferido != canal_activo:
+            set_canal_activo(preferido)  # persistí la migración
         canal_activo = preferido
-    else:
-        with open(canal_activo_path, "r", encoding="utf-8") as f:
-            activo_data = json.load(f)
-            canal_activo = activo_data.get("canal_id") or DEFAULT_CANAL_ACTIVO.get("canal_id", "1")
-            if canal_activo not in canales and canales:
-                canal_activo = next(iter(canales.keys()))
-                set_canal_activo(canal_activo)  # persistí la migración
 
     return render_template("vertele.html",
                            canales=canales,
@@ -1023,123 +1143,180 @@ def vertele():
 
 
 
-@app.route("/api/next_video")
-def api_next_video():
-    metadata = load_metadata()
-    canales = load_canales()
-
-    # 🧠 Canal activo + config
-    canal_id = "canal_base"
-    config = load_config()
-
-    canal_activo_path = str(CANAL_ACTIVO_FILE)
-    if os.path.exists(canal_activo_path):
-        with open(canal_activo_path, "r", encoding="utf-8") as f:
-            activo = json.load(f)
-            if activo.get("canal_id") in canales:
-                canal_id = activo["canal_id"]
-                config = canales[canal_id]
-    
-    # --- De-dupe: si hay pick pendiente “fresco”, reusalo ---
-    now = time.time()
-    pp = pending_pick.get(canal_id)
-    if pp and (now - pp.get("ts", 0.0)) < PENDING_TTL:
-        vid = pp["video_id"]
-        info = metadata.get(vid, {})
-        logger.info(f"[NEXT-DUPE] Reuso pick pendiente canal={canal_id} video={vid}")
-        return jsonify({
-            "video_id": vid,
-            "title": info.get("title", vid.replace("_", " ")),
-            "tags": info.get("tags", []),
-            "modo": canal_id,
-            "canal_nombre": canales[canal_id].get("nombre", canal_id),
-            "reused": True,
-            "do_not_restart": True   # <--- NUEVO: indicá al player que NO reinicie si ya es el actual
-        })
-
-    
-    # --- Sticky window: si otra llamada llega enseguida, devolvemos el mismo video ---
-    now = time.time()
-    sticky = last_choice_per_canal.get(canal_id)
-    if sticky and (now - sticky["ts"]) < STICKY_WINDOW:
-        elegido_id = sticky["video_id"]
-        elegido_data = metadata.get(elegido_id, {})
-        if elegido_data:
-            return jsonify({
-                "video_id": elegido_id,
-                "title": elegido_data.get("title", elegido_id.replace("_", " ")),
-                "tags": elegido_data.get("tags", []),
-                "score_tags": 0,             # no recalculamos, es pegajoso
-                "fair_plays_norm": 0.0,
-                "fair_last_ts": 0.0,
-                "modo": canal_id,
-                "canal_nombre": canales[canal_id].get("nombre", canal_id),
-                "sticky": True
-            })
-
-    # --- Cooldown por canal ---
-    now = time.time()
-    ultimo = last_next_call.get(canal_id, 0.0)
-    sticky = last_choice_per_canal.get(canal_id)
-    if (now - ultimo) < NEXT_COOLDOWN and sticky and (now - sticky["ts"]) >= STICKY_WINDOW:
-        logger.info(f"[NEXT] cooldown canal={canal_id} dt={now-ultimo:.2f}s -> bloqueo")
-        # Solo aplicamos cooldown si no estamos dentro de la ventana “pegajosa”
-        return jsonify({"cooldown": True, "canal_id": canal_id}), 200
+_canal_servido = None  # canal del último /api/next_video (para soltar su lookahead)
 
+def _scheduler_canal(canal_id, config, metadata):
+    """Scheduler del canal (se reconstruye sólo si cambió algo); None si no tiene tags."""
     prioridad = config.get("tags_prioridad", [])
     incluidos = set(config.get("tags_incluidos", prioridad))  # fallback
     if not incluidos:
-        return jsonify({"error": "No hay tags incluidos definidos en la configuración."}), 400
-
-    # <<< FIX: tomar los ya mostrados una sola vez, afuera del loop >>>
-    canal_shown = shown_videos_por_canal.get(canal_id, [])
+        return None
+    # --- Candidatos por tags (vista precalculada) e inéditos en el canal ---
+    view = load_tag_index().channel_view(canal_id, prioridad, incluidos)
+    # --- Fairness: plays normalizados + LRU + prioridad de tags + jitter (heap) ---
+    return schedulers.get(
+        canal_id, view, metadata, load_plays(),
+        (repo.generation(), rotation.epoch(canal_id)),   # nueva vuelta => rebuild
+        exclude=rotation.shown(canal_id),
+    )
 
-    # --- Candidatos por tags e inéditos en el canal ---
-    candidatos = []
-    for video_id, data in metadata.items():
-        if video_id in canal_shown:
-            continue
-        video_tags = set(data.get("tags", []))
-        if not (video_tags & incluidos):
+# --- Picks tibios para los canales vecinos ----------------------------------
+# Después de cada cambio de canal, un hilo deja armado el scheduler y los
+# reservados (lookahead) del canal activo y de sus vecinos en el orden de
+# canales.json: girar la perilla un paso devuelve un pick ya decidido.
+# Cada CALENTAR_CADA_S se repasa por si cambió el catálogo (get() no
+# reconstruye nada si no cambió).
+CALENTAR_CADA_S = 30.0
+_calentar_evento = threading.Event()
+
+def _vecinos(canal_id):
+    ids = list(load_canales().keys())
+    if canal_id not in ids:
+        return ids[:1]
+    i = ids.index(canal_id)
+    return list(dict.fromkeys([canal_id, ids[(i + 1) % len(ids)], ids[(i - 1) % len(ids)]]))
+
+def pedir_calentar():
+    _calentar_evento.set()
+
+def _calentador():
+    while True:
+        _calentar_evento.wait(CALENTAR_CADA_S)
+        _calentar_evento.clear()
+        try:
+            metadata = load_metadata()
+            canales = load_canales()
+            for canal_id in _vecinos(get_canal_activo()):
+                with _canal_lock(canal_id):
+                    sched = _scheduler_canal(canal_id, canales[canal_id], metadata)
+                    if sched is not None:
+                        sched.reservar(LOOKAHEAD)
+        except Exception as e:
+            logger.warning(f"[WARM] no pude calentar vecinos: {e}")
+
+threading.Thread(target=_calentador, name="warm-picks", daemon=True).start()
+pedir_calentar()
+
+# --- Traza de zapping: evento del encoder -> primer /api/played -------------
+# Cada etapa se mide desde t0 (el primer giro de la ráfaga, que manda el
+# encoder) y va a metrics como zap_<etapa>: flask, next_video, first_frame
+# (lo reporta el player) y played. Ver GET /api/metrics.
+ZAP_TRACE_MAX_S = 120.0   # un zap sin /api/played en este tiempo ya no se mide
+_zap = {}
+
+def _zap_inicio(canal_id, t0=None, origen="web"):
+    global _zap
+    ahora = time.time()
+    t0 = float(t0) if t0 else ahora
+    _zap = {"canal_id": canal_id, "t0": t0, "origen": origen, "video_id": None, "hechas": set()}
+    _zap_etapa("flask")
+    pedir_calentar()
+
+def _zap_servido(canal_id, video_id, tibio=False):
+    """Si hay un zap en curso a este canal: mide next_video y devuelve {"t0"} para el player."""
+    z = _zap
+    if not z or z["canal_id"] != canal_id or "next_video" in z["hechas"]:
+        return None
+    if _zap_etapa("next_video", video_id=video_id, tibio=tibio) is None:
+        return None
+    z["video_id"] = video_id
+    return {"t0": z["t0"]}
+
+def _zap_etapa(nombre, **etiquetas):
+    """Registra t0 -> ahora la primera vez que el zap en curso pasa por `nombre`."""
+    z = _zap
+    if not z or nombre in z["hechas"] or time.time() - z["t0"] > ZAP_TRACE_MAX_S:
+        return None
+    z["hechas"].add(nombre)
+    metrics.record(f"zap_{nombre}", (time.time() - z["t0"]) * 1000,
+                   canal=z["canal_id"], origen=z["origen"], **etiquetas)
+    return z
+
+def _proximos(video_ids, metadata):
+    """Picks reservados con URL y tamaño: el player precarga el primero."""
+    out = []
+    for vid in video_ids:
+        try:
+            size = os.path.getsize(os.path.join(VIDEO_DIR, vid + ".mp4"))
+        except OSError:
             continue
-        tag_score = sum((len(prioridad) - prioridad.index(tag)) for tag in video_tags if tag in prioridad)
-        candidatos.append((video_id, data, tag_score))
-
-    # 🔁 Si no quedan, limpiá “ya vistos” y reintentá
-    if not candidatos:
-        if canal_shown:
-            shown_videos_por_canal[canal_id] = []
-            return api_next_video()
-        else:
-            return jsonify({"no_videos": True, "canal_id": canal_id})
-
-    # --- Fairness: plays normalizados + LRU + prioridad de tags + jitter ---
-    plays_map = load_plays()
-
-    def sort_key(t):
-        video_id, data, tag_score = t
-        plays_norm, last_ts, jitter = score_for_video(video_id, metadata, plays_map)
-        # asc: menos plays_norm, menos reciente, mayor prioridad de tags, jitter
-        return (plays_norm, last_ts, -tag_score, jitter)
-
-    candidatos.sort(key=sort_key)
+        out.append({
+            "video_id": vid,
+            "title": metadata.get(vid, {}).get("title", vid.replace("_", " ")),
+            "url": url_for("serve_video", filename=vid + ".mp4"),
+            "bytes": size,
+        })
+    return out
 
-    elegido_id, elegido_data, tag_score = candidatos[0]
-    
-    pending_pick[canal_id] = {"video_id": elegido_id, "ts": time.time()}
-    
-    canal_shown.append(elegido_id)
-    shown_videos_por_canal[canal_id] = canal_shown
+@app.route("/api/next_video")
+def api_next_video():
+    global _canal_servido
+    canales = load_canales()
 
-    last_next_call[canal_id] = time.time()
+    # 🧠 Canal activo + config
+    canal_id = "canal_base"
+    config = load_config()
 
-    fair_plays_norm, fair_last_ts, _ = score_for_video(elegido_id, metadata, plays_map)
-    logger.info(f"[NEXT] canal={canal_id} elegido={elegido_id} tagscore={tag_score} plays_norm={fair_plays_norm:.3f}")
+    activo = get_canal_activo()
+    if activo in canales:
+        canal_id = activo
+        config = canales[canal_id]
+
+    # Cambio de canal: los reservados del anterior vuelven a su heap
+    with _canal_locks_lock:
+        anterior, _canal_servido = _canal_servido, canal_id
+    if anterior not in (None, canal_id):
+        schedulers.liberar(anterior)
+        pedir_calentar()   # por si el cambio no pasó por el IPC ni /api/set_canal_activo
+
+    slot = request.args.get("slot", "")[:64] or None
+    with _canal_lock(canal_id):
+        slots = _slots.setdefault(canal_id, OrderedDict())
+        if slot in slots:
+            # mismo pedido (reintento o disparo duplicado): mismo pick
+            logger.info(f"[NEXT] slot repetido canal={canal_id} slot={slot} -> {slots[slot]['video_id']}")
+            return jsonify({**slots[slot], "zap": None, "reused": True})
+
+        data, status = _elegir_siguiente(canal_id, config, canales)
+        if slot and "video_id" in data:
+            slots[slot] = data
+            while len(slots) > SLOTS_POR_CANAL:
+                slots.popitem(last=False)
+    return jsonify(data), status
+
+
+def _elegir_siguiente(canal_id, config, canales):
+    """Decide y consume el próximo pick del canal. Llamar con _canal_lock(canal_id)."""
+    metadata = load_metadata()
+    incluidos = set(config.get("tags_incluidos", config.get("tags_prioridad", [])))
+    if not incluidos:
+        return {"error": "No hay tags incluidos definidos en la configuración."}, 400
+
+    sched = _scheduler_canal(canal_id, config, metadata)
+    # después de _scheduler_canal: si reconstruyó, las reservas ya no están
+    tibio = bool(sched.reservados())   # pick ya decidido de antemano
+    pick = sched.peek()
+
+    # 🔁 Si no quedan, nueva vuelta (epoch) y reintentá una vez
+    if pick is None and len(rotation.shown(canal_id)):
+        rotation.new_epoch(canal_id)
+        sched = _scheduler_canal(canal_id, config, metadata)
+        pick = sched.peek()
+    if pick is None:
+        return {"no_videos": True, "canal_id": canal_id}, 200
+
+    elegido_id, (fair_plays_norm, fair_last_ts, neg_tag_score, _) = pick
+    elegido_data = metadata[elegido_id]
+    tag_score = -neg_tag_score
+    sched.take(elegido_id)
+    proximos = sched.reservar(LOOKAHEAD)
+
+    rotation.mark(canal_id, elegido_id)
+
+    logger.info(f"[NEXT] canal={canal_id} elegido={elegido_id} tagscore={tag_score} plays_norm={fair_plays_norm:.3f} tibio={tibio}")
     print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]}] [API] Reproduciendo video: {elegido_id} del canal {canal_id}")
-    
-    last_choice_per_canal[canal_id] = {"video_id": elegido_id, "ts": time.time()}
-    
-    return jsonify({
+
+    return {
         "video_id": elegido_id,
         "title": elegido_data.get("title", elegido_id.replace("_", " ")),
         "tags": elegido_data.get("tags", []),
@@ -1147,9 +1324,11 @@ def api_next_video():
         "fair_plays_norm": fair_plays_norm,
         "fair_last_ts": fair_last_ts,
         "modo": canal_id,
-        "canal_nombre": canales[canal_id].get("nombre", canal_id)
-    })
-
+        "canal_nombre": canales[canal_id].get("nombre", canal_id),
+        "url": url_for("serve_video", filename=elegido_id + ".mp4"),
+        "upcoming": _proximos(proximos, metadata),
+        "zap": _zap_servido(canal_id, elegido_id, tibio),
+    }, 200
 
 @app.route("/canales")
 def canales():
@@ -1199,6 +1378,7 @@ def eliminar_canal(canal_id):
     if canal_id in canales:
         del canales[canal_id]
         save_canales(canales)
+        rotation.drop_channel(canal_id)
     return redirect(url_for("canales"))
 
 @app.route("/editar_canal/<canal_id>")
@@ -1240,7 +1420,9 @@ def api_set_canal_activo():
     if canal_id != "base" and canal_id not in canales:
         return jsonify({"error": "Canal no válido"}), 404
 
-    set_canal_activo(canal_id)
+    if canal_id != get_canal_activo():
+        set_canal_activo(canal_id)
+        _zap_inicio(canal_id, origen="web")
     return jsonify({"ok": True, "canal_id": canal_id})
 
 @app.route("/api/canales")
@@ -1263,34 +1445,64 @@ def api_canales():
         "canal_activo_nombre": nombre_activo
     })
     
+# El player saca todo de /api/next_video: /tv es un shell con lo mínimo para
+# el badge del canal. Se cachea por ETag (contenido + mtime del template):
+# recargar el player sin cambios de canal es un 304 sin render.
+_tv_shell_cache = {}   # etag -> html
+
+def _tv_bootstrap():
+    canal_id = get_canal_activo()
+    canal = load_canales().get(canal_id, {})
+    return {
+        "canal_id": canal_id,
+        "canal_nombre": canal.get("nombre", canal_id),
+        **load_ui_prefs(),
+    }
+
 @app.route("/tv")
 def tv():
-    logger.info(_hdr("HIT /tv (render player)"))
-    global metadata
-
-    if os.path.exists(METADATA_FILE):
-        with open(METADATA_FILE, "r", encoding="utf-8") as f:
-            metadata = json.load(f)
-    else:
-        metadata = {}
-
-    # Tus funciones existentes
-    ensure_durations()
-    sanity_check_thumbnails()
-    videos_validos, videos_fantasmas, videos_nuevos = sincronizar_videos()
-
-    return render_template(
-        "player.html",   
-        videos=videos_validos,
-        fantasmas=videos_fantasmas,
-        nuevos=videos_nuevos,
-        recuerdos=get_total_recuerdos()
-    )
+    logger.info(_hdr("HIT /tv (shell)"))
+    with metrics.medir("tv_shell"):
+        bootstrap = _tv_bootstrap()
+        template_path = os.path.join(app.root_path, app.template_folder, "player.html")
+        clave = json.dumps(bootstrap, sort_keys=True) + str(mtime_version(template_path))
+        etag = hashlib.sha1(clave.encode("utf-8")).hexdigest()[:16]
+        html = _tv_shell_cache.get(etag)
+        if html is None:
+            html = render_template("player.html", bootstrap=bootstrap)
+            _tv_shell_cache.clear()   # uno por vez: el canal activo es uno solo
+            _tv_shell_cache[etag] = html
+        resp = Response(html, mimetype="text/html")
+        resp.set_etag(etag)
+        resp.headers["Cache-Control"] = "no-cache"
+        return resp.make_conditional(request)
+
+
+@app.route("/api/metrics", methods=["GET", "POST"])
+def api_metrics():
+    if request.method == "POST":
+        # el player reporta sus tiempos (p.ej. ttff: tiempo al primer frame)
+        data = request.get_json(silent=True, force=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({"ok": False, "error": "se espera un objeto JSON"}), 400
+        try:
+            etiquetas = {
+                k: v for k, v in data.items()
+                if k not in ("name", "ms", "t", "externa") and isinstance(v, (str, int, float, bool))
+                and not (isinstance(v, float) and not math.isfinite(v))
+            }
+            metrics.record(str(data.get("name")), float(data["ms"]), externa=True, **etiquetas)
+        except (KeyError, TypeError, ValueError) as e:
+            return jsonify({"ok": False, "error": str(e)}), 400
+        return jsonify({"ok": True})
+    return jsonify(metrics.resumen(request.args.get("name")))
 
     
 @app.route("/api/should_reload")
 def api_should_reload():
     global _last_trigger_mtime_served
+    if _ipc_one_shot("reload"):
+        return jsonify({"should_reload": True})
     if not os.path.exists(TRIGGER_PATH):
         return jsonify({"should_reload": False})
 
@@ -1304,29 +1516,237 @@ def api_should_reload():
     return jsonify({"should_reload": False})
 
 
+# --- Eventos push (SSE) ---------------------------------------------------
+# El encoder sigue escribiendo los triggers en /tmp; en vez de que el player
+# haga polling HTTP cada 120-300 ms, un solo hilo mira los mtimes acá adentro
+# y publica cada cambio en el bus de eventos que sirve /api/events.
+TRIGGER_POLL_S = 0.05
+
+def _read_trigger(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+def _trigger_watcher():
+    watched = {
+        TRIGGER_PATH: "reload",
+        VOLUMEN_TRIGGER_PATH: "volume",
+        MENU_TRIGGER_PATH: "menu",
+        MENU_NAV_PATH: "menu_nav",
+        MENU_SELECT_PATH: "menu_select",
+    }
+    vistos = {}
+    for path in watched:
+        try:
+            vistos[path] = os.stat(path).st_mtime_ns
+        except OSError:
+            vistos[path] = 0
+
+    while True:
+        for path, tipo in watched.items():
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if st.st_mtime_ns == vistos[path]:
+                continue
+            vistos[path] = st.st_mtime_ns
+            ts = st.st_mtime  # mismo "ts" que devuelven los endpoints one-shot
+            if tipo == "volume":
+                # encoder en modo archivos: ya escribió el valor nuevo en VOLUMEN_PATH
+                valor = int(_read_trigger(VOLUMEN_PATH).get("valor", 50))
+                with _live_lock:
+                    _live["volumen"] = valor
+                event_bus.publish(tipo, valor=valor, ts=ts)
+            elif tipo == "menu_nav":
+                event_bus.publish(tipo, delta=_read_trigger(path).get("delta", 0), ts=ts)
+            else:
+                event_bus.publish(tipo, ts=ts)
+        time.sleep(TRIGGER_POLL_S)
+
+
+# --- IPC con el encoder (Unix socket) ---------------------------------------
+# El encoder manda eventos tipados (volume, canal, menu, menu_nav, menu_select,
+# reload) y consulta el estado por IPC_SOCKET en vez de escribir/leer archivos
+# en /tmp. Flask es el dueño del estado vivo de menú / volumen / canal. Los
+# triggers por archivo siguen funcionando (TVARGENTA_IPC=files o sin socket).
+_live_lock = threading.Lock()
+_live = {
+    "menu_open": bool(_read_trigger(MENU_STATE_PATH).get("open", False)),
+    "volumen": int(_read_trigger(VOLUMEN_PATH).get("valor", 50)),
+}
+
+def _set_volumen(valor=None, delta=0):
+    with _live_lock:
+        base = _live["volumen"] if valor is None else int(valor)
+        valor = max(0, min(100, base + int(delta)))  # rango 0–100
+        _live["volumen"] = valor
+        try:
+            # el archivo queda para GET viejos y encoders en modo archivos
+            with open(VOLUMEN_PATH, "w") as f:
+                json.dump({"valor": valor}, f)
+        except OSError as e:
+            logger.warning(f"[IPC] no pude escribir {VOLUMEN_PATH}: {e}")
+    return valor
+
+def _set_menu_open(open_flag):
+    with _live_lock:
+        _live["menu_open"] = bool(open_flag)
+        try:
+            with open(MENU_STATE_PATH, "w") as f:
+                json.dump({"open": bool(open_flag), "ts": time.time()}, f)
+        except OSError as e:
+            logger.warning(f"[IPC] no pude escribir {MENU_STATE_PATH}: {e}")
+
+def _ipc_state():
+    with _live_lock:
+        state = dict(_live)
+    state["canal_id"] = get_canal_activo()
+    state["canales"] = list(load_canales().keys())
+    return state
+
+def _ipc_handler(msg):
+    op = msg.get("op")
+    if op == "query":
+        return {"ok": True, "state": _ipc_state()}
+    if op == "put_videos":
+        # lotes del importador masivo: así la metadata tiene un solo escritor
+        videos = msg.get("videos") or {}
+        actual = load_metadata()
+        videos = {vid: {**actual.get(vid, {}), **info} for vid, info in videos.items()}
+        repo.put_videos(videos)
+        state_store.flush()
+        # put_videos modifica la metadata en el lugar (no cambia la generación):
+        # como /upload, los videos nuevos entran al índice uno por uno
+        index = load_tag_index()
+        for vid, info in videos.items():
+            index.update_video(vid, info.get("tags", []))
+        media_indexer.request_scan()
+        logger.info(f"[IPC] importador: {len(videos)} video(s)")
+        return {"ok": True, "n": len(videos)}
+    if op == "governor":
+        # el importador (otro proceso) copia de acá si el player está reproduciendo
+        return {"ok": True, "playing": governor.playing}
+    if op != "event":
+        return {"ok": False, "error": f"op desconocida: {op}"}
+
+    tipo = msg.get("type")
+    ts = time.time()
+    if tipo == "volume":
+        valor = _set_volumen(delta=msg.get("delta", 0))
+        event_bus.publish("volume", valor=valor, ts=ts, src="ipc")
+        return {"ok": True, "valor": valor}
+
+    if tipo == "canal":
+        canales = list(load_canales().keys())
+        if not canales:
+            return {"ok": False, "error": "sin canales"}
+        canal_id = msg.get("canal_id")
+        if canal_id is None:
+            actual = get_canal_activo()
+            idx = canales.index(actual) if actual in canales else 0
+            canal_id = canales[(idx + int(msg.get("delta", 0))) % len(canales)]
+        elif canal_id != "base" and canal_id not in canales:
+            return {"ok": False, "error": f"canal no válido: {canal_id}"}
+        if canal_id != get_canal_activo():
+            set_canal_activo(canal_id)
+            _zap_inicio(canal_id, msg.get("t0"), origen="encoder")
+            event_bus.publish("reload", ts=ts, src="ipc", canal_id=canal_id)
+            logger.info(f"[IPC] canal -> {canal_id}")
+        return {"ok": True, "canal_id": canal_id}
+
+    if tipo == "menu_nav":
+        event_bus.publish("menu_nav", delta=int(msg.get("delta", 0)), ts=ts, src="ipc")
+        return {"ok": True}
+
+    if tipo in ("reload", "menu", "menu_select"):
+        event_bus.publish(tipo, ts=ts, src="ipc")
+        return {"ok": True}
+
+    return {"ok": False, "error": f"evento desconocido: {tipo}"}
+
+# Los endpoints one-shot de polling también tienen que ver los eventos que
+# llegaron por IPC (ahí no hay archivo con mtime). Se sirven una sola vez y
+# sólo si son recientes, para no disparar un menú viejo al caer el SSE.
+ONE_SHOT_MAX_AGE_S = 2.0
+_ipc_served = {}  # tipo -> último seq servido
+
+def _ipc_one_shot(tipo):
+    desde = _ipc_served.get(tipo, 0)
+    for ev in event_bus.since(desde):
+        if ev.type != tipo or ev.data.get("src") != "ipc":
+            continue
+        _ipc_served[tipo] = ev.seq
+        if time.time() - ev.ts <= ONE_SHOT_MAX_AGE_S:
+            return ev
+    return None
+
+threading.Thread(target=_trigger_watcher, name="trigger-watcher", daemon=True).start()
+
+ipc_server = IpcServer(IPC_SOCKET, _ipc_handler)
+try:
+    ipc_server.start()
+except OSError as e:
+    logger.error(f"[IPC] no pude abrir {IPC_SOCKET}: {e} (el encoder usará los triggers por archivo)")
+
+
+@app.route("/api/events")
+def api_events():
+    """
+    Stream SSE con reload / volume / menu / menu_nav / menu_select.
+    Al reconectar, EventSource manda Last-Event-ID y reenviamos lo que se perdió.
+    Los endpoints one-shot de más abajo quedan como fallback para polling.
+    """
+    last_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    cursor, completo = event_bus.resume_from(last_id)
+
+    def stream():
+        nonlocal cursor
+        yield "retry: 1000\n\n"
+        if not completo:
+            yield "event: resync\ndata: {}\n\n"
+        while True:
+            eventos = event_bus.wait(cursor, timeout=15.0)
+            if not eventos:
+                yield ": keepalive\n\n"
+                continue
+            for ev in eventos:
+                cursor = ev.seq
+                payload = json.dumps({**ev.data, "seq": ev.seq})
+                yield f"id: {event_bus.event_id(ev)}\nevent: {ev.type}\ndata: {payload}\n\n"
+
+    return Response(
+        stream_with_context(stream()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.route("/api/volumen", methods=["GET", "POST"])
 def api_volumen():
     if request.method == "POST":
         data = request.get_json()
-        nuevo_valor = max(0, min(100, data.get("valor", 50)))  # rango 0–100
-        with open(VOLUMEN_PATH, "w") as f:
-            json.dump({"valor": nuevo_valor}, f)
+        nuevo_valor = _set_volumen(valor=data.get("valor", 50))
         return jsonify({"ok": True, "valor": nuevo_valor})
 
     # método GET
-    if os.path.exists(VOLUMEN_PATH):
-        with open(VOLUMEN_PATH, "r") as f:
-            return jsonify(json.load(f))
-    else:
-        return jsonify({"valor": 50})
+    with _live_lock:
+        return jsonify({"valor": _live["volumen"]})
 
 @app.route("/api/volumen_ping")
 def api_volumen_ping():
-    path = "/tmp/trigger_volumen.json"
+    # one-shot: cada evento de volumen se sirve una sola vez
+    global _last_volumen_mtime_served
+    if _ipc_one_shot("volume"):
+        return jsonify({"ping": True})
+    path = VOLUMEN_TRIGGER_PATH
     if not os.path.exists(path):
         return jsonify({"ping": False})
     mtime = os.path.getmtime(path)
-    if time.time() - mtime < 1.0:
+    if mtime > _last_volumen_mtime_served and time.time() - mtime < 1.0:
+        _last_volumen_mtime_served = mtime
         return jsonify({"ping": True})
     return jsonify({"ping": False})
     
@@ -1339,7 +1759,10 @@ def api_menu_ping():
     al detectar flanco de bajada SIN giro previo.
     """
     global _last_menu_mtime_served
-    path = "/tmp/trigger_menu.json"
+    ev = _ipc_one_shot("menu")
+    if ev:
+        return jsonify({"ping": True, "ts": ev.data["ts"]})
+    path = MENU_TRIGGER_PATH
     if not os.path.exists(path):
         return jsonify({"ping": False})
 
@@ -1356,20 +1779,19 @@ def api_menu_ping():
 def api_menu_state():
     if request.method == "POST":
         data = request.get_json(force=True)
-        open_flag = bool(data.get("open", False))
-        with open(MENU_STATE_PATH, "w") as f:
-            json.dump({"open": open_flag, "ts": time.time()}, f)
+        _set_menu_open(data.get("open", False))
         return jsonify({"ok": True})
     # GET
-    if os.path.exists(MENU_STATE_PATH):
-        with open(MENU_STATE_PATH, "r") as f:
-            return jsonify(json.load(f))
-    return jsonify({"open": False})
+    with _live_lock:
+        return jsonify({"open": _live["menu_open"]})
     
 @app.route("/api/menu_nav")
 def api_menu_nav():
     """One-shot: devuelve delta (+1/-1) una sola vez por trigger"""
     global _last_nav_mtime_served
+    ev = _ipc_one_shot("menu_nav")
+    if ev:
+        return jsonify({"ping": True, "delta": ev.data["delta"], "ts": ev.data["ts"]})
     if not os.path.exists(MENU_NAV_PATH):
         return jsonify({"ping": False})
     mtime = os.path.getmtime(MENU_NAV_PATH)
@@ -1384,6 +1806,9 @@ def api_menu_nav():
 def api_menu_select():
     """One-shot: confirma selección actual"""
     global _last_sel_mtime_served
+    ev = _ipc_one_shot("menu_select")
+    if ev:
+        return jsonify({"ping": True, "ts": ev.data["ts"]})
     if not os.path.exists(MENU_SELECT_PATH):
         return jsonify({"ping": False})
     mtime = os.path.getmtime(MENU_SELECT_PATH)
@@ -1392,6 +1817,20 @@ def api_menu_select():
         return jsonify({"ping": True, "ts": mtime})
     return jsonify({"ping": False})
     
+@app.route("/api/thumbnails")
+def api_thumbnails():
+    # progreso de la cola de thumbnails (contadores + tiempos por job)
+    return jsonify(thumbnail_queue.progress())
+
+@app.route("/api/governor")
+def api_governor():
+    return jsonify(governor.stats())
+
+@app.route("/api/state_store")
+def api_state_store():
+    # writes reales vs pedidos por archivo en el último minuto
+    return jsonify(state_store.stats())
+
 @app.route("/api/ui_prefs", methods=["GET", "POST"])
 def api_ui_prefs():
     if request.method == "POST":
@@ -1406,29 +1845,19 @@ def api_played():
     data = request.get_json(force=True) or {}
     video_id = data.get("video_id")
 
-    try:
-        for cid, pp in list(pending_pick.items()):
-            if pp.get("video_id") == video_id:
-                pending_pick.pop(cid, None)
-                logger.info(f"[PLAYED] confirm canal={cid} video={video_id} -> limpio pending_pick")
-    except Exception as e:
-        logger.warning(f"[PLAYED] limpiar pending_pick: {e}")
-
     if not video_id:
         return jsonify({"ok": False, "error": "missing video_id"}), 400
 
-    d = load_plays()
-    item = d.get(video_id, {"plays": 0, "last_played": None})
-    item["plays"] = int(item.get("plays", 0)) + 1
-    item["last_played"] = datetime.now(UTC).isoformat()
-    d[video_id] = item
-    save_plays(d)
+    item = bump_play(video_id)
+    schedulers.record_play(video_id, load_metadata(), load_plays())
+    if _zap.get("video_id") == video_id:
+        _zap_etapa("played", video_id=video_id)
 
     return jsonify({"ok": True, "video_id": video_id, **item})
 
 @app.route("/splash_video/<path:filename>")
 def serve_splash_video(filename):
-    return send_from_directory(SPLASH_DIR, filename)
+    return enviar(SPLASH_DIR, filename, max_age=UN_MES)
 
 from pathlib import Path
 
@@ -1504,7 +1933,7 @@ def api_clear_intro():
 
 @app.route("/static-intro.mp4")
 def intro_video():
-    return send_file(INTRO_PATH, mimetype="video/mp4")
+    return enviar(INTRO_PATH.parent, INTRO_PATH.name, max_age=UN_MES)
 
 
 @app.route("/api/boot_probe", methods=["POST", "GET"])
@@ -1533,6 +1962,10 @@ def api_ping():
     # Heartbeat periódico desde splash/player
     stage = request.args.get("stage") or "unknown"
     _touch_frontend_ping(stage)
+    data = request.get_json(silent=True, force=True) or {}
+    if "playing" in data:
+        # el player reproduciendo => ffmpeg/ffprobe se achican (modules/governor.py)
+        governor.set_playing(bool(data["playing"]))
     # Devolvé algo ultra liviano para logs de Chromium si querés
     return jsonify(ok=True, stage=stage)
     
@@ -1570,6 +2003,12 @@ def api_power():
 
  
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="TVArgenta")
+    parser.add_argument("--server", choices=["prod", "dev"], default=SERVER_MODE,
+                        help="prod: waitress multihilo (si está instalado); dev: servidor de werkzeug")
+    args = parser.parse_args()
+
     encoder_path = str(Path(APP_DIR, "modules", "tvargenta_encoder.py"))
     
     # Asegurarse de que no quede flag viejo de kiosk
@@ -1642,4 +2081,4 @@ if __name__ == "__main__":
     
     threading.Thread(target=kiosk_watchdog, daemon=True).start()
 
-    app.run(debug=False, host="0.0.0.0")
+    serve(app, mode=args.server, host=SERVER_HOST, port=SERVER_PORT, threads=SERVER_THREADS)
@@ -0,0 +1,154 @@
+# SPDX-License-Identifier: LicenseRef-TVArgenta-NC-Attribution-Consult-First
+# Proyecto: TVArgenta — Retro TV
+# Autor: Ricardo Sappia contact:rsflightronics@gmail.com
+# © 2025 Ricardo Sappia. Todos los derechos reservados.
+# Licencia: No comercial, atribución y consulta previa. Se distribuye TAL CUAL, sin garantías.
+# Ver LICENSE para términos completos.
+
+"""
+Catálogo en memoria de los JSON de contenido.
+
+Cada archivo se parsea una sola vez y se vuelve a leer únicamente cuando
+cambia su firma en disco (mtime_ns, tamaño, inodo) o cuando la propia app
+lo guarda con `save()`. Los guardados van al state store (con debounce):
+mientras hay un write pendiente, el snapshot en memoria es la verdad.
+"""
+
+import copy
+import json
+import os
+import threading
+from pathlib import Path
+
+from modules.state_store import state_store
+from settings import (
+    METADATA_FILE, TAGS_FILE, CONFIG_FILE, CANALES_FILE, CANAL_ACTIVO_FILE,
+)
+
+
+def _stat_key(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+class _Snapshot:
+    __slots__ = ("path", "default", "stamp", "data", "generation", "dirty")
+
+    def __init__(self, path, default):
+        self.path = Path(path)
+        self.default = default
+        self.stamp = False      # False = nunca leído (None = archivo ausente)
+        self.data = None
+        self.generation = 0
+        self.dirty = False      # hay un write agendado que todavía no llegó a disco
+
+
+class Catalog:
+    """
+    Snapshots parseados de los JSON de estado, compartidos por todo el proceso.
+
+    `get()` devuelve el objeto cacheado (no una copia): quien lo modifica en el
+    lugar tiene que llamar a `save()` para persistirlo.
+    `generation()` cambia cada vez que el objeto cacheado se reemplaza por uno
+    nuevo (relectura de disco o `save()` con otro objeto), así los índices
+    derivados saben cuándo reconstruirse.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._snaps = {}
+
+    def register(self, name, path, default):
+        with self._lock:
+            self._snaps[name] = _Snapshot(path, default)
+
+    def path(self, name):
+        return self._snaps[name].path
+
+    def get(self, name):
+        snap = self._snaps[name]
+        if snap.dirty:
+            return snap.data
+        stamp = _stat_key(snap.path)
+        if stamp == snap.stamp:
+            return snap.data
+        with self._lock:
+            if snap.dirty:
+                return snap.data
+            stamp = _stat_key(snap.path)
+            if stamp != snap.stamp:
+                snap.data = self._read(snap) if stamp else copy.deepcopy(snap.default)
+                snap.stamp = stamp
+                snap.generation += 1
+            return snap.data
+
+    def save(self, name, data):
+        snap = self._snaps[name]
+        with self._lock:
+            if data is not snap.data:
+                snap.generation += 1
+            snap.data = data
+            snap.dirty = True
+        # se serializa una vez por write real (coalescido), no en cada save():
+        # guardar N videos seguidos no son N dumps de toda la biblioteca
+        state_store.write(snap.path, lambda: self._foto(data),
+                          on_written=lambda: self._written(snap, data),
+                          on_failed=lambda: self._failed(snap, data))
+
+    @property
+    def lock(self):
+        """Para modificar un snapshot en el lugar sin cruzarse con _foto()."""
+        return self._lock
+
+    def _foto(self, data):
+        with self._lock:
+            for intento in range(3):
+                try:
+                    return json.dumps(data, ensure_ascii=False, indent=2)
+                except RuntimeError:
+                    # alguien lo modificó sin el lock mientras lo recorríamos
+                    if intento == 2:
+                        raise
+
+    def _written(self, snap, data):
+        with self._lock:
+            if snap.data is data and not state_store.is_pending(snap.path):
+                snap.stamp = _stat_key(snap.path)
+                snap.dirty = False
+
+    def _failed(self, snap, data):
+        # no llegó a disco: el archivo vuelve a mandar (se relee en el próximo get)
+        with self._lock:
+            if snap.data is data and not state_store.is_pending(snap.path):
+                snap.stamp = False
+                snap.dirty = False
+
+    def generation(self, name):
+        self.get(name)
+        return self._snaps[name].generation
+
+    def invalidate(self, name=None):
+        with self._lock:
+            for key, snap in self._snaps.items():
+                if (name is None or key == name) and not snap.dirty:
+                    snap.stamp = False
+
+    @staticmethod
+    def _read(snap):
+        try:
+            with snap.path.open("r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            # si está corrupto, devolvé default
+            return copy.deepcopy(snap.default)
+
+
+catalog = Catalog()
+catalog.register("metadata",     METADATA_FILE,     {})
+catalog.register("tags",         TAGS_FILE,         {})
+catalog.register("config",       CONFIG_FILE,       {"tags_prioridad": [], "tags_incluidos": []})
+catalog.register("canales",      CANALES_FILE,      {})
+catalog.register("canal_activo", CANAL_ACTIVO_FILE, {})
@@ -0,0 +1,103 @@
+# SPDX-License-Identifier: LicenseRef-TVArgenta-NC-Attribution-Consult-First
+# Proyecto: TVArgenta — Retro TV
+# Autor: Ricardo Sappia contact:rsflightronics@gmail.com
+# © 2025 Ricardo Sappia. Todos los derechos reservados.
+# Licencia: No comercial, atribución y consulta previa. Se distribuye TAL CUAL, sin garantías.
+# Ver LICENSE para términos completos.
+
+"""
+Conformidad de arranque rápido: faststart + keyframes frecuentes.
+
+Un MP4 con el moov al final obliga al browser a pedir el final del archivo
+antes de mostrar nada; un GOP largo demora el primer frame. Acá se detectan
+las dos cosas con el probe (cacheado) y se arreglan:
+  - sin faststart y GOP razonable -> remux sin recodificar (-c copy +faststart)
+  - GOP largo -> recodificar video con un keyframe cada KEYFRAME_EVERY_S
+El resultado se guarda en metadata["conformidad"] para mostrarlo en /gestion.
+"""
+
+import logging
+import os
+from datetime import datetime, UTC
+
+from modules.jobs import run_ffmpeg
+from modules.media_probe import probe_cache
+
+logger = logging.getLogger("tvargenta")
+
+GOP_MAX_S = 4.0          # más que esto entre keyframes = arranque lento
+KEYFRAME_EVERY_S = 2     # al recodificar
+
+
+def evaluar(info, gop):
+    """Estado de un archivo a partir del probe y la mayor distancia entre keyframes."""
+    faststart = info.get("faststart")
+    gop_largo = gop is not None and gop > GOP_MAX_S
+    motivos = []
+    if faststart is False:
+        motivos.append("moov al final")
+    if gop_largo:
+        motivos.append(f"keyframes cada {gop:.0f}s")
+    # recodificar ya deja el moov adelante: el remux sólo si alcanza con eso
+    accion = "reencode" if gop_largo else "remux" if faststart is False else None
+    return {
+        "estado": "lento" if motivos else "ok",
+        "motivos": motivos,
+        "faststart": faststart,
+        "gop_max": gop,
+        "accion": accion,
+        "revisado": datetime.now(UTC).isoformat(),
+    }
+
+
+def arreglar(path, accion, duracion=None, on_progress=None):
+    """Remux o recodificación in situ: escribe al lado y renombra (atómico)."""
+    path = str(path)
+    # staging: mismo fs (rename atómico) y fuera de la vista del indexador
+    staging = os.path.join(os.path.dirname(path), ".staging")
+    os.makedirs(staging, exist_ok=True)
+    salida = os.path.join(staging, f"{os.path.basename(path)}.conform.mp4")
+    if accion == "remux":
+        args = ["-i", path, "-map", "0", "-c", "copy", "-movflags", "+faststart"]
+    elif accion == "reencode":
+        args = [
+            "-i", path, "-map", "0:v:0", "-map", "0:a?",
+            "-c:v", "libx264", "-preset", "veryfast", "-crf", "23",
+            "-force_key_frames", f"expr:gte(t,n_forced*{KEYFRAME_EVERY_S})",
+            "-c:a", "copy", "-movflags", "+faststart",
+        ]
+    else:
+        return False
+    try:
+        run_ffmpeg(args, salida, duration=duracion, on_progress=on_progress)
+        os.replace(salida, path)
+    finally:
+        if os.path.exists(salida):
+            os.remove(salida)
+    return True
+
+
+def revisar(path, corregir=False, on_progress=None):
+    """
+    Evalúa (y si corregir=True, arregla) un archivo. Devuelve el dict que va
+    a metadata["conformidad"], o None si no se pudo probar. Si el arreglo
+    falla, el estado sin arreglar lleva "error" (no lanza: el video ya está
+    en la biblioteca y tiene que quedar registrado).
+    """
+    info = probe_cache.probe(path)
+    if info is None:
+        return None
+    estado = evaluar(info, probe_cache.keyframe_gap(path))
+    if corregir and estado["accion"]:
+        accion = estado["accion"]
+        try:
+            arreglar(path, accion, info.get("duration"), on_progress)
+        except Exception as e:
+            # el archivo sigue intacto y reproducible (lento): se registra igual
+            logger.warning(f"[CONFORM] no pude aplicar {accion} a {path}: {e}")
+            estado["error"] = f"{accion} falló: {e}"[:300]
+            return estado
+        info = probe_cache.probe(path) or info
+        estado = evaluar(info, probe_cache.keyframe_gap(path))
+        estado["arreglo"] = accion
+    return estado
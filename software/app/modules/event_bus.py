@@ -0,0 +1,74 @@
+# SPDX-License-Identifier: LicenseRef-TVArgenta-NC-Attribution-Consult-First
+# Proyecto: TVArgenta — Retro TV
+# Autor: Ricardo Sappia contact:rsflightronics@gmail.com
+# © 2025 Ricardo Sappia. Todos los derechos reservados.
+# Licencia: No comercial, atribución y consulta previa. Se distribuye TAL CUAL, sin garantías.
+# Ver LICENSE para términos completos.
+
+"""
+Bus de eventos en memoria para /api/events (Server-Sent Events).
+
+Cada evento lleva un número de secuencia. Se guardan los últimos N en un
+buffer circular para reenviarlos cuando el player se reconecta con
+Last-Event-ID. El id incluye un boot id: si Flask se reinició, los ids viejos
+no valen y el cliente arranca desde el presente.
+"""
+
+import threading
+import time
+import uuid
+from collections import deque, namedtuple
+
+Event = namedtuple("Event", "seq type data ts")
+
+
+class EventBus:
+    def __init__(self, maxlen=256):
+        self.boot_id = uuid.uuid4().hex[:8]
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._log = deque(maxlen=maxlen)
+
+    @property
+    def last_seq(self):
+        return self._seq
+
+    def publish(self, type_, **data):
+        with self._cond:
+            self._seq += 1
+            ev = Event(self._seq, type_, data, time.time())
+            self._log.append(ev)
+            self._cond.notify_all()
+            return ev
+
+    def event_id(self, ev):
+        return f"{self.boot_id}:{ev.seq}"
+
+    def resume_from(self, last_event_id):
+        """
+        Traduce un Last-Event-ID a una secuencia desde donde reenviar.
+        Devuelve (seq, completo): completo=False si se perdieron eventos.
+        """
+        if not last_event_id:
+            return self._seq, True
+        boot, _, seq = str(last_event_id).partition(":")
+        if boot != self.boot_id or not seq.isdigit():
+            return self._seq, True   # otro proceso: no hay nada que reenviar
+        seq = int(seq)
+        with self._cond:
+            oldest = self._log[0].seq if self._log else self._seq + 1
+            return seq, seq + 1 >= oldest or seq >= self._seq
+
+    def since(self, seq):
+        with self._cond:
+            return [ev for ev in self._log if ev.seq > seq]
+
+    def wait(self, seq, timeout):
+        """Bloquea hasta que haya eventos posteriores a `seq` (o timeout)."""
+        with self._cond:
+            if self._seq <= seq:
+                self._cond.wait(timeout)
+            return [ev for ev in self._log if ev.seq > seq]
+
+
+event_bus = EventBus()
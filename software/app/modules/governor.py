@@ -0,0 +1,204 @@
+# SPDX-License-Identifier: LicenseRef-TVArgenta-NC-Attribution-Consult-First
+# Proyecto: TVArgenta — Retro TV
+# Autor: Ricardo Sappia contact:rsflightronics@gmail.com
+# © 2025 Ricardo Sappia. Todos los derechos reservados.
+# Licencia: No comercial, atribución y consulta previa. Se distribuye TAL CUAL, sin garantías.
+# Ver LICENSE para términos completos.
+
+"""
+Gobernador de recursos para los subprocesos de medios (ffmpeg / ffprobe).
+
+La Pi que transcodifica es la misma que decodifica video en Chromium, así
+que todo ffmpeg/ffprobe arranca:
+  - con nice (MEDIA_NICE) e ionice clase idle, vía `nice`/`ionice` (exec, el
+    PID sigue siendo el de ffmpeg),
+  - opcionalmente fijado a MEDIA_CPUS con `taskset` (lejos del core del browser),
+  - con `-threads` acotado (FFMPEG_THREADS),
+  - y pidiendo un lugar en un límite global de concurrencia (MEDIA_MAX_JOBS).
+
+El player reporta si está reproduciendo (heartbeat de /api/ping). Mientras
+reproduce, según MEDIA_WHILE_PLAYING:
+  - "throttle" (default): un solo proceso a la vez, 1 thread y nice 19,
+  - "pause": los procesos en curso se frenan con SIGSTOP y se reanudan
+    con SIGCONT cuando el player queda quieto (ojo: en un kiosk que siempre
+    reproduce, los jobs sólo avanzan en los cortes),
+  - "ignore": no cambia nada.
+Si el player deja de mandar heartbeat, se considera quieto.
+"""
+
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+from settings import (
+    MEDIA_MAX_JOBS, FFMPEG_THREADS, MEDIA_NICE, MEDIA_CPUS, MEDIA_WHILE_PLAYING,
+)
+
+logger = logging.getLogger("tvargenta")
+
+PLAYING_TTL_S = 20.0   # sin heartbeat del player por más de esto => quieto
+NICE_PLAYING = 19
+
+
+def parse_cpus(spec):
+    """Lista de CPUs en formato taskset ('1-3', '1,2,3') o None si vacío."""
+    spec = (spec or "").strip()
+    return spec or None
+
+
+class Governor:
+    def __init__(self, max_jobs=1, threads=2, nice=10, ionice_idle=True,
+                 cpus=None, while_playing="throttle"):
+        self.max_jobs = max(1, int(max_jobs))
+        self.threads = max(1, int(threads))
+        self.nice = int(nice)
+        self.ionice_idle = ionice_idle and shutil.which("ionice") is not None
+        self.cpus = parse_cpus(cpus) if shutil.which("taskset") else None
+        self.while_playing = while_playing
+        self._cond = threading.Condition()
+        self._activos = 0
+        self._procs = set()
+        self._playing_until = 0.0
+        self._pausados = False
+        self._frenados = False
+        self._thread = None
+
+    # --- Estado del player ----------------------------------------------------
+    def set_playing(self, playing):
+        with self._cond:
+            self._playing_until = time.monotonic() + PLAYING_TTL_S if playing else 0.0
+            self._cond.notify_all()
+        self._reconcile()
+        self._ensure_thread()
+
+    @property
+    def playing(self):
+        return time.monotonic() < self._playing_until
+
+    def _limite(self):
+        if not self.playing or self.while_playing == "ignore":
+            return self.max_jobs
+        if self.while_playing == "pause":
+            return 0
+        return 1
+
+    def stats(self):
+        with self._cond:
+            return {
+                "playing": self.playing, "modo": self.while_playing,
+                "activos": self._activos, "limite": self._limite(),
+                "pausados": self._pausados, "max_jobs": self.max_jobs,
+                "threads": self.ffmpeg_threads(), "cpus": self.cpus,
+            }
+
+    # --- Lanzar procesos -------------------------------------------------------
+    def ffmpeg_threads(self):
+        if self.playing and self.while_playing == "throttle":
+            return 1
+        return self.threads
+
+    def wrap(self, cmd):
+        """Prefija nice/ionice/taskset (todos hacen exec del comando)."""
+        nice = NICE_PLAYING if self.playing and self.while_playing != "ignore" else self.nice
+        prefijo = ["nice", "-n", str(nice)]
+        if self.ionice_idle:
+            prefijo = ["ionice", "-c", "3", *prefijo]
+        if self.cpus:
+            prefijo = ["taskset", "-c", self.cpus, *prefijo]
+        return [*prefijo, *cmd]
+
+    @contextmanager
+    def slot(self):
+        """Lugar en el límite global de concurrencia (espera si no hay)."""
+        with self._cond:
+            while self._activos >= self._limite():
+                self._cond.wait(1.0)   # re-evaluar por si venció el heartbeat
+            self._activos += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._activos -= 1
+                self._cond.notify_all()
+
+    @contextmanager
+    def popen(self, cmd, limitar=True, **kwargs):
+        """Popen gobernado; con limitar=True ocupa un lugar del límite global."""
+        ctx = self.slot() if limitar else nullcontext()
+        with ctx:
+            proc = subprocess.Popen(self.wrap(cmd), **kwargs)
+            with self._cond:
+                self._procs.add(proc)
+            if self._pausados:
+                self._signal(proc, signal.SIGSTOP)
+            try:
+                yield proc
+            finally:
+                with self._cond:
+                    self._procs.discard(proc)
+                if proc.poll() is None:
+                    proc.kill()
+                    proc.wait()
+
+    def run(self, cmd, limitar=True, check=False, **kwargs):
+        """Equivalente a subprocess.run, gobernado."""
+        with self.popen(cmd, limitar=limitar, **kwargs) as proc:
+            out, err = proc.communicate()
+        if check and proc.returncode != 0:
+            raise subprocess.CalledProcessError(proc.returncode, cmd, out, err)
+        return subprocess.CompletedProcess(cmd, proc.returncode, out, err)
+
+    # --- Pausa / reanudación ----------------------------------------------------
+    def _ensure_thread(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="media-governor", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(2.0)
+            self._reconcile()
+
+    def _reconcile(self):
+        """Aplica el modo "mientras reproduce" a los procesos que ya corren."""
+        playing = self.playing
+        pausar = playing and self.while_playing == "pause"
+        frenar = playing and self.while_playing == "throttle"
+        with self._cond:
+            self._cond.notify_all()   # el límite pudo cambiar (heartbeat vencido)
+            if pausar == self._pausados and frenar == self._frenados:
+                return
+            cambio_pausa = pausar != self._pausados
+            self._pausados, self._frenados = pausar, frenar
+            procs = list(self._procs)
+        if not procs:
+            return
+        if cambio_pausa:
+            sig = signal.SIGSTOP if pausar else signal.SIGCONT
+            for proc in procs:
+                self._signal(proc, sig)
+            logger.info(f"[GOV] {'pausa' if pausar else 'reanuda'} {len(procs)} proceso(s) de medios")
+        else:
+            nice = NICE_PLAYING if frenar else self.nice
+            for proc in procs:
+                try:
+                    os.setpriority(os.PRIO_PROCESS, proc.pid, nice)
+                except (ProcessLookupError, PermissionError, OSError):
+                    pass  # bajar el nice de vuelta requiere root: queda en 19
+            logger.info(f"[GOV] nice {nice} para {len(procs)} proceso(s) de medios")
+
+    @staticmethod
+    def _signal(proc, sig):
+        try:
+            proc.send_signal(sig)
+        except (ProcessLookupError, OSError):
+            pass
+
+
+governor = Governor(max_jobs=MEDIA_MAX_JOBS, threads=FFMPEG_THREADS, nice=MEDIA_NICE,
+                    cpus=MEDIA_CPUS, while_playing=MEDIA_WHILE_PLAYING)
@@ -0,0 +1,398 @@
+# SPDX-License-Identifier: LicenseRef-TVArgenta-NC-Attribution-Consult-First
+# Proyecto: TVArgenta — Retro TV
+# Autor: Ricardo Sappia contact:rsflightronics@gmail.com
+# © 2025 Ricardo Sappia. Todos los derechos reservados.
+# Licencia: No comercial, atribución y consulta previa. Se distribuye TAL CUAL, sin garantías.
+# Ver LICENSE para términos completos.
+
+"""
+Importador masivo de videos por línea de comandos.
+
+Recorre directorios (recursivo) y pasa cada archivo por un pipeline de
+etapas con sus propios workers, conectadas por colas acotadas:
+
+    descubrir -> probe -> normalizar + conformidad -> thumbnail -> lote
+
+Mientras un archivo se transcodifica, el siguiente ya se está probando y el
+anterior sacando el thumbnail. Los ffmpeg pasan por el gobernador de ESTE
+proceso (nice/ionice, -threads), que no comparte el límite con los jobs de
+Flask: por eso el importador corre por default un solo ffmpeg a la vez
+(--jobs). Si Flask está corriendo, cada JUGANDO_CADA_S se le pregunta por
+IPC si el player está reproduciendo y se aplica MEDIA_WHILE_PLAYING igual
+que allá (throttle / pause); sin Flask no hay player que cuidar.
+
+La metadata se escribe de a lotes (--lote archivos o LOTE_S segundos): si
+Flask está corriendo el lote va por el socket IPC y lo escribe Flask (un solo
+escritor); si no, se escribe directo con el repositorio.
+
+Checkpoint en IMPORT_CHECKPOINT_FILE, por (path, tamaño, mtime) del origen:
+  - "promovido": el .mp4 ya está en VIDEO_DIR, falta la metadata
+  - "listo": metadata guardada (se marca recién al guardar el lote)
+  - "error": se reintenta en la próxima corrida
+Si se corta a mitad de camino, volver a correr lo mismo retoma donde quedó.
+
+Uso (desde software/app):
+    python -m modules.importer /media/usb/videos [otro_dir ...]
+        [--workers N] [--jobs 1] [--tags a,b] [--mover] [--lote 25] [--dry-run]
+"""
+
+import argparse
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+
+from werkzeug.utils import secure_filename
+
+from modules import conformance
+from modules.governor import governor
+from modules.ingest import normalizar
+from modules.ipc import IpcClient
+from modules.media_probe import probe
+from modules.repository import repo
+from modules.state_store import state_store
+from modules.thumbnail_queue import extraer_thumbnail, derivar_thumbnail
+from settings import (
+    VIDEO_DIR, THUMB_DIR, IMPORT_CHECKPOINT_FILE, IPC_SOCKET, IPC_MODE, TRANSCODE_WORKERS,
+)
+
+logger = logging.getLogger("tvargenta")
+
+EXTENSIONES = {".mp4", ".m4v", ".mov", ".mkv", ".avi", ".webm", ".mpg", ".mpeg", ".ts"}
+LOTE_S = 10.0         # un lote incompleto se guarda igual pasado este tiempo
+IPC_TIMEOUT_S = 10.0  # el lote incluye un fsync de la metadata del lado de Flask
+JUGANDO_CADA_S = 5.0  # cada cuánto se copia de Flask el estado del player
+_FIN = object()
+
+
+class Archivo:
+    __slots__ = ("origen", "clave", "video_id", "info", "accion", "duracion",
+                 "conformidad", "placeholder", "error", "retomado", "inicio")
+
+    def __init__(self, origen, clave, video_id, retomado=False):
+        self.origen = origen
+        self.clave = clave
+        self.video_id = video_id
+        self.info = None
+        self.accion = None
+        self.duracion = None
+        self.conformidad = None
+        self.placeholder = None
+        self.error = None
+        self.retomado = retomado   # ya promovido en una corrida anterior
+        self.inicio = time.monotonic()
+
+    @property
+    def destino(self):
+        return VIDEO_DIR / f"{self.video_id}.mp4"
+
+
+def clave_de(path):
+    st = path.stat()
+    return f"{path}|{st.st_size}|{st.st_mtime_ns}"
+
+
+def descubrir(dirs):
+    """Archivos de video bajo `dirs`, recursivo y en orden estable."""
+    for d in dirs:
+        d = Path(d).resolve()
+        if d.is_file():
+            yield d
+            continue
+        for raiz, subdirs, archivos in os.walk(d):
+            subdirs[:] = sorted(s for s in subdirs if not s.startswith("."))
+            for nombre in sorted(archivos):
+                path = Path(raiz) / nombre
+                if path.suffix.lower() in EXTENSIONES and not nombre.startswith("."):
+                    yield path
+
+
+class Checkpoint:
+    """Estado por archivo de origen; las escrituras pasan por el state store."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        try:
+            self._data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            self._data = {}
+        except Exception as e:
+            logger.warning(f"[IMPORT] checkpoint ilegible, arranco de cero: {e}")
+            self._data = {}
+
+    def get(self, clave):
+        with self._lock:
+            return self._data.get(clave)
+
+    def items(self):
+        with self._lock:
+            return list(self._data.items())
+
+    def marcar(self, clave, **campos):
+        with self._lock:
+            self._data[clave] = {**self._data.get(clave, {}), **campos, "t": time.time()}
+        # foto al escribir (coalescida), no un dump entero por cada marca
+        state_store.write(self.path, self._foto, indent=None)
+
+    def _foto(self):
+        with self._lock:
+            return json.dumps(self._data, ensure_ascii=False)
+
+
+class Etapa:
+    """N workers que toman de `entrada`, aplican fn y pasan a `salida`."""
+
+    def __init__(self, nombre, fn, workers, salida):
+        self.nombre = nombre
+        self.fn = fn
+        self.salida = salida
+        self.entrada = queue.Queue(maxsize=max(1, workers) * 2)   # contrapresión
+        self._threads = [
+            threading.Thread(target=self._run, name=f"import-{nombre}-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+
+    def start(self):
+        for t in self._threads:
+            t.start()
+
+    def cerrar(self):
+        """Espera que se vacíe la entrada y terminen los workers."""
+        self.entrada.put(_FIN)
+        for t in self._threads:
+            t.join()
+
+    def _run(self):
+        while True:
+            item = self.entrada.get()
+            if item is _FIN:
+                self.entrada.put(_FIN)   # para los otros workers de esta etapa
+                return
+            if item.error is None:
+                try:
+                    self.fn(item)
+                except Exception as e:
+                    item.error = f"{self.nombre}: {e}"
+                    logger.warning(f"[IMPORT] {item.origen}: {item.error}")
+            self.salida.put(item)
+
+
+class Importador:
+    def __init__(self, dirs, workers=1, tags=(), mover=False, lote=25, dry_run=False):
+        self.dirs = dirs
+        self.workers = max(1, int(workers))
+        self.tags = list(tags)
+        self.mover = mover
+        self.lote = max(1, int(lote))
+        self.dry_run = dry_run
+        self.checkpoint = Checkpoint(IMPORT_CHECKPOINT_FILE)
+        self.ipc = IpcClient(IPC_SOCKET, timeout=IPC_TIMEOUT_S) if IPC_MODE == "socket" else None
+        self._ids = set(repo.metadata())
+        self._resultados = queue.Queue()
+        self._pendientes = []
+        self._ultimo_lote = time.monotonic()
+        self.totales = {"encontrados": 0, "ya_importados": 0, "ok": 0, "error": 0}
+
+    # --- Descubrimiento -------------------------------------------------------
+    def _nuevo_id(self, origen):
+        base = secure_filename(origen.stem) or "video"
+        video_id, n = base, 2
+        while video_id in self._ids or (VIDEO_DIR / f"{video_id}.mp4").exists():
+            video_id, n = f"{base}_{n}", n + 1
+        self._ids.add(video_id)
+        return video_id
+
+    def _archivos(self):
+        vistos = set()
+        # primero lo que quedó promovido sin metadata (con --mover el origen ya no está)
+        for clave, estado in self.checkpoint.items():
+            if estado.get("estado") == "promovido" and (VIDEO_DIR / f"{estado['video_id']}.mp4").exists():
+                vistos.add(clave)
+                self._ids.add(estado["video_id"])
+                yield Archivo(Path(estado["origen"]), clave, estado["video_id"], retomado=True)
+        for origen in descubrir(self.dirs):
+            try:
+                clave = clave_de(origen)
+            except OSError:
+                continue
+            if clave in vistos:
+                continue
+            vistos.add(clave)
+            self.totales["encontrados"] += 1
+            estado = self.checkpoint.get(clave) or {}
+            if estado.get("estado") == "listo":
+                self.totales["ya_importados"] += 1
+                continue
+            yield Archivo(origen, clave, self._nuevo_id(origen))
+
+    # --- Etapas ---------------------------------------------------------------
+    def _probar(self, item):
+        if item.retomado:
+            return
+        item.info = probe(item.origen, cache=False)   # origen: no ensuciar la caché
+        if not item.info or not item.info.get("width"):
+            raise ValueError("ffprobe no encontró video")
+
+    def _normalizar(self, item):
+        if not item.retomado:
+            item.accion = normalizar(item.origen, item.destino, item.info, mover=self.mover)
+            self.checkpoint.marcar(item.clave, estado="promovido", origen=str(item.origen),
+                                   video_id=item.video_id, accion=item.accion)
+        item.conformidad = conformance.revisar(item.destino, corregir=True)
+        item.duracion = (probe(item.destino) or {}).get("duration", 0)
+
+    def _thumbnail(self, item):
+        thumb = THUMB_DIR / f"{item.video_id}.jpg"
+        try:
+            if not thumb.exists():
+                item.placeholder = extraer_thumbnail(item.destino, thumb)
+            else:   # retomado: el JPEG ya estaba, faltan derivados/placeholder
+                item.placeholder = derivar_thumbnail(thumb)
+        except Exception as e:
+            # no es fatal: la UI usa el thumbnail por defecto y el indexador reintenta
+            logger.warning(f"[IMPORT] sin thumbnail para {item.video_id}: {e}")
+
+    # --- Lotes de metadata ----------------------------------------------------
+    def _entrada(self, item):
+        info = {
+            "title": item.video_id.replace("_", " "),
+            "tags": list(self.tags),
+            "personaje": "",
+            "fecha": "",
+            "modo": [],
+            "duracion": item.duracion,
+            "importado_de": str(item.origen),
+        }
+        if item.conformidad:
+            info["conformidad"] = item.conformidad
+        if item.placeholder:
+            info["thumb_ph"] = item.placeholder
+        return info
+
+    def _guardar_lote(self):
+        self._ultimo_lote = time.monotonic()
+        if not self._pendientes:
+            return
+        lote = {item.video_id: self._entrada(item) for item in self._pendientes}
+        reply = self.ipc.request({"op": "put_videos", "videos": lote}) if self.ipc else None
+        if not (reply and reply.get("ok")):
+            # Flask no está: escribir directo (el de Flask detecta el cambio al volver)
+            actual = repo.metadata()
+            repo.put_videos({vid: {**actual.get(vid, {}), **info} for vid, info in lote.items()})
+            state_store.flush()
+        for item in self._pendientes:
+            self.checkpoint.marcar(item.clave, estado="listo", origen=str(item.origen),
+                                   video_id=item.video_id, error=None)
+        state_store.flush()
+        print(f"💾 Lote de {len(lote)} video(s) guardado ({'vía Flask' if reply else 'directo'})")
+        self._pendientes = []
+
+    def _terminado(self, item):
+        seg = time.monotonic() - item.inicio
+        hechos = self.totales["ok"] + self.totales["error"] + 1
+        if item.error:
+            self.totales["error"] += 1
+            self.checkpoint.marcar(item.clave, estado="error", origen=str(item.origen),
+                                   video_id=item.video_id, error=item.error)
+            print(f"❌ [{hechos}] {item.origen}: {item.error}")
+            return
+        self.totales["ok"] += 1
+        self._pendientes.append(item)
+        detalle = "retomado" if item.retomado else item.accion
+        print(f"✅ [{hechos}] {item.origen.name} -> {item.video_id} ({detalle}, {seg:.1f}s)")
+        if len(self._pendientes) >= self.lote:
+            self._guardar_lote()
+
+    def _espejar_player(self):
+        """Copia al gobernador local el heartbeat del player que recibe Flask."""
+        ipc = IpcClient(IPC_SOCKET)   # propio: no esperar detrás de un lote
+        while True:
+            reply = ipc.request({"op": "governor"})
+            if reply and reply.get("ok"):
+                governor.set_playing(bool(reply.get("playing")))
+            time.sleep(JUGANDO_CADA_S)
+
+    # --- Corrida --------------------------------------------------------------
+    def run(self):
+        VIDEO_DIR.mkdir(parents=True, exist_ok=True)
+        THUMB_DIR.mkdir(parents=True, exist_ok=True)
+        if self.dry_run:
+            for item in self._archivos():
+                print(f"{item.origen} -> {item.video_id}{' (retomado)' if item.retomado else ''}")
+            print(self.totales)
+            return self.totales
+
+        if self.ipc is not None:
+            threading.Thread(target=self._espejar_player, name="import-player", daemon=True).start()
+        thumbs = Etapa("thumbnail", self._thumbnail, self.workers, self._resultados)
+        transcode = Etapa("normalizar", self._normalizar, self.workers, thumbs.entrada)
+        probes = Etapa("probe", self._probar, self.workers, transcode.entrada)
+        etapas = [probes, transcode, thumbs]
+
+        def alimentar():
+            try:
+                for item in self._archivos():
+                    probes.entrada.put(item)
+            finally:
+                for etapa in etapas:   # en orden: cada una drena antes de cerrar la siguiente
+                    etapa.cerrar()
+                self._resultados.put(_FIN)
+
+        for etapa in etapas:
+            etapa.start()
+        threading.Thread(target=alimentar, name="import-scan", daemon=True).start()
+        try:
+            while True:
+                try:
+                    item = self._resultados.get(timeout=1.0)
+                except queue.Empty:
+                    item = None
+                if item is _FIN:
+                    break
+                if item is not None:
+                    self._terminado(item)
+                if time.monotonic() - self._ultimo_lote >= LOTE_S:
+                    self._guardar_lote()
+        finally:
+            # también con Ctrl-C: lo terminado queda guardado y marcado
+            self._guardar_lote()
+            state_store.flush()
+        return self.totales
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m modules.importer",
+                                     description="Importa videos en masa a TVArgenta.")
+    parser.add_argument("dirs", nargs="+", help="directorios (recursivo) o archivos")
+    parser.add_argument("--workers", type=int, default=TRANSCODE_WORKERS,
+                        help="workers por etapa (los ffmpeg igual respetan --jobs)")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="ffmpeg simultáneos de este proceso (aparte de los de Flask)")
+    parser.add_argument("--tags", default="", help="tags para todos los videos, separados por coma")
+    parser.add_argument("--mover", action="store_true",
+                        help="borrar el origen al importarlo (rename si es el mismo filesystem)")
+    parser.add_argument("--lote", type=int, default=25, help="videos por escritura de metadata")
+    parser.add_argument("--dry-run", action="store_true", help="sólo listar qué se importaría")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    governor.max_jobs = max(1, args.jobs)
+    tags = [t.strip() for t in args.tags.split(",") if t.strip()]
+    importador = Importador(args.dirs, workers=args.workers, tags=tags, mover=args.mover,
+                            lote=args.lote, dry_run=args.dry_run)
+    try:
+        totales = importador.run()
+    except KeyboardInterrupt:
+        print("\n⏸ Interrumpido: volver a correr lo mismo para retomar")
+        return 130
+    print(f"📊 {totales}")
+    return 1 if totales["error"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+# SPDX-License-Identifier: LicenseRef-TVArgenta-NC-Attribution-Consult-First
+# Proyecto: TVArgenta — Retro TV
+# Autor: Ricardo Sappia contact:rsflightronics@gmail.com
+# © 2025 Ricardo Sappia. Todos los derechos reservados.
+# Licencia: No comercial, atribución y consulta previa. Se distribuye TAL CUAL, sin garantías.
+# Ver LICENSE para términos completos.
+
+"""
+Ingesta de uploads sin copias de más.
+
+Los bytes van directo a un archivo de staging en el MISMO filesystem que
+VIDEO_DIR (VIDEO_DIR/.staging) y se hashean (sha256) mientras llegan. Si el
+video ya está conforme se "promueve" con os.replace (rename atómico, cero
+bytes copiados); si no, ffmpeg lee del staging y escribe el resultado final.
+
+Dos caminos de entrada:
+  - multipart clásico (/upload): `HashingFile` es el stream que werkzeug usa
+    para guardar cada archivo del form (ver IngestRequest en main.py).
+  - upload por partes y reanudable (/api/uploads): `ResumableUploads` acepta
+    chunks con Content-Range; si se corta el Wi-Fi, el cliente pregunta el
+    offset y sigue desde ahí.
+
+`normalizar()` deja un archivo ya recibido en VIDEO_DIR como MP4 800x480 con
+faststart; la usan la cola de uploads y el importador masivo.
+"""
+
+import errno
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from modules.conformance import KEYFRAME_EVERY_S
+from modules.jobs import run_ffmpeg
+
+CHUNK = 1024 * 1024
+STALE_S = 48 * 3600   # uploads reanudables abandonados se borran a los 2 días
+
+
+class HashingFile:
+    """Archivo de staging que calcula el sha256 de lo que se le escribe."""
+
+    def __init__(self, staging_dir, filename=None):
+        staging_dir = Path(staging_dir)
+        staging_dir.mkdir(parents=True, exist_ok=True)
+        self.path = staging_dir / f"{uuid.uuid4().hex}.part"
+        self.filename = filename
+        self.sha256 = hashlib.sha256()
+        self._f = open(self.path, "w+b")
+
+    def write(self, data):
+        self.sha256.update(data)
+        return self._f.write(data)
+
+    def hexdigest(self):
+        return self.sha256.hexdigest()
+
+    def close(self):
+        self._f.close()
+
+    def discard(self):
+        self.close()
+        self.path.unlink(missing_ok=True)
+
+    def __getattr__(self, name):
+        # seek/read/tell/flush/etc. van al archivo real (FileStorage los usa)
+        return getattr(self._f, name)
+
+    def __iter__(self):
+        return iter(self._f)
+
+
+def hash_file(path, sha=None):
+    sha = sha or hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK), b""):
+            sha.update(block)
+    return sha
+
+
+class ResumableUploads:
+    """
+    Uploads por partes. Estado en disco (<id>.json + <id>.part en staging),
+    así un reinicio de Flask tampoco obliga a empezar de cero.
+    """
+
+    def __init__(self, staging_dir):
+        self.staging_dir = Path(staging_dir)
+        self._lock = threading.Lock()   # sólo para el registro (_hash, _locks)
+        self._locks = {}  # upload_id -> Lock: un cliente lento no frena a los demás
+        self._hash = {}   # upload_id -> sha256 en curso (se rehace si falta)
+
+    def _lock_de(self, upload_id):
+        with self._lock:
+            lock = self._locks.get(upload_id)
+            if lock is None:
+                lock = self._locks[upload_id] = threading.Lock()
+            return lock
+
+    def _paths(self, upload_id):
+        if not upload_id.isalnum():
+            raise ValueError("upload id inválido")
+        return self.staging_dir / f"{upload_id}.json", self.staging_dir / f"{upload_id}.part"
+
+    @staticmethod
+    def make_id(filename, size, extra=""):
+        return hashlib.sha1(f"{filename}|{size}|{extra}".encode("utf-8")).hexdigest()[:24]
+
+    def create(self, filename, size, extra=""):
+        """Arranca (o retoma) un upload. Devuelve (upload_id, offset)."""
+        self.staging_dir.mkdir(parents=True, exist_ok=True)
+        self.cleanup()
+        upload_id = self.make_id(filename, size, extra)
+        meta_path, part_path = self._paths(upload_id)
+        with self._lock_de(upload_id):
+            if not meta_path.exists():
+                meta_path.write_text(json.dumps({"filename": filename, "size": int(size),
+                                                 "creado": time.time()}))
+                part_path.write_bytes(b"")
+                with self._lock:
+                    self._hash[upload_id] = hashlib.sha256()
+            return upload_id, part_path.stat().st_size
+
+    def status(self, upload_id):
+        meta_path, part_path = self._paths(upload_id)
+        if not meta_path.exists():
+            return None
+        meta = json.loads(meta_path.read_text())
+        meta["offset"] = part_path.stat().st_size if part_path.exists() else 0
+        meta["upload_id"] = upload_id
+        return meta
+
+    def append(self, upload_id, start, stream):
+        """
+        Agrega un chunk que empieza en `start`. Devuelve (offset, aceptado).
+        Si `start` no coincide con lo que ya tenemos, no escribe nada y
+        devuelve el offset actual (el cliente reintenta desde ahí).
+        """
+        meta_path, part_path = self._paths(upload_id)
+        with self._lock_de(upload_id):
+            if not meta_path.exists():
+                raise KeyError(upload_id)
+            offset = part_path.stat().st_size
+            if start != offset:
+                return offset, False
+            with self._lock:
+                sha = self._hash.get(upload_id)
+            if sha is None:
+                # Flask se reinició a mitad de camino: rehashear lo que ya estaba
+                sha = hash_file(part_path)
+                with self._lock:
+                    self._hash[upload_id] = sha
+            with open(part_path, "ab") as f:
+                for block in iter(lambda: stream.read(CHUNK), b""):
+                    sha.update(block)
+                    f.write(block)
+            return part_path.stat().st_size, True
+
+    def complete(self, upload_id):
+        """Si llegó todo: (part_path, filename, sha256). Si no, None."""
+        meta_path, part_path = self._paths(upload_id)
+        with self._lock_de(upload_id):
+            meta = json.loads(meta_path.read_text())
+            if part_path.stat().st_size != meta["size"]:
+                return None
+            with self._lock:
+                sha = self._hash.pop(upload_id, None)
+                self._locks.pop(upload_id, None)
+            sha = sha or hash_file(part_path)
+            # nombre único: si se vuelve a subir lo mismo, no pisa al que se procesa
+            listo = part_path.with_name(f"{upload_id}.{uuid.uuid4().hex[:8]}.part")
+            os.replace(part_path, listo)
+            meta_path.unlink(missing_ok=True)
+            return listo, meta["filename"], sha.hexdigest()
+
+    def cleanup(self):
+        limite = time.time() - STALE_S
+        for path in self.staging_dir.glob("*.part"):
+            try:
+                if path.stat().st_mtime < limite:
+                    path.unlink()
+                    path.with_suffix(".json").unlink(missing_ok=True)
+            except OSError:
+                pass
+
+
+def normalizar(origen, destino, info, mover=True, on_etapa=None, on_progress=None):
+    """
+    Deja `origen` en `destino` como MP4 800x480 con faststart:
+      - 800x480, MP4 y faststart: se promueve tal cual (rename si mover=True
+        y está en el mismo fs; si no, copia)
+      - 800x480 sin faststart (o en otro contenedor): remux sin recodificar
+      - otra resolución: resize/pad a 800x480 con keyframes frecuentes
+    Todo se escribe primero en <dir de destino>/.staging y se renombra al
+    final: el indexador nunca ve un .mp4 a medio escribir. Con mover=True
+    el origen se borra al terminar. Devuelve la acción hecha.
+    """
+    etapa = on_etapa or (lambda texto: None)
+    staging = Path(destino).parent / ".staging"
+    staging.mkdir(parents=True, exist_ok=True)
+    salida = staging / f"{uuid.uuid4().hex}.out.mp4"
+    tamano_ok = (info.get("width"), info.get("height")) == (800, 480)
+    es_mp4 = "mp4" in (info.get("format") or "")
+    duracion = info.get("duration") or None
+    try:
+        if tamano_ok and es_mp4 and info.get("faststart") is not False:
+            etapa("Guardando (ya estaba en 800x480)")
+            if mover:
+                try:
+                    os.replace(origen, destino)   # cero bytes copiados
+                    return "rename"
+                except OSError as e:
+                    if e.errno != errno.EXDEV:
+                        raise
+            shutil.copyfile(origen, salida)
+            accion = "copia"
+        elif tamano_ok and (es_mp4 or info.get("vcodec") == "h264"):
+            etapa("Reordenando (faststart)")
+            run_ffmpeg([
+                "-i", str(origen),
+                "-c", "copy", "-movflags", "+faststart",
+            ], salida, duration=duracion, on_progress=on_progress)
+            accion = "remux"
+        else:
+            etapa("Redimensionando")
+            run_ffmpeg([
+                "-i", str(origen),
+                "-vf", "scale=800:480:force_original_aspect_ratio=decrease,pad=800:480:(ow-iw)/2:(oh-ih)/2",
+                "-force_key_frames", f"expr:gte(t,n_forced*{KEYFRAME_EVERY_S})",
+                "-c:a", "copy", "-movflags", "+faststart",
+            ], salida, duration=duracion, on_progress=on_progress)
+            accion = "resize"
+        os.replace(salida, destino)
+        if mover:
+            os.remove(origen)
+        return accion
+    finally:
+        if salida.exists():
+            salida.unlink()
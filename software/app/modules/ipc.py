@@ -0,0 +1,116 @@
+# SPDX-License-Identifier: LicenseRef-TVArgenta-NC-Attribution-Consult-First
+# Proyecto: TVArgenta — Retro TV
+# Autor: Ricardo Sappia contact:rsflightronics@gmail.com
+# © 2025 Ricardo Sappia. Todos los derechos reservados.
+# Licencia: No comercial, atribución y consulta previa. Se distribuye TAL CUAL, sin garantías.
+# Ver LICENSE para términos completos.
+
+"""
+Canal local encoder <-> Flask sobre un Unix domain socket.
+
+Protocolo: una línea JSON por mensaje y una línea JSON de respuesta.
+    {"op": "event", "type": "volume", "delta": 5}  -> {"ok": true, "valor": 55}
+    {"op": "query"}                                 -> {"ok": true, "state": {...}}
+
+El servidor vive en Flask (dueño del estado de menú/volumen/canal). El
+cliente lo usa el encoder; si el socket no está, `request()` devuelve None y
+el encoder cae al modo compatible de archivos trigger en /tmp.
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+
+logger = logging.getLogger("tvargenta")
+
+
+class IpcServer:
+    def __init__(self, path, handler):
+        self.path = str(path)
+        self.handler = handler
+        self._sock = None
+
+    def start(self):
+        try:
+            os.unlink(self.path)  # socket viejo de una corrida anterior
+        except FileNotFoundError:
+            pass
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(self.path)
+        os.chmod(self.path, 0o660)
+        sock.listen(4)
+        self._sock = sock
+        threading.Thread(target=self._accept_loop, name="ipc-accept", daemon=True).start()
+        logger.info(f"[IPC] escuchando en {self.path}")
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), name="ipc-conn", daemon=True).start()
+
+    def _serve(self, conn):
+        with conn, conn.makefile("rwb", buffering=0) as f:
+            for raw in f:
+                try:
+                    reply = self.handler(json.loads(raw))
+                except Exception as e:
+                    logger.warning(f"[IPC] mensaje inválido {raw[:80]!r}: {e}")
+                    reply = {"ok": False, "error": str(e)}
+                try:
+                    f.write(json.dumps(reply).encode("utf-8") + b"\n")
+                except OSError:
+                    return
+
+
+class IpcClient:
+    def __init__(self, path, timeout=0.5):
+        self.path = str(path)
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._sock = None
+        self._file = None
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.path)
+        self._sock = sock
+        self._file = sock.makefile("rwb", buffering=0)
+
+    def _close(self):
+        for obj in (self._file, self._sock):
+            try:
+                if obj is not None:
+                    obj.close()
+            except OSError:
+                pass
+        self._sock = self._file = None
+
+    def request(self, msg):
+        """Manda un mensaje y espera la respuesta. None si Flask no está."""
+        data = json.dumps(msg).encode("utf-8") + b"\n"
+        with self._lock:
+            for _ in range(2):  # un reintento por si Flask se reinició
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    self._file.write(data)
+                    line = self._file.readline()
+                    if not line:
+                        raise ConnectionError("socket cerrado")
+                    return json.loads(line)
+                except (OSError, ValueError, ConnectionError):
+                    self._close()
+            return None
+
+    def event(self, type_, **data):
+        return self.request({"op": "event", "type": type_, **data})
+
+    def query(self):
+        reply = self.request({"op": "query"})
+        return reply.get("state") if reply and reply.get("ok") else None
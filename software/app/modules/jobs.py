@@ -0,0 +1,193 @@
+# SPDX-License-Identifier: LicenseRef-TVArgenta-NC-Attribution-Consult-First
+# Proyecto: TVArgenta — Retro TV
+# Autor: Ricardo Sappia contact:rsflightronics@gmail.com
+# © 2025 Ricardo Sappia. Todos los derechos reservados.
+# Licencia: No comercial, atribución y consulta previa. Se distribuye TAL CUAL, sin garantías.
+# Ver LICENSE para términos completos.
+
+"""
+Cola de trabajos en segundo plano (uploads / transcodes) con progreso.
+
+`submit()` devuelve un job id al toque; N workers corren los trabajos. Cada
+job tiene su propio estado (etapa, porcentaje, fps, ETA) que se consulta por
+/api/jobs, así varios uploads a la vez no se pisan.
+
+`run_ffmpeg()` lanza ffmpeg con `-progress pipe:1` y traduce lo que reporta
+(out_time, fps, speed) a porcentaje y ETA usando la duración del probe.
+"""
+
+import itertools
+import logging
+import queue
+import subprocess
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from modules.governor import governor
+
+logger = logging.getLogger("tvargenta")
+
+MAX_TERMINADOS = 50   # jobs terminados que se recuerdan para /api/jobs
+
+
+class Job:
+    __slots__ = ("id", "nombre", "estado", "etapa", "percent", "fps", "speed",
+                 "eta_s", "error", "creado", "inicio", "fin", "resultado", "_fn")
+
+    def __init__(self, job_id, nombre, fn):
+        self.id = job_id
+        self.nombre = nombre
+        self.estado = "en_cola"   # en_cola | corriendo | ok | error
+        self.etapa = "En cola"
+        self.percent = None
+        self.fps = None
+        self.speed = None
+        self.eta_s = None
+        self.error = None
+        self.creado = time.time()
+        self.inicio = None
+        self.fin = None
+        self.resultado = None
+        self._fn = fn
+
+    def update(self, **campos):
+        for k, v in campos.items():
+            setattr(self, k, v)
+
+    @property
+    def terminado(self):
+        return self.estado in ("ok", "error")
+
+    def to_dict(self):
+        return {
+            "id": self.id, "nombre": self.nombre, "estado": self.estado,
+            "etapa": self.etapa, "percent": self.percent, "fps": self.fps,
+            "speed": self.speed, "eta_s": self.eta_s, "error": self.error,
+            "creado": self.creado, "inicio": self.inicio, "fin": self.fin,
+            "resultado": self.resultado,
+        }
+
+
+class JobQueue:
+    def __init__(self, workers=1, prefijo=""):
+        self.workers = max(1, int(workers))
+        self.prefijo = prefijo   # distingue ids entre colas (p.ej. "b" = biblioteca)
+        self._q = queue.Queue()
+        self._lock = threading.Lock()
+        self._cambio = threading.Condition(self._lock)   # avisa cuando termina un job
+        self._jobs = OrderedDict()   # id -> Job (en orden de llegada)
+        self._ids = itertools.count(1)
+        self._boot = format(int(time.time()) % 100000, "05d")
+        self._threads = []
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                t = threading.Thread(target=self._run, name=f"jobs-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def submit(self, nombre, fn):
+        """fn(job) hace el trabajo y va reportando con job.update(...)."""
+        job = Job(f"{self.prefijo}{self._boot}-{next(self._ids)}", nombre, fn)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._purge()
+        self._q.put(job)
+        if not self._threads:
+            self.start()
+        return job.id
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job else None
+
+    def list(self, ids=None):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        if ids:
+            jobs = [j for j in jobs if j.id in ids]
+        return [j.to_dict() for j in jobs]
+
+    def activos(self):
+        with self._lock:
+            return self._activos()
+
+    def esperar_inactiva(self):
+        """Bloquea hasta que no quede ningún job en cola ni corriendo."""
+        with self._cambio:
+            self._cambio.wait_for(lambda: self._activos() == 0)
+
+    def _activos(self):
+        return sum(1 for j in self._jobs.values() if not j.terminado)
+
+    def _purge(self):
+        terminados = [k for k, j in self._jobs.items() if j.terminado]
+        for k in terminados[:max(0, len(terminados) - MAX_TERMINADOS)]:
+            del self._jobs[k]
+
+    def _run(self):
+        while True:
+            job = self._q.get()
+            job.update(estado="corriendo", etapa="Procesando", inicio=time.time())
+            try:
+                job.resultado = job._fn(job)
+                job.update(estado="ok", etapa="Listo", percent=100.0, eta_s=0)
+            except Exception as e:
+                logger.error(f"[JOBS] {job.nombre} falló: {e}")
+                job.update(estado="error", etapa="Error", error=str(e))
+            job.fin = time.time()
+            with self._cambio:
+                self._cambio.notify_all()
+            logger.info(f"[JOBS] {job.id} {job.nombre} {job.estado} en {job.fin - job.inicio:.1f}s")
+
+
+def _parse_speed(value):
+    try:
+        return float(str(value).rstrip("x"))
+    except ValueError:
+        return None
+
+
+def run_ffmpeg(args, output, duration=None, on_progress=None):
+    """
+    ffmpeg con -progress: `args` son entradas y opciones (sin la salida),
+    `output` el archivo de salida. Llama on_progress(percent, fps, speed,
+    eta_s) por cada bloque de progreso. Lanza CalledProcessError si falla.
+    """
+    # -threads es opción de salida: va justo antes del archivo de salida
+    cmd = ["ffmpeg", "-hide_banner", "-nostats", "-loglevel", "error",
+           "-progress", "pipe:1", *args,
+           "-threads", str(governor.ffmpeg_threads()), "-y", str(output)]
+    with tempfile.TemporaryFile() as err, \
+            governor.popen(cmd, stdout=subprocess.PIPE, stderr=err, text=True) as proc:
+        bloque = {}
+        for line in proc.stdout:
+            key, _, value = line.strip().partition("=")
+            bloque[key] = value
+            if key != "progress":
+                continue
+            # fin de un bloque: out_time_us es el tiempo ya procesado
+            out_us = bloque.get("out_time_us", "")
+            out_s = int(out_us) / 1e6 if out_us.isdigit() else 0.0
+            speed = _parse_speed(bloque.get("speed", ""))
+            fps = _parse_speed(bloque.get("fps", ""))
+            percent = eta = None
+            if duration:
+                percent = min(100.0, round(out_s / duration * 100, 1))
+                if speed:
+                    eta = max(0, round((duration - out_s) / speed))
+            if on_progress is not None:
+                on_progress(percent, fps, speed, eta)
+            bloque = {}
+        rc = proc.wait()
+        if rc != 0:
+            err.seek(0)
+            detalle = err.read().decode("utf-8", "replace")[-500:]
+            logger.warning(f"[JOBS] ffmpeg rc={rc}: {detalle.strip()}")
+            raise subprocess.CalledProcessError(rc, cmd, stderr=detalle)
@@ -0,0 +1,183 @@
+# SPDX-License-Identifier: LicenseRef-TVArgenta-NC-Attribution-Consult-First
+# Proyecto: TVArgenta — Retro TV
+# Autor: Ricardo Sappia contact:rsflightronics@gmail.com
+# © 2025 Ricardo Sappia. Todos los derechos reservados.
+# Licencia: No comercial, atribución y consulta previa. Se distribuye TAL CUAL, sin garantías.
+# Ver LICENSE para términos completos.
+
+"""
+Indexador de medios en segundo plano.
+
+Es el dueño de "qué archivos hay en VIDEO_DIR": detecta nuevos, faltantes y
+cambiados (tamaño/mtime), completa la duración en metadata y genera los
+thumbnails que falten. Las rutas (/tv, /gestion) sólo leen `estado()`, así
+que renderizar nunca espera un ffprobe/ffmpeg ni un listdir.
+
+Se despierta con inotify si está `inotify_simple` (pip install inotify_simple)
+y, si no, con un rescan periódico por stat. Con inotify igual hace un rescan
+de seguridad cada tanto (por si se perdieron eventos).
+"""
+
+import logging
+import os
+import threading
+import time
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:  # opcional: sin inotify caemos al rescan periódico
+    INotify = None
+
+logger = logging.getLogger("tvargenta")
+
+VIDEO_EXTS = (".mp4", ".webm", ".mov")
+RESCAN_S = 30.0           # fallback sin inotify
+RESCAN_INOTIFY_S = 600.0  # rescan de seguridad con inotify
+SETTLE_S = 1.0            # esperar a que termine una copia antes de escanear
+
+
+class MediaIndexer:
+    def __init__(self, video_dir, repo, duration_fn, thumbnail_fn,
+                 rescan_every=RESCAN_S):
+        self.video_dir = str(video_dir)
+        self.repo = repo
+        self.duration_fn = duration_fn     # path -> segundos
+        self.thumbnail_fn = thumbnail_fn   # (video_id, forzar) -> None
+        self.rescan_every = rescan_every
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._archivos = {}       # video_id -> (nombre, size, mtime_ns)
+        self._generation = None   # generación de metadata ya revisada
+        self._listo = threading.Event()
+        self.ultimo_scan = None
+        self.modo = "inotify" if INotify is not None else "rescan"
+
+    # --- Lectura (rutas) ------------------------------------------------------
+    @property
+    def escaneando(self):
+        """True hasta que termina el primer scan (estado() todavía es parcial)."""
+        return not self._listo.is_set()
+
+    def estado(self, metadata):
+        """
+        (validos, fantasmas, nuevos) con el último scan; sin I/O ni esperas.
+        Antes del primer scan no se sabe qué falta: todo cuenta como válido
+        y la ruta muestra el aviso de `escaneando`.
+        """
+        if self.escaneando:
+            return dict(metadata), {}, []
+        with self._lock:
+            archivos = set(self._archivos)
+        validos = {k: v for k, v in metadata.items() if k in archivos}
+        fantasmas = {k: v for k, v in metadata.items() if k not in archivos}
+        nuevos = sorted(archivos - set(metadata))
+        return validos, fantasmas, nuevos
+
+    def stats(self):
+        with self._lock:
+            return {"modo": self.modo, "archivos": len(self._archivos),
+                    "ultimo_scan": self.ultimo_scan}
+
+    def request_scan(self):
+        """Pedir un scan ya (p.ej. después de subir o borrar un video)."""
+        self._wake.set()
+
+    # --- Hilo ------------------------------------------------------------------
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="media-indexer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        os.makedirs(self.video_dir, exist_ok=True)
+        inotify = self._watch()
+        while True:
+            try:
+                self.scan()
+            except Exception as e:
+                logger.error(f"[INDEXER] error escaneando {self.video_dir}: {e}")
+            self._listo.set()
+            if inotify is not None:
+                self._wait_inotify(inotify)
+            else:
+                self._wake.wait(self.rescan_every)
+            self._wake.clear()
+
+    def _watch(self):
+        if INotify is None:
+            logger.info(f"[INDEXER] sin inotify_simple: rescan cada {self.rescan_every:.0f}s")
+            return None
+        try:
+            inotify = INotify()
+            mask = (flags.CREATE | flags.CLOSE_WRITE | flags.DELETE |
+                    flags.MOVED_TO | flags.MOVED_FROM)
+            inotify.add_watch(self.video_dir, mask)
+            logger.info(f"[INDEXER] inotify sobre {self.video_dir}")
+            return inotify
+        except OSError as e:
+            logger.warning(f"[INDEXER] inotify no disponible ({e}); rescan periódico")
+            self.modo = "rescan"
+            return None
+
+    def _wait_inotify(self, inotify):
+        limite = time.monotonic() + RESCAN_INOTIFY_S
+        while time.monotonic() < limite and not self._wake.is_set():
+            # también miramos si cambió la metadata (upload, edición)
+            if inotify.read(timeout=1000):
+                # juntar la ráfaga (copias grandes generan muchos eventos)
+                while inotify.read(timeout=int(SETTLE_S * 1000)):
+                    pass
+                return
+            if self.repo.generation() != self._generation:
+                return
+
+    # --- Scan ------------------------------------------------------------------
+    def _listar(self):
+        archivos = {}
+        with os.scandir(self.video_dir) as it:
+            for entry in it:
+                base, ext = os.path.splitext(entry.name)
+                if ext.lower() not in VIDEO_EXTS or not entry.is_file():
+                    continue
+                st = entry.stat()
+                archivos[base] = (entry.name, st.st_size, st.st_mtime_ns)
+        return archivos
+
+    def scan(self):
+        t0 = time.monotonic()
+        actuales = self._listar()
+        with self._lock:
+            anteriores = self._archivos
+        cambiados = {vid for vid, info in actuales.items()
+                     if vid in anteriores and anteriores[vid] != info}
+        agregados = set(actuales) - set(anteriores)
+        quitados = set(anteriores) - set(actuales)
+        # publicar la lista ya: las rutas no esperan a ffprobe/ffmpeg
+        with self._lock:
+            self._archivos = actuales
+            self.ultimo_scan = time.time()
+        self._listo.set()
+
+        generation = self.repo.generation()
+        metadata = self.repo.metadata()
+        duraciones = 0
+        for vid, (nombre, _, _) in actuales.items():
+            info = metadata.get(vid)
+            if info is None or (("duracion" in info) and vid not in cambiados):
+                continue
+            dur = self.duration_fn(os.path.join(self.video_dir, nombre))
+            self.repo.put_video(vid, {**info, "duracion": dur})
+            duraciones += 1
+
+        for vid in actuales:
+            if vid in metadata:
+                self.thumbnail_fn(vid, vid in cambiados)
+
+        self._generation = generation
+        if agregados or quitados or cambiados or duraciones:
+            logger.info(
+                f"[INDEXER] +{len(agregados)} -{len(quitados)} ~{len(cambiados)} "
+                f"duraciones={duraciones} en {time.monotonic() - t0:.2f}s"
+            )
@@ -0,0 +1,216 @@
+# SPDX-License-Identifier: LicenseRef-TVArgenta-NC-Attribution-Consult-First
+# Proyecto: TVArgenta — Retro TV
+# Autor: Ricardo Sappia contact:rsflightronics@gmail.com
+# © 2025 Ricardo Sappia. Todos los derechos reservados.
+# Licencia: No comercial, atribución y consulta previa. Se distribuye TAL CUAL, sin garantías.
+# Ver LICENSE para términos completos.
+
+"""
+Probe único de archivos de video, con caché persistente.
+
+`probe(path)` corre UN ffprobe (-show_format -show_streams -of json) y
+devuelve resolución, duración, codecs, bitrate, rotación y si el átomo moov
+está al principio (faststart). El resultado se guarda en probe_cache.json
+con clave (path, size, mtime): un archivo que no cambió no se vuelve a
+probar nunca, ni siquiera después de reiniciar.
+"""
+
+import json
+import logging
+import os
+import struct
+import subprocess
+import threading
+
+from modules.governor import governor
+from modules.state_store import state_store
+from settings import PROBE_CACHE_FILE
+
+logger = logging.getLogger("tvargenta")
+
+
+def _num(value, cast=float):
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _rotation(stream):
+    for side in stream.get("side_data_list", []) or []:
+        if "rotation" in side:
+            return int(_num(side["rotation"]) or 0) % 360
+    return int(_num(stream.get("tags", {}).get("rotate")) or 0) % 360
+
+
+def moov_at_front(path):
+    """
+    True si en un MP4/MOV el átomo moov viene antes que mdat (arranca a
+    reproducir sin leer el final del archivo). None si no es ISO-BMFF.
+    Sólo lee los headers de 8/16 bytes de los átomos de primer nivel.
+    """
+    try:
+        with open(path, "rb") as f:
+            size_total = os.fstat(f.fileno()).st_size
+            pos = 0
+            while pos + 8 <= size_total:
+                f.seek(pos)
+                size, kind = struct.unpack(">I4s", f.read(8))
+                if size == 1:
+                    size = struct.unpack(">Q", f.read(8))[0]
+                elif size == 0:
+                    size = size_total - pos
+                if kind == b"moov":
+                    return True
+                if kind == b"mdat":
+                    return False
+                if size < 8:
+                    return None
+                pos += size
+    except (OSError, struct.error):
+        return None
+    return None
+
+
+def run_ffprobe(path):
+    # ffprobe es corto: baja prioridad, pero no ocupa lugar en el límite de jobs
+    result = governor.run([
+        "ffprobe", "-v", "error",
+        "-show_format", "-show_streams",
+        "-of", "json",
+        str(path)
+    ], limitar=False, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True)
+    data = json.loads(result.stdout or "{}")
+    streams = data.get("streams", [])
+    fmt = data.get("format", {})
+    video = next((s for s in streams if s.get("codec_type") == "video"), {})
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), {})
+
+    duration = _num(fmt.get("duration")) or _num(video.get("duration")) or 0.0
+    return {
+        "width": _num(video.get("width"), int),
+        "height": _num(video.get("height"), int),
+        "duration": duration,
+        "vcodec": video.get("codec_name"),
+        "acodec": audio.get("codec_name"),
+        "pix_fmt": video.get("pix_fmt"),
+        "bitrate": _num(fmt.get("bit_rate"), int),
+        "rotation": _rotation(video) if video else 0,
+        "format": fmt.get("format_name"),
+        "faststart": moov_at_front(path),
+    }
+
+
+def run_keyframe_scan(path, window_s=30):
+    """
+    Mayor distancia (s) entre keyframes en los primeros `window_s` segundos.
+    Es otra pasada (lee paquetes, decodifica sólo keyframes), por eso va
+    aparte del probe y se cachea igual.
+    """
+    result = governor.run([
+        "ffprobe", "-v", "error",
+        "-select_streams", "v:0",
+        "-skip_frame", "nokey",
+        "-show_entries", "frame=best_effort_timestamp_time",
+        "-read_intervals", f"%+{int(window_s)}",
+        "-of", "csv=p=0",
+        str(path)
+    ], limitar=False, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True)
+    tiempos = sorted(t for t in (_num(l.strip().rstrip(",")) for l in result.stdout.splitlines()) if t is not None)
+    if len(tiempos) < 2:
+        return float(window_s) if tiempos else None
+    return round(max(b - a for a, b in zip(tiempos, tiempos[1:])), 2)
+
+
+class ProbeCache:
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        self._lock = threading.Lock()
+        self._data = None
+
+    def _load(self):
+        if self._data is None:
+            try:
+                with open(self.cache_path, "r", encoding="utf-8") as f:
+                    self._data = json.load(f)
+            except FileNotFoundError:
+                self._data = {}
+            except Exception as e:
+                logger.warning(f"[PROBE] caché ilegible, arranco vacía: {e}")
+                self._data = {}
+        return self._data
+
+    def probe(self, path, cache=True):
+        """
+        Info del archivo; None si no existe o ffprobe no lo pudo leer.
+        cache=False para archivos temporales (no ensuciar la caché).
+        """
+        path = os.path.abspath(str(path))
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        clave = [st.st_size, st.st_mtime_ns]
+        with self._lock:
+            hit = self._load().get(path)
+            if hit is not None and hit.get("key") == clave:
+                return hit["info"]
+        try:
+            info = run_ffprobe(path)
+        except Exception as e:
+            logger.warning(f"[PROBE] ffprobe falló para {path}: {e}")
+            return None
+        if not cache:
+            return info
+        with self._lock:
+            data = self._load()
+            data[path] = {"key": clave, "info": info}
+            self._guardar()
+        return info
+
+    def keyframe_gap(self, path):
+        """
+        run_keyframe_scan cacheado con la misma clave (path, size, mtime).
+        Nunca mayor que la duración: un clip corto con un solo keyframe
+        (cortinas, idents) arranca rápido igual y no hay que recodificarlo.
+        """
+        path = os.path.abspath(str(path))
+        info = self.probe(path)
+        if info is None:
+            return None
+        with self._lock:
+            hit = self._load().get(path, {})
+            gop = hit.get("gop")
+        if "gop" not in hit:
+            try:
+                gop = run_keyframe_scan(path)
+            except Exception as e:
+                logger.warning(f"[PROBE] no pude leer keyframes de {path}: {e}")
+                return None
+            with self._lock:
+                data = self._load()
+                if path in data:
+                    data[path]["gop"] = gop
+                    self._guardar()
+        duracion = info.get("duration") or 0
+        if gop is not None and duracion > 0:
+            gop = round(min(gop, duracion), 2)
+        return gop
+
+    def forget(self, path):
+        path = os.path.abspath(str(path))
+        with self._lock:
+            if self._load().pop(path, None) is not None:
+                self._guardar()
+
+    def _guardar(self):
+        # se serializa una vez por write real (coalescido), no una copia por probe
+        state_store.write(self.cache_path, self._foto, indent=None)
+
+    def _foto(self):
+        with self._lock:
+            return json.dumps(self._data, ensure_ascii=False)
+
+
+probe_cache = ProbeCache(PROBE_CACHE_FILE)
+probe = probe_cache.probe
@@ -0,0 +1,86 @@
+# SPDX-License-Identifier: LicenseRef-TVArgenta-NC-Attribution-Consult-First
+# Proyecto: TVArgenta — Retro TV
+# Autor: Ricardo Sappia contact:rsflightronics@gmail.com
+# © 2025 Ricardo Sappia. Todos los derechos reservados.
+# Licencia: No comercial, atribución y consulta previa. Se distribuye TAL CUAL, sin garantías.
+# Ver LICENSE para términos completos.
+
+"""
+Métricas de latencia en memoria (para comparar antes/después de un cambio).
+
+Cada métrica guarda las últimas muestras en un ring buffer; `resumen()`
+da cantidad, última, p50, p90 y máximo. Las reporta el server (render del
+shell de /tv) y el player vía POST /api/metrics (tiempo al primer frame).
+Se consultan con GET /api/metrics. No se persisten: se reinician con Flask.
+"""
+
+import math
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+MUESTRAS = 200
+MAX_SERIES = 32     # series creadas desde afuera (POST): tope para no crecer sin fin
+NOMBRE_VALIDO = re.compile(r"^[a-z0-9_]{1,40}$")
+
+
+def _percentil(ordenados, p):
+    if not ordenados:
+        return None
+    i = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[i]
+
+
+class Metrics:
+    def __init__(self, muestras=MUESTRAS):
+        self.muestras = muestras
+        self._lock = threading.Lock()
+        self._series = {}   # nombre -> deque de {"ms", "t", ...etiquetas}
+        self._externas = 0  # series creadas por record(externa=True)
+
+    def record(self, nombre, ms, externa=False, **etiquetas):
+        """externa=True: el nombre viene de un cliente y cuenta para MAX_SERIES."""
+        if not NOMBRE_VALIDO.match(nombre or ""):
+            raise ValueError(f"nombre de métrica inválido: {nombre!r}")
+        ms = float(ms)
+        if not math.isfinite(ms):
+            raise ValueError(f"valor no finito para {nombre}: {ms}")
+        muestra = {"ms": round(ms, 1), "t": time.time(), **etiquetas}
+        with self._lock:
+            serie = self._series.get(nombre)
+            if serie is None:
+                if externa:
+                    if self._externas >= MAX_SERIES:
+                        raise ValueError(f"demasiadas métricas distintas (máx. {MAX_SERIES})")
+                    self._externas += 1
+                serie = self._series[nombre] = deque(maxlen=self.muestras)
+            serie.append(muestra)
+
+    @contextmanager
+    def medir(self, nombre, **etiquetas):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(nombre, (time.perf_counter() - t0) * 1000, **etiquetas)
+
+    def resumen(self, nombre=None):
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items() if nombre in (None, k)}
+        out = {}
+        for k, muestras in series.items():
+            ms = sorted(m["ms"] for m in muestras)
+            out[k] = {
+                "n": len(ms),
+                "ultima": muestras[-1]["ms"],
+                "p50": _percentil(ms, 50),
+                "p90": _percentil(ms, 90),
+                "max": ms[-1],
+                "recientes": muestras[-10:],
+            }
+        return out
+
+
+metrics = Metrics()
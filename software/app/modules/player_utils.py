@@ -1,41 +1,90 @@
-import json
+import sys
+import threading
 from pathlib import Path
-    
-videos_en_cola = []
-indice_video_actual = 0
 
-def cambiar_canal(nuevo_canal_id, resetear_cola=True):
+APP_DIR = Path(__file__).resolve().parents[1]
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))  # para importar modules.* desde el encoder
+
+from modules.repository import repo
+from modules.state_store import state_store
+from modules.tag_index import TagIndex
+
 
-    global videos_en_cola, indice_video_actual
+class ColasPorCanal:
+    """
+    Colas de videos precalculadas para todos los canales.
 
-    with open("/srv/tvargenta/content/canal_activo.json", "w", encoding="utf-8") as f:
-        json.dump({"canal_id": nuevo_canal_id}, f, indent=2)
+    Se apoyan en el repo (caché que se invalida sola cuando cambian los JSON o
+    la base) y en un TagIndex propio: mientras el catálogo y la vista de un
+    canal no cambien, su cola es la misma lista ya armada.
+    """
 
-    with open("/srv/tvargenta/content/canales.json", "r", encoding="utf-8") as f:
-        canales = json.load(f)
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = TagIndex()
+        self._colas = {}   # canal_id -> (view.generation, [video_ids])
 
-    with open("/srv/tvargenta/content/metadata.json", "r", encoding="utf-8") as f:
-        metadata = json.load(f)
+    def refrescar(self):
+        canales = repo.canales()
+        excluidos = repo.config().get("tags_excluidos", [])
+        with self._lock:
+            self._index.sync(repo.metadata(), repo.generation())
+            for canal_id, info in canales.items():
+                prioridad = info.get("tags_prioridad", [])
+                view = self._index.channel_view(canal_id, prioridad, prioridad, excluidos)
+                actual = self._colas.get(canal_id)
+                if actual is None or actual[0] != view.generation:
+                    self._colas[canal_id] = (view.generation, view.ordered())
+            for canal_id in set(self._colas) - set(canales):
+                del self._colas[canal_id]
+        return self
 
-    with open("/srv/tvargenta/content/configuracion.json", "r", encoding="utf-8") as f:
-        configuracion = json.load(f)
-        tags_excluidos = set(configuracion.get("tags_excluidos", []))
+    def cola(self, canal_id):
+        """Lista compartida (no modificar): es la misma hasta que cambie el canal."""
+        self.refrescar()
+        return self._colas.get(canal_id, (0, []))[1]
 
-    canal_info = canales.get(nuevo_canal_id, {})
-    tags_prioridad = set(canal_info.get("tags_prioridad", []))
+    def dump(self, canal_id=None):
+        self.refrescar()
+        ids = [canal_id] if canal_id is not None else list(self._colas)
+        lineas = []
+        for cid in ids:
+            cola = self._colas.get(cid, (0, []))[1]
+            lineas.append(f"[CANAL] {cid}: {len(cola)} video(s)")
+            lineas.extend(f"  {i+1}. {vid}" for i, vid in enumerate(cola))
+        return "\n".join(lineas)
+
+
+colas = ColasPorCanal()
+
+canal_en_cola = None
+videos_en_cola = []
+indice_video_actual = 0
+
+def cambiar_canal(nuevo_canal_id, resetear_cola=True):
+
+    global canal_en_cola, videos_en_cola, indice_video_actual
+
+    repo.set_canal_activo(nuevo_canal_id)
+    state_store.flush()  # que Flask vea el canal nuevo antes del trigger de reload
 
     if resetear_cola:
-        videos_en_cola.clear()
-        for video_id, datos in metadata.items():
-            video_tags = set(datos.get("tags", []))
-            if tags_prioridad & video_tags and not (video_tags & tags_excluidos):
-                videos_en_cola.append(video_id)
+        # cambiar de canal = apuntar a la cola ya armada
+        canal_en_cola = nuevo_canal_id
+        videos_en_cola = colas.cola(nuevo_canal_id)
         indice_video_actual = 0
 
     if videos_en_cola:
         print(f"[CANAL] {nuevo_canal_id} tiene {len(videos_en_cola)} video(s) válidos.")
-        print(f"[DEBUG] Lista de videos en cola para {nuevo_canal_id}:")
-        for i, vid in enumerate(videos_en_cola):
-            print(f"  {i+1}. {vid}")
     else:
         print(f"[CANAL] No hay videos válidos para el canal {nuevo_canal_id}")
+
+def dump_cola(canal_id=None):
+    """Lista de la cola de un canal (o de todos) para depurar, a pedido."""
+    return colas.dump(canal_id)
+
+
+if __name__ == "__main__":
+    # python modules/player_utils.py [canal_id]
+    print(dump_cola(sys.argv[1] if len(sys.argv) > 1 else None))
@@ -0,0 +1,222 @@
+# SPDX-License-Identifier: LicenseRef-TVArgenta-NC-Attribution-Consult-First
+# Proyecto: TVArgenta — Retro TV
+# Autor: Ricardo Sappia contact:rsflightronics@gmail.com
+# © 2025 Ricardo Sappia. Todos los derechos reservados.
+# Licencia: No comercial, atribución y consulta previa. Se distribuye TAL CUAL, sin garantías.
+# Ver LICENSE para términos completos.
+
+"""
+Journal append-only de reproducciones.
+
+Cada play se agrega como una línea chica `["video_id", "iso_ts"]` a plays.log
+y actualiza los totales en memoria al toque. Un hilo de fondo compacta el
+journal en el snapshot plays.json cada tanto tiempo o cuando el log supera
+un tamaño, así no reescribimos (ni fsync-eamos) todo el JSON en cada video.
+
+Compactación: el log se renombra a `.compacting`, se escribe el snapshot y
+recién ahí se borra. Cada log arranca con una línea `{"compactacion": N}`
+(número creciente) y el snapshot guarda el N del último log que plegó; si al
+arrancar encontramos un `.compacting` con N mayor que el del snapshot, no
+llegó a plegarse y lo volvemos a aplicar. El mtime no sirve para esto:
+os.replace conserva el del log y un play viejo puede ser de después del
+snapshot anterior.
+"""
+
+import copy
+import json
+import logging
+import os
+import shutil
+import threading
+from datetime import datetime, UTC
+from pathlib import Path
+
+from modules.state_store import state_store
+from settings import PLAYS_FILE, PLAYS_JOURNAL_FILE
+
+logger = logging.getLogger("tvargenta")
+
+COMPACT_EVERY_S = 300.0        # compactar cada 5 min si hubo plays
+COMPACT_MAX_BYTES = 64 * 1024  # ...o antes si el log creció más que esto
+SEQ_KEY = "__compactacion__"   # en el snapshot: último log plegado (no es un video)
+
+
+class PlaysJournal:
+    def __init__(self, snapshot_path, log_path,
+                 compact_every=COMPACT_EVERY_S, compact_max_bytes=COMPACT_MAX_BYTES):
+        self.snapshot_path = Path(snapshot_path)
+        self.log_path = Path(log_path)
+        self.compacting_path = self.log_path.with_suffix(self.log_path.suffix + ".compacting")
+        self.compact_every = compact_every
+        self.compact_max_bytes = compact_max_bytes
+        self._lock = threading.Lock()
+        self._compact_lock = threading.Lock()   # una compactación a la vez (fondo vs. atexit)
+        self._wake = threading.Event()
+        self._thread = None
+        self._log = None
+        self._pending = 0
+        self._seq = 0          # N del último log abierto
+        self._loaded = False
+        self._totals = {}
+
+    # --- Lectura ------------------------------------------------------------
+    @property
+    def totals(self):
+        """{video_id: {"plays": int, "last_played": iso}} (no modificar)."""
+        if not self._loaded:
+            self.load()
+        return self._totals
+
+    def load(self):
+        with self._lock:
+            if self._loaded:
+                return
+            try:
+                with self.snapshot_path.open("r", encoding="utf-8") as f:
+                    self._totals = json.load(f)
+            except FileNotFoundError:
+                self._totals = {}
+            except Exception as e:
+                logger.warning(f"[PLAYS] snapshot ilegible, arranco vacío: {e}")
+                self._totals = {}
+            snap_seq = self._totals.pop(SEQ_KEY, None)
+            self._seq = int(snap_seq or 0)
+
+            if self.compacting_path.exists():
+                seq = self._leer_seq(self.compacting_path)
+                if seq is not None:
+                    plegado = snap_seq is not None and seq <= int(snap_seq)
+                else:
+                    # .compacting de antes de los números: criterio viejo
+                    plegado = self._mtime(self.compacting_path) < self._mtime(self.snapshot_path)
+                if plegado:
+                    self.compacting_path.unlink(missing_ok=True)
+                else:
+                    self._replay(self.compacting_path)
+                    self._pending += 1
+            if self.log_path.exists():
+                self._pending += self._replay(self.log_path)
+                self._seq = max(self._seq, self._leer_seq(self.log_path) or 0)
+            self._loaded = True
+
+    def _leer_seq(self, path):
+        """N de la primera línea del log, o None si no tiene (log viejo)."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                cabecera = json.loads(f.readline())
+            seq = int(cabecera["compactacion"])
+        except Exception:
+            return None
+        self._seq = max(self._seq, seq)
+        return seq
+
+    @staticmethod
+    def _mtime(path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    def _replay(self, path):
+        n = 0
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    video_id, when = json.loads(line)
+                except Exception:
+                    continue  # cabecera, o línea truncada por un corte de luz
+                self._apply(video_id, when)
+                n += 1
+        return n
+
+    def _apply(self, video_id, when):
+        item = self._totals.get(video_id)
+        if item is None:
+            item = self._totals[video_id] = {"plays": 0, "last_played": None}
+        item["plays"] = int(item.get("plays", 0)) + 1
+        item["last_played"] = when
+        return item
+
+    # --- Escritura ------------------------------------------------------------
+    def record(self, video_id):
+        if not self._loaded:
+            self.load()
+        when = datetime.now(UTC).isoformat()
+        with self._lock:
+            item = self._apply(video_id, when)
+            if self._log is None:
+                self.log_path.parent.mkdir(parents=True, exist_ok=True)
+                self._log = open(self.log_path, "a", encoding="utf-8")
+                if self._log.tell() == 0:
+                    self._seq += 1
+                    self._log.write(json.dumps({"compactacion": self._seq}) + "\n")
+            self._log.write(json.dumps([video_id, when], ensure_ascii=False) + "\n")
+            self._log.flush()  # sin fsync: lo hace la compactación
+            self._pending += 1
+            if self._log.tell() >= self.compact_max_bytes:
+                self._wake.set()
+            return dict(item)
+
+    def compact(self):
+        # serializada: dos compactaciones pisarían el .compacting y una foto
+        # vieja podría escribirse después de una nueva
+        with self._compact_lock:
+            with self._lock:
+                if not self._pending:
+                    return False
+                if self._log is not None:
+                    self._log.close()
+                    self._log = None
+                if self.log_path.exists():
+                    self._rotar_log()
+                snapshot = copy.deepcopy(self._totals)
+                snapshot[SEQ_KEY] = self._seq   # ya no queda log abierto con N <= este
+                n = self._pending
+                self._pending = 0
+            if not state_store.write_now(self.snapshot_path, snapshot):
+                return False  # el .compacting queda y se re-aplica al arrancar
+            self.compacting_path.unlink(missing_ok=True)
+            logger.info(f"[PLAYS] journal compactado ({n} plays) -> {self.snapshot_path}")
+            return True
+
+    def _rotar_log(self):
+        """
+        log -> .compacting; si quedó uno de una compactación fallida, se le
+        agrega (conserva su cabecera, que es el N más chico: se re-aplica
+        entero hasta que un snapshot lo cubra).
+        """
+        if not self.compacting_path.exists():
+            os.replace(self.log_path, self.compacting_path)
+            return
+        with open(self.log_path, "rb") as src, open(self.compacting_path, "ab") as dst:
+            shutil.copyfileobj(src, dst)
+            dst.flush()
+            os.fsync(dst.fileno())
+        self.log_path.unlink()
+
+    # --- Hilo de fondo ------------------------------------------------------------
+    def start(self):
+        if self._thread is not None:
+            return
+        self.load()
+        self._thread = threading.Thread(target=self._run, name="plays-journal", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.compact_every)
+            self._wake.clear()
+            try:
+                self.compact()
+            except Exception as e:
+                logger.error(f"[PLAYS] error compactando journal: {e}")
+
+    def close(self):
+        # compact() espera a la compactación de fondo que esté en curso
+        try:
+            self.compact()
+        except Exception as e:
+            logger.error(f"[PLAYS] error compactando al salir: {e}")
+
+
+plays_journal = PlaysJournal(PLAYS_FILE, PLAYS_JOURNAL_FILE)
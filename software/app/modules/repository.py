@@ -0,0 +1,438 @@
+# SPDX-License-Identifier: LicenseRef-TVArgenta-NC-Attribution-Consult-First
+# Proyecto: TVArgenta — Retro TV
+# Autor: Ricardo Sappia contact:rsflightronics@gmail.com
+# © 2025 Ricardo Sappia. Todos los derechos reservados.
+# Licencia: No comercial, atribución y consulta previa. Se distribuye TAL CUAL, sin garantías.
+# Ver LICENSE para términos completos.
+
+"""
+Repositorio de contenido: metadata, tags, canales, config, canal activo y plays.
+
+Dos backends con la misma interfaz, elegidos con TVARGENTA_STORAGE:
+  - "json"   (default): los JSON de siempre vía catálogo + journal de plays.
+  - "sqlite": una sola base SQLite en modo WAL con tablas indexadas
+              (videos, video_tags, channels, plays, kv).
+
+Los getters devuelven dicts cacheados en memoria (no copias): quien los
+modifica en el lugar guarda con el save_* correspondiente. Las operaciones
+por entidad (put_video, delete_video, remove_tags, record_play) en SQLite
+son una sentencia indexada, no un parse-and-rewrite del JSON.
+
+Uso por línea de comandos (desde software/app):
+    python -m modules.repository migrate   # JSON -> SQLite
+    python -m modules.repository export    # SQLite -> JSON
+"""
+
+import copy
+import json
+import logging
+import sqlite3
+import sys
+import threading
+from datetime import datetime, UTC
+
+from settings import (
+    METADATA_FILE, TAGS_FILE, CONFIG_FILE, CANALES_FILE, CANAL_ACTIVO_FILE,
+    PLAYS_FILE, STORAGE_BACKEND, SQLITE_DB_FILE,
+)
+
+logger = logging.getLogger("tvargenta")
+
+DEFAULT_CONFIG = {"tags_prioridad": [], "tags_incluidos": []}
+
+
+class JsonRepository:
+    backend = "json"
+
+    def __init__(self):
+        from modules.catalog import catalog
+        from modules.plays_journal import plays_journal
+        self._catalog = catalog
+        self._plays = plays_journal
+
+    def start(self):
+        self._plays.start()
+
+    def close(self):
+        self._plays.close()
+
+    def generation(self):
+        return self._catalog.generation("metadata")
+
+    # --- metadata ---
+    def metadata(self):
+        return self._catalog.get("metadata")
+
+    def save_metadata(self, data):
+        self._catalog.save("metadata", data)
+
+    # Las modificaciones en el lugar van con el lock del catálogo: el escritor
+    # de fondo serializa la misma estructura (ver Catalog._foto).
+    def put_video(self, video_id, info):
+        with self._catalog.lock:
+            data = self.metadata()
+            data[video_id] = info
+        self.save_metadata(data)
+
+    def put_videos(self, videos):
+        """Varios videos de una (importador): una sola escritura del JSON."""
+        with self._catalog.lock:
+            data = self.metadata()
+            data.update(videos)
+        self.save_metadata(data)
+
+    def delete_video(self, video_id):
+        with self._catalog.lock:
+            data = self.metadata()
+            borrado = data.pop(video_id, None) is not None
+        if borrado:
+            self.save_metadata(data)
+
+    def remove_tags(self, tags):
+        tags = set(tags)
+        with self._catalog.lock:
+            data = self.metadata()
+            for video in data.values():
+                if tags.intersection(video.get("tags", [])):
+                    video["tags"] = [t for t in video["tags"] if t not in tags]
+        self.save_metadata(data)
+
+    # --- tags / config / canales ---
+    def tags(self):
+        return self._catalog.get("tags")
+
+    def save_tags(self, data):
+        self._catalog.save("tags", data)
+
+    def config(self):
+        return self._catalog.get("config")
+
+    def save_config(self, data):
+        self._catalog.save("config", data)
+
+    def canales(self):
+        return self._catalog.get("canales")
+
+    def save_canales(self, data):
+        self._catalog.save("canales", data)
+
+    def canal_activo(self):
+        return self._catalog.get("canal_activo").get("canal_id", "base")
+
+    def set_canal_activo(self, canal_id):
+        self._catalog.save("canal_activo", {"canal_id": canal_id})
+
+    # --- plays ---
+    def plays(self):
+        return self._plays.totals
+
+    def record_play(self, video_id):
+        return self._plays.record(video_id)
+
+
+class SqliteRepository:
+    backend = "sqlite"
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS videos (
+        id    TEXT PRIMARY KEY,
+        data  TEXT NOT NULL            -- JSON del video sin "tags"
+    );
+    CREATE TABLE IF NOT EXISTS video_tags (
+        video_id TEXT NOT NULL REFERENCES videos(id) ON DELETE CASCADE,
+        tag      TEXT NOT NULL,
+        pos      INTEGER NOT NULL,
+        PRIMARY KEY (video_id, tag)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_video_tags_tag ON video_tags(tag);
+    CREATE TABLE IF NOT EXISTS channels (
+        id    TEXT PRIMARY KEY,
+        pos   INTEGER NOT NULL,
+        data  TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS plays (
+        video_id    TEXT PRIMARY KEY,
+        plays       INTEGER NOT NULL DEFAULT 0,
+        last_played TEXT
+    );
+    CREATE TABLE IF NOT EXISTS kv (
+        key   TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    );
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = None
+        self._data_version = None
+        self._generation = 0
+        self._cache = {}
+
+    # --- conexión ---
+    def _db(self):
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # en WAL: sin fsync por commit
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.executescript(self.SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _tx(self):
+        return _Transaction(self._db())
+
+    def _fresh(self):
+        """
+        Descarta la caché si otro proceso (migración, importador) escribió la base.
+        data_version no cambia con los commits de esta misma conexión.
+        """
+        version = self._db().execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:
+            self._data_version = version
+            self._cache = {}
+            self._generation += 1
+
+    def _cached(self, key, loader):
+        with self._lock:
+            self._fresh()
+            if key not in self._cache:
+                self._cache[key] = loader()
+            return self._cache[key]
+
+    def start(self):
+        with self._lock:
+            db = self._db()
+            vacia = db.execute("SELECT NOT EXISTS (SELECT 1 FROM kv)").fetchone()[0]
+        if vacia:
+            logger.info("[REPO] base SQLite vacía: migrando desde los JSON")
+            self.migrate_from_json()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def generation(self):
+        with self._lock:
+            self._fresh()
+            return self._generation
+
+    # --- metadata ---
+    def _load_metadata(self):
+        db = self._db()
+        data = {vid: json.loads(raw) for vid, raw in db.execute("SELECT id, data FROM videos")}
+        for info in data.values():
+            info["tags"] = []
+        for vid, tag in db.execute("SELECT video_id, tag FROM video_tags ORDER BY video_id, pos"):
+            data[vid]["tags"].append(tag)
+        return data
+
+    def metadata(self):
+        return self._cached("metadata", self._load_metadata)
+
+    def save_metadata(self, data):
+        """Guardado completo (p.ej. después de editar varios videos en el lugar)."""
+        with self._lock, self._tx() as db:
+            db.execute("DELETE FROM videos")
+            for vid, info in data.items():
+                self._insert_video(db, vid, info)
+            if self._cache.get("metadata") is not data:
+                self._generation += 1
+            self._cache["metadata"] = data
+
+    @staticmethod
+    def _insert_video(db, video_id, info):
+        body = {k: v for k, v in info.items() if k != "tags"}
+        db.execute(
+            "INSERT INTO videos(id, data) VALUES(?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET data = excluded.data",
+            (video_id, json.dumps(body, ensure_ascii=False)),
+        )
+        db.execute("DELETE FROM video_tags WHERE video_id = ?", (video_id,))
+        db.executemany(
+            "INSERT OR IGNORE INTO video_tags(video_id, tag, pos) VALUES(?, ?, ?)",
+            [(video_id, tag, i) for i, tag in enumerate(info.get("tags", []))],
+        )
+
+    def put_video(self, video_id, info):
+        with self._lock:
+            data = self.metadata()
+            with self._tx() as db:
+                self._insert_video(db, video_id, info)
+            data[video_id] = info
+
+    def put_videos(self, videos):
+        """Varios videos en una sola transacción."""
+        with self._lock:
+            data = self.metadata()
+            with self._tx() as db:
+                for vid, info in videos.items():
+                    self._insert_video(db, vid, info)
+            data.update(videos)
+
+    def delete_video(self, video_id):
+        with self._lock:
+            data = self.metadata()
+            with self._tx() as db:
+                db.execute("DELETE FROM videos WHERE id = ?", (video_id,))
+            data.pop(video_id, None)
+
+    def remove_tags(self, tags):
+        tags = list(set(tags))
+        if not tags:
+            return
+        with self._lock:
+            data = self.metadata()
+            marks = ",".join("?" * len(tags))
+            with self._tx() as db:
+                afectados = [r[0] for r in db.execute(
+                    f"DELETE FROM video_tags WHERE tag IN ({marks}) RETURNING video_id", tags)]
+            quitar = set(tags)
+            for vid in afectados:
+                if vid in data:
+                    data[vid]["tags"] = [t for t in data[vid].get("tags", []) if t not in quitar]
+
+    # --- kv: tags / config / canal activo ---
+    def _kv_get(self, key, default):
+        row = self._db().execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else copy.deepcopy(default)
+
+    def _kv_set(self, key, value):
+        with self._lock, self._tx() as db:
+            db.execute(
+                "INSERT INTO kv(key, value) VALUES(?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, json.dumps(value, ensure_ascii=False)),
+            )
+            self._cache[key] = value
+
+    def tags(self):
+        return self._cached("tags", lambda: self._kv_get("tags", {}))
+
+    def save_tags(self, data):
+        self._kv_set("tags", data)
+
+    def config(self):
+        return self._cached("config", lambda: self._kv_get("config", DEFAULT_CONFIG))
+
+    def save_config(self, data):
+        self._kv_set("config", data)
+
+    def canal_activo(self):
+        return self._cached("canal_activo", lambda: self._kv_get("canal_activo", {})).get("canal_id", "base")
+
+    def set_canal_activo(self, canal_id):
+        self._kv_set("canal_activo", {"canal_id": canal_id})
+
+    # --- canales (el orden importa: es el orden del zapping) ---
+    def canales(self):
+        return self._cached("canales", lambda: {
+            cid: json.loads(raw)
+            for cid, raw in self._db().execute("SELECT id, data FROM channels ORDER BY pos")
+        })
+
+    def save_canales(self, data):
+        with self._lock, self._tx() as db:
+            db.execute("DELETE FROM channels")
+            db.executemany(
+                "INSERT INTO channels(id, pos, data) VALUES(?, ?, ?)",
+                [(cid, i, json.dumps(info, ensure_ascii=False)) for i, (cid, info) in enumerate(data.items())],
+            )
+            self._cache["canales"] = data
+
+    # --- plays ---
+    def plays(self):
+        return self._cached("plays", lambda: {
+            vid: {"plays": n, "last_played": last}
+            for vid, n, last in self._db().execute("SELECT video_id, plays, last_played FROM plays")
+        })
+
+    def record_play(self, video_id):
+        when = datetime.now(UTC).isoformat()
+        with self._lock:
+            totals = self.plays()
+            n, last = self._db().execute(
+                "INSERT INTO plays(video_id, plays, last_played) VALUES(?, 1, ?) "
+                "ON CONFLICT(video_id) DO UPDATE SET plays = plays + 1, last_played = excluded.last_played "
+                "RETURNING plays, last_played",
+                (video_id, when),
+            ).fetchone()
+            item = totals[video_id] = {"plays": n, "last_played": last}
+            return dict(item)
+
+    # --- migración / export ---
+    def migrate_from_json(self):
+        def leer(path, default):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except FileNotFoundError:
+                return copy.deepcopy(default)
+
+        # el journal lee plays.json y le suma las reproducciones sin compactar
+        from modules.plays_journal import plays_journal
+        plays = plays_journal.totals
+
+        self.save_metadata(leer(METADATA_FILE, {}))
+        self.save_tags(leer(TAGS_FILE, {}))
+        self.save_config(leer(CONFIG_FILE, DEFAULT_CONFIG))
+        self.save_canales(leer(CANALES_FILE, {}))
+        self._kv_set("canal_activo", leer(CANAL_ACTIVO_FILE, {}))
+        with self._lock, self._tx() as db:
+            db.execute("DELETE FROM plays")
+            db.executemany(
+                "INSERT INTO plays(video_id, plays, last_played) VALUES(?, ?, ?)",
+                [(vid, int(p.get("plays", 0)), p.get("last_played")) for vid, p in plays.items()],
+            )
+            self._cache.pop("plays", None)
+        logger.info(f"[REPO] migración JSON -> SQLite lista ({self.path})")
+
+    def export_to_json(self):
+        from modules.state_store import state_store
+        state_store.write_now(METADATA_FILE, self.metadata())
+        state_store.write_now(TAGS_FILE, self.tags())
+        state_store.write_now(CONFIG_FILE, self.config())
+        state_store.write_now(CANALES_FILE, self.canales())
+        state_store.write_now(CANAL_ACTIVO_FILE, {"canal_id": self.canal_activo()})
+        state_store.write_now(PLAYS_FILE, self.plays())
+        logger.info("[REPO] export SQLite -> JSON listo")
+
+
+class _Transaction:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+def open_repository(backend=STORAGE_BACKEND):
+    if backend == "sqlite":
+        return SqliteRepository(SQLITE_DB_FILE)
+    return JsonRepository()
+
+
+repo = open_repository()
+
+
+if __name__ == "__main__":
+    accion = sys.argv[1] if len(sys.argv) > 1 else ""
+    sqlite_repo = repo if isinstance(repo, SqliteRepository) else SqliteRepository(SQLITE_DB_FILE)
+    if accion == "migrate":
+        sqlite_repo.migrate_from_json()
+        print(f"✅ Migrado a {SQLITE_DB_FILE}")
+    elif accion == "export":
+        sqlite_repo.export_to_json()
+        print("✅ Exportado a los JSON de content/")
+    else:
+        print("Uso: python -m modules.repository [migrate|export]")
+        sys.exit(2)
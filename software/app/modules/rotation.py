@@ -0,0 +1,136 @@
+# SPDX-License-Identifier: LicenseRef-TVArgenta-NC-Attribution-Consult-First
+# Proyecto: TVArgenta — Retro TV
+# Autor: Ricardo Sappia contact:rsflightronics@gmail.com
+# © 2025 Ricardo Sappia. Todos los derechos reservados.
+# Licencia: No comercial, atribución y consulta previa. Se distribuye TAL CUAL, sin garantías.
+# Ver LICENSE para términos completos.
+
+"""
+Rotación por canal ("ya mostrados en esta vuelta"), compacta y persistente.
+
+Cada video recibe una vez un índice estable (no se reusa aunque se borre el
+video). Cada canal guarda un bitset (int de Python) con los índices ya
+mostrados y un número de vuelta (epoch). Marcar y consultar es un test de
+bit; cuando el canal se agota, `new_epoch()` sube el epoch y vacía el
+bitset sin recorrer nada.
+
+Se persiste en ROTATION_FILE por state_store (writes coalescidos): los bits
+van como hex, así mil videos ocupan ~250 bytes por canal y un reinicio
+retoma la rotación donde estaba.
+"""
+
+import json
+import logging
+import threading
+
+from modules.state_store import state_store
+from settings import ROTATION_FILE
+
+logger = logging.getLogger("tvargenta")
+
+
+class Shown:
+    """Vista de sólo lectura de los mostrados de un canal (para `in`)."""
+    __slots__ = ("_indices", "_bits")
+
+    def __init__(self, indices, bits):
+        self._indices = indices
+        self._bits = bits
+
+    def __contains__(self, video_id):
+        i = self._indices.get(video_id)
+        return i is not None and bool(self._bits >> i & 1)
+
+    def __len__(self):
+        return bin(self._bits).count("1")   # int.bit_count() recién en 3.10
+
+
+class Rotation:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._indices = None   # video_id -> índice estable
+        self._next = 0         # próximo índice a asignar
+        self._canales = {}     # canal_id -> [epoch, bits]
+
+    def _load(self):
+        if self._indices is not None:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except FileNotFoundError:
+            raw = {}
+        except Exception as e:
+            logger.warning(f"[ROT] rotación ilegible, arranco de cero: {e}")
+            raw = {}
+        self._indices = {k: int(v) for k, v in raw.get("indices", {}).items()}
+        self._next = max(int(raw.get("next", 0)), max(self._indices.values(), default=-1) + 1)
+        self._canales = {
+            cid: [int(c.get("epoch", 0)), int(c.get("bits", "0"), 16)]
+            for cid, c in raw.get("canales", {}).items()
+        }
+
+    def _save(self):
+        state_store.write(self.path, {
+            "next": self._next,
+            "indices": dict(self._indices),
+            "canales": {cid: {"epoch": e, "bits": format(b, "x")} for cid, (e, b) in self._canales.items()},
+        }, indent=None)
+
+    def _index(self, video_id):
+        i = self._indices.get(video_id)
+        if i is None:
+            i = self._indices[video_id] = self._next
+            self._next += 1
+        return i
+
+    # --- API ------------------------------------------------------------
+    def shown(self, canal_id):
+        """Mostrados del canal en la vuelta actual (foto del bitset)."""
+        with self._lock:
+            self._load()
+            return Shown(self._indices, self._canales.get(canal_id, [0, 0])[1])
+
+    def epoch(self, canal_id):
+        with self._lock:
+            self._load()
+            return self._canales.get(canal_id, [0, 0])[0]
+
+    def mark(self, canal_id, video_id):
+        with self._lock:
+            self._load()
+            estado = self._canales.setdefault(canal_id, [0, 0])
+            estado[1] |= 1 << self._index(video_id)
+            self._save()
+
+    def new_epoch(self, canal_id):
+        """Canal agotado: nueva vuelta con el bitset vacío. Devuelve el epoch nuevo."""
+        with self._lock:
+            self._load()
+            estado = self._canales.setdefault(canal_id, [0, 0])
+            estado[0] += 1
+            estado[1] = 0
+            self._save()
+            logger.info(f"[ROT] canal={canal_id} vuelta {estado[0]}")
+            return estado[0]
+
+    def forget(self, video_id):
+        """Video borrado: suelta su índice (el índice no se reusa)."""
+        with self._lock:
+            self._load()
+            i = self._indices.pop(video_id, None)
+            if i is None:
+                return
+            for estado in self._canales.values():
+                estado[1] &= ~(1 << i)
+            self._save()
+
+    def drop_channel(self, canal_id):
+        with self._lock:
+            self._load()
+            if self._canales.pop(canal_id, None) is not None:
+                self._save()
+
+
+rotation = Rotation(ROTATION_FILE)
@@ -0,0 +1,199 @@
+# SPDX-License-Identifier: LicenseRef-TVArgenta-NC-Attribution-Consult-First
+# Proyecto: TVArgenta — Retro TV
+# Autor: Ricardo Sappia contact:rsflightronics@gmail.com
+# © 2025 Ricardo Sappia. Todos los derechos reservados.
+# Licencia: No comercial, atribución y consulta previa. Se distribuye TAL CUAL, sin garantías.
+# Ver LICENSE para términos completos.
+
+"""
+Scheduler de "fairness" por canal.
+
+Mantiene un heap con los candidatos todavía no mostrados del canal, ordenados
+por (plays_norm, last_played, -tag_score, jitter). Elegir es O(log n) y un play
+reportado actualiza una sola entrada; el heap se reconstruye únicamente cuando
+cambia la vista del canal o el catálogo.
+
+Lookahead: `reservar(n)` saca del heap los próximos n picks y los deja en una
+cola de reservados (no mostrados todavía). `peek()` devuelve primero el
+reservado de adelante, así el clip que el player precargó es el que sale.
+Un rebuild (cambio de catálogo o de vista) o `liberar()` (cambio de canal)
+los devuelve al heap.
+"""
+
+import heapq
+import math
+import random
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+
+def iso_to_ts(iso_str):
+    if not iso_str:
+        return 0.0
+    try:
+        return datetime.fromisoformat(iso_str.replace("Z", "")).timestamp()
+    except Exception:
+        return 0.0
+
+
+def fair_key(video_id, metadata, plays_map, tag_score):
+    md = metadata.get(video_id, {})
+    dur = float(md.get("duracion", 0.0) or 0.0)  # segundos
+    minutes = max(1, math.ceil(dur / 60.0))
+
+    pinfo = plays_map.get(video_id) or {}
+    plays = int(pinfo.get("plays", 0))
+    last_ts = iso_to_ts(pinfo.get("last_played"))
+
+    # asc: menos plays_norm, menos reciente, mayor prioridad de tags, jitter
+    # (el jitter se sortea una vez por entrada, no en cada comparación)
+    return (plays / minutes, last_ts, -tag_score, random.random() * 0.01)
+
+
+class ChannelScheduler:
+    def __init__(self, canal_id):
+        self.canal_id = canal_id
+        self.signature = None
+        self._lock = threading.Lock()
+        self._heap = []
+        self._entries = {}   # video_id -> [key, video_id, vigente] (incluye reservados)
+        self._reservas = OrderedDict()   # video_id -> True, en orden de salida
+        self._tag_score = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, video_id):
+        return video_id in self._entries
+
+    def rebuild(self, view, metadata, plays_map, exclude=(), signature=None):
+        with self._lock:
+            self._tag_score = dict(view.tag_score)
+            self._entries = {}
+            for video_id in view.candidates:
+                if video_id in exclude or video_id not in metadata:
+                    continue
+                key = fair_key(video_id, metadata, plays_map, self._tag_score[video_id])
+                self._entries[video_id] = [key, video_id, True]
+            self._heap = list(self._entries.values())
+            heapq.heapify(self._heap)
+            self._reservas.clear()
+            self.signature = signature
+
+    def update(self, video_id, metadata, plays_map):
+        """Reubica un video después de un play: O(log n)."""
+        with self._lock:
+            entry = self._entries.get(video_id)
+            if entry is None:
+                return
+            entry[2] = False
+            key = fair_key(video_id, metadata, plays_map, self._tag_score.get(video_id, 0))
+            if video_id in self._reservas:
+                # reservado: conserva su lugar en la cola, sólo se actualiza la clave
+                self._entries[video_id] = [key, video_id, False]
+                return
+            nueva = [key, video_id, True]
+            self._entries[video_id] = nueva
+            heapq.heappush(self._heap, nueva)
+
+    def _top(self):
+        heap = self._heap
+        while heap and not heap[0][2]:
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def peek(self):
+        """Devuelve (video_id, key) del próximo (reservado o mejor candidato), o None."""
+        with self._lock:
+            if self._reservas:
+                video_id = next(iter(self._reservas))
+                return video_id, self._entries[video_id][0]
+            top = self._top()
+            if top is None:
+                return None
+            key, video_id, _ = top
+            return video_id, key
+
+    def reservar(self, n):
+        """Completa la cola de reservados hasta n y la devuelve (lista de video_id)."""
+        with self._lock:
+            while len(self._reservas) < n:
+                top = self._top()
+                if top is None:
+                    break
+                top[2] = False   # fuera del heap, sigue en _entries
+                self._reservas[top[1]] = True
+            return list(self._reservas)[:n]
+
+    def reservados(self):
+        with self._lock:
+            return list(self._reservas)
+
+    def liberar(self):
+        """Devuelve los reservados al heap (p.ej. al salir del canal)."""
+        with self._lock:
+            for video_id in self._reservas:
+                entry = self._entries.get(video_id)
+                if entry is not None:
+                    nueva = [entry[0], video_id, True]
+                    self._entries[video_id] = nueva
+                    heapq.heappush(self._heap, nueva)
+            self._reservas.clear()
+
+    def take(self, video_id):
+        """Marca el video como mostrado: sale del heap hasta el próximo rebuild."""
+        with self._lock:
+            entry = self._entries.pop(video_id, None)
+            if entry is not None:
+                entry[2] = False
+            self._reservas.pop(video_id, None)
+
+
+class SchedulerRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_canal = {}
+
+    def get(self, canal_id, view, metadata, plays_map, catalog_signature, exclude=()):
+        """
+        Scheduler del canal, reconstruido sólo si cambió la vista del canal
+        (tags/config) o el catálogo (metadata releído de disco).
+        """
+        signature = (id(view), view.generation, catalog_signature)
+        with self._lock:
+            sched = self._by_canal.get(canal_id)
+            if sched is None:
+                sched = self._by_canal[canal_id] = ChannelScheduler(canal_id)
+        if sched.signature != signature:
+            sched.rebuild(view, metadata, plays_map, exclude=exclude, signature=signature)
+        return sched
+
+    def record_play(self, video_id, metadata, plays_map):
+        with self._lock:
+            scheds = list(self._by_canal.values())
+        for sched in scheds:
+            if video_id in sched:
+                sched.update(video_id, metadata, plays_map)
+
+    def peek_reservados(self, canal_id):
+        """Reservados de un canal sin crear ni reconstruir su scheduler."""
+        with self._lock:
+            sched = self._by_canal.get(canal_id)
+        return sched.reservados() if sched is not None else []
+
+    def liberar(self, canal_id):
+        with self._lock:
+            sched = self._by_canal.get(canal_id)
+        if sched is not None:
+            sched.liberar()
+
+    def drop(self, canal_id=None):
+        with self._lock:
+            if canal_id is None:
+                self._by_canal.clear()
+            else:
+                self._by_canal.pop(canal_id, None)
+
+
+schedulers = SchedulerRegistry()
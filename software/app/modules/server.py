@@ -0,0 +1,75 @@
+# SPDX-License-Identifier: LicenseRef-TVArgenta-NC-Attribution-Consult-First
+# Proyecto: TVArgenta — Retro TV
+# Autor: Ricardo Sappia contact:rsflightronics@gmail.com
+# © 2025 Ricardo Sappia. Todos los derechos reservados.
+# Licencia: No comercial, atribución y consulta previa. Se distribuye TAL CUAL, sin garantías.
+# Ver LICENSE para términos completos.
+
+"""
+Servidor HTTP y entrega de archivos estáticos grandes (videos, thumbnails).
+
+Dos modos (SERVER_MODE / `python main.py --server ...`):
+  - "prod": waitress (pip install waitress), WSGI multihilo en el mismo
+    proceso, así los singletons y los hilos de fondo de la app siguen
+    siendo uno solo. Si waitress no está, cae a "dev" con un aviso.
+  - "dev": el servidor de desarrollo de werkzeug (app.run), como antes.
+
+`enviar()` sirve un archivo con respuesta condicional completa: Range/206 e
+If-Range para el seek del <video>, ETag + If-None-Match y Last-Modified +
+If-Modified-Since (304 sin cuerpo). El cuerpo va por wsgi.file_wrapper: el
+servidor lo copia al socket por bloques, sin pasar por la app. Con
+X_SENDFILE=1 (detrás de nginx/lighttpd/apache) Flask manda sólo el header
+X-Sendfile y el proxy hace el sendfile del kernel.
+"""
+
+import logging
+import os
+
+from flask import request, send_from_directory
+
+try:
+    import waitress
+except ImportError:  # opcional: sin waitress queda el servidor de desarrollo
+    waitress = None
+
+logger = logging.getLogger("tvargenta")
+
+UN_ANIO = 365 * 24 * 3600
+UN_MES = 30 * 24 * 3600
+
+
+def enviar(directorio, filename, max_age=0, inmutable=False):
+    """send_from_directory condicional; max_age=0 => revalidar siempre con ETag."""
+    resp = send_from_directory(directorio, filename, conditional=True, etag=True, max_age=max_age)
+    resp.headers["Accept-Ranges"] = "bytes"
+    if max_age:
+        resp.headers["Cache-Control"] = f"public, max-age={int(max_age)}" + (", immutable" if inmutable else "")
+    else:
+        resp.headers["Cache-Control"] = "no-cache"   # se guarda, pero se revalida (304)
+    return resp
+
+
+def mtime_version(path):
+    """Versión para URLs cacheables "para siempre": cambia si cambia el archivo."""
+    try:
+        return os.stat(path).st_mtime_ns // 1_000_000
+    except OSError:
+        return 0
+
+
+def versionado():
+    """True si el request trae ?v= (la URL cambia cuando cambia el archivo)."""
+    return bool(request.args.get("v"))
+
+
+def serve(app, mode="prod", host="0.0.0.0", port=5000, threads=16):
+    if mode == "prod" and waitress is None:
+        logger.warning("[HTTP] waitress no está instalado (pip install waitress): uso el servidor de desarrollo")
+        mode = "dev"
+    logger.info(f"[HTTP] servidor {mode} en {host}:{port}")
+    if mode == "prod":
+        # channel_timeout alto: los streams SSE y los videos largos no se cortan
+        waitress.serve(app, host=host, port=port, threads=threads,
+                       channel_timeout=300, ident="tvargenta")
+    else:
+        app.run(debug=False, host=host, port=port, threaded=True)
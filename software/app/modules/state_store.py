@@ -0,0 +1,240 @@
+# SPDX-License-Identifier: LicenseRef-TVArgenta-NC-Attribution-Consult-First
+# Proyecto: TVArgenta — Retro TV
+# Autor: Ricardo Sappia contact:rsflightronics@gmail.com
+# © 2025 Ricardo Sappia. Todos los derechos reservados.
+# Licencia: No comercial, atribución y consulta previa. Se distribuye TAL CUAL, sin garantías.
+# Ver LICENSE para términos completos.
+
+"""
+Capa única de escritura de estado (JSON) a la SD.
+
+- Escritura durable: tmp + fsync + os.replace + fsync del directorio.
+- Un solo escritor: todas las escrituras pasan por un hilo y un lock.
+- Foto al agendar: `write()` serializa en el hilo que llama; el escritor de
+  fondo sólo baja texto a disco (o llama al callable que le pasaron).
+- Coalescing: varias escrituras al mismo archivo dentro de la ventana de
+  debounce se convierten en una sola (p.ej. renombrar un tag que toca todos
+  los videos = 1 write de metadata.json, no N).
+- Estadísticas de writes por archivo por minuto (ver `stats()`).
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+logger = logging.getLogger("tvargenta")
+
+DEBOUNCE_S = 0.3    # ventana para juntar ráfagas al mismo archivo
+MAX_DELAY_S = 2.0   # ...pero nunca demorar un write más que esto
+STATS_WINDOW_S = 60.0
+
+
+def write_json_durable(path, data, indent=2):
+    """tmp + fsync + rename atómico + fsync del directorio."""
+    write_text_durable(path, json.dumps(data, ensure_ascii=False, indent=indent))
+
+
+def write_text_durable(path, texto):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        f.write(texto)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    try:
+        dfd = os.open(path.parent, os.O_RDONLY)
+        try:
+            os.fsync(dfd)
+        finally:
+            os.close(dfd)
+    except OSError:
+        pass  # algunos fs (vfat) no permiten fsync de directorios
+
+
+def _serializar(data, indent):
+    """
+    Texto a escribir. Un dict se serializa YA (en el hilo de quien llama, que
+    es quien tiene el lock de sus datos): el escritor de fondo nunca recorre
+    una estructura que otro hilo está modificando. Un callable se llama
+    recién al escribir y tiene que devolver una foto consistente (texto u
+    objeto): sirve para cachés grandes que cambian seguido (catálogo,
+    probe cache, checkpoint del importador).
+    """
+    if callable(data):
+        data = data()
+    return data if isinstance(data, str) else json.dumps(data, ensure_ascii=False, indent=indent)
+
+
+class _Pending:
+    __slots__ = ("data", "indent", "first", "due", "callbacks", "fallas", "requests")
+
+    def __init__(self, data, indent, now, debounce):
+        self.data = data          # texto ya serializado, o callable
+        self.indent = indent
+        self.first = now
+        self.due = now + debounce
+        self.callbacks = []
+        self.fallas = []
+        self.requests = 1
+
+
+class StateStore:
+    def __init__(self, debounce=DEBOUNCE_S, max_delay=MAX_DELAY_S):
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._pending = {}   # path -> _Pending
+        self._thread = None
+        self._writes = {}    # path -> deque[ts] de writes reales
+        self._requests = {}  # path -> deque[ts] de pedidos de write
+        self._last_report = time.monotonic()
+
+    # --- API ------------------------------------------------------------
+    def write(self, path, data, indent=2, on_written=None, debounce=None, on_failed=None):
+        """
+        Agenda un write; si ya hay uno pendiente para `path`, lo reemplaza.
+        `data` se serializa acá mismo (ver _serializar); on_failed se llama
+        si el write no llega a disco (serialización o I/O).
+        """
+        path = str(path)
+        if not callable(data):
+            try:
+                data = _serializar(data, indent)
+            except Exception as e:
+                logger.error(f"[STATE] no pude serializar {path}: {e}")
+                if on_failed is not None:
+                    on_failed()
+                return
+        now = time.monotonic()
+        debounce = self.debounce if debounce is None else debounce
+        with self._cond:
+            self._note(self._requests, path, now)
+            p = self._pending.get(path)
+            if p is None:
+                p = self._pending[path] = _Pending(data, indent, now, debounce)
+            else:
+                p.data = data
+                p.indent = indent
+                p.requests += 1
+                p.due = min(now + debounce, p.first + self.max_delay)
+            if on_written is not None:
+                p.callbacks.append(on_written)
+            if on_failed is not None:
+                p.fallas.append(on_failed)
+            self._ensure_thread()
+            self._cond.notify()
+
+    def write_now(self, path, data, indent=2):
+        """Write sincrónico (igual serializado con el escritor de fondo)."""
+        path = str(path)
+        with self._cond:
+            self._note(self._requests, path, time.monotonic())
+            p = self._pending.pop(path, None)
+        return self._do_write(path, data, indent, p.callbacks if p else (), p.fallas if p else ())
+
+    def flush(self):
+        """Escribe ya todo lo pendiente (atexit, antes de apagar, etc.)."""
+        with self._cond:
+            pending, self._pending = self._pending, {}
+        for path, p in pending.items():
+            self._do_write(path, p.data, p.indent, p.callbacks, p.fallas)
+
+    def is_pending(self, path):
+        with self._cond:
+            return str(path) in self._pending
+
+    def stats(self):
+        now = time.monotonic()
+        with self._cond:
+            out = {}
+            for path in set(self._writes) | set(self._requests) | set(self._pending):
+                writes = self._trim(self._writes.get(path), now)
+                reqs = self._trim(self._requests.get(path), now)
+                out[path] = {
+                    "writes_per_min": writes,
+                    "requests_per_min": reqs,
+                    "coalesced_per_min": max(0, reqs - writes),
+                    "pending": path in self._pending,
+                }
+            return out
+
+    # --- Internos ---------------------------------------------------------
+    def _ensure_thread(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="state-store", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    due = [k for k, p in self._pending.items() if p.due <= now]
+                    if due:
+                        batch = [(k, self._pending.pop(k)) for k in due]
+                        break
+                    timeout = min((p.due for p in self._pending.values()), default=now + STATS_WINDOW_S) - now
+                    self._cond.wait(max(0.01, timeout))
+                    self._maybe_report()
+            for path, p in batch:
+                self._do_write(path, p.data, p.indent, p.callbacks, p.fallas)
+
+    def _do_write(self, path, data, indent, callbacks, fallas=()):
+        with self._write_lock:
+            try:
+                write_text_durable(path, _serializar(data, indent))
+            except Exception as e:
+                logger.error(f"[STATE] error escribiendo {path}: {e}")
+                self._avisar(path, fallas)
+                return False
+            with self._cond:
+                self._note(self._writes, path, time.monotonic())
+        self._avisar(path, callbacks)
+        return True
+
+    @staticmethod
+    def _avisar(path, callbacks):
+        for cb in callbacks:
+            try:
+                cb()
+            except Exception as e:
+                logger.warning(f"[STATE] callback de {path} falló: {e}")
+
+    def _note(self, table, path, now):
+        dq = table.get(path)
+        if dq is None:
+            dq = table[path] = deque()
+        dq.append(now)
+        self._trim(dq, now)
+
+    @staticmethod
+    def _trim(dq, now):
+        if not dq:
+            return 0
+        while dq and now - dq[0] > STATS_WINDOW_S:
+            dq.popleft()
+        return len(dq)
+
+    def _maybe_report(self):
+        now = time.monotonic()
+        if now - self._last_report < STATS_WINDOW_S:
+            return
+        self._last_report = now
+        resumen = []
+        for path, dq in self._writes.items():
+            writes = self._trim(dq, now)
+            reqs = self._trim(self._requests.get(path), now)
+            if reqs:
+                resumen.append(f"{Path(path).name}={writes}w/{reqs}req")
+        if resumen:
+            logger.info(f"[STATE] writes/min: {' '.join(resumen)}")
+
+
+state_store = StateStore()
@@ -0,0 +1,156 @@
+# SPDX-License-Identifier: LicenseRef-TVArgenta-NC-Attribution-Consult-First
+# Proyecto: TVArgenta — Retro TV
+# Autor: Ricardo Sappia contact:rsflightronics@gmail.com
+# © 2025 Ricardo Sappia. Todos los derechos reservados.
+# Licencia: No comercial, atribución y consulta previa. Se distribuye TAL CUAL, sin garantías.
+# Ver LICENSE para términos completos.
+
+"""
+Índice invertido tag -> video_ids y vistas precalculadas por canal.
+
+Una vista de canal guarda el set de candidatos (videos con algún tag incluido
+y ninguno excluido) y el puntaje de prioridad de cada uno, así elegir video
+cuesta O(tamaño del canal) y no O(biblioteca completa).
+"""
+
+import threading
+
+
+class ChannelView:
+    __slots__ = ("canal_id", "signature", "incluidos", "excluidos", "rank",
+                 "candidates", "tag_score", "generation")
+
+    def __init__(self, canal_id, prioridad, incluidos, excluidos):
+        self.canal_id = canal_id
+        self.signature = (tuple(prioridad), tuple(sorted(incluidos)), tuple(sorted(excluidos)))
+        self.incluidos = frozenset(incluidos)
+        self.excluidos = frozenset(excluidos)
+        # tabla de rangos: el primer tag de la prioridad vale len(prioridad)
+        self.rank = {}
+        for i, tag in enumerate(prioridad):
+            self.rank.setdefault(tag, len(prioridad) - i)
+        self.candidates = set()
+        self.tag_score = {}
+        self.generation = 0
+
+    def admits(self, tags):
+        return bool(tags & self.incluidos) and not (tags & self.excluidos)
+
+    def score(self, tags):
+        rank = self.rank
+        return sum(rank[t] for t in tags if t in rank)
+
+    def ordered(self):
+        return sorted(self.candidates)
+
+
+class TagIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.by_tag = {}    # tag -> set(video_id)
+        self.tags_of = {}   # video_id -> frozenset(tags)
+        self._views = {}    # canal_id -> ChannelView
+        self._source_generation = None
+
+    # --- Construcción ---------------------------------------------------
+    def sync(self, metadata, generation):
+        """Reconstruye todo sólo si el catálogo entregó un metadata nuevo."""
+        if generation == self._source_generation:
+            return self
+        with self._lock:
+            if generation != self._source_generation:
+                self.rebuild(metadata)
+                self._source_generation = generation
+        return self
+
+    def rebuild(self, metadata):
+        with self._lock:
+            self.by_tag = {}
+            self.tags_of = {}
+            for video_id, data in metadata.items():
+                tags = frozenset(data.get("tags", []))
+                self.tags_of[video_id] = tags
+                for tag in tags:
+                    self.by_tag.setdefault(tag, set()).add(video_id)
+            for view in self._views.values():
+                self._fill_view(view)
+
+    # --- Actualizaciones incrementales ------------------------------------
+    def update_video(self, video_id, tags):
+        with self._lock:
+            new = frozenset(tags)
+            old = self.tags_of.get(video_id, frozenset())
+            for tag in old - new:
+                vids = self.by_tag.get(tag)
+                if vids is not None:
+                    vids.discard(video_id)
+                    if not vids:
+                        del self.by_tag[tag]
+            for tag in new - old:
+                self.by_tag.setdefault(tag, set()).add(video_id)
+            self.tags_of[video_id] = new
+            for view in self._views.values():
+                self._update_view(view, video_id, new)
+
+    def remove_video(self, video_id):
+        with self._lock:
+            for tag in self.tags_of.pop(video_id, frozenset()):
+                vids = self.by_tag.get(tag)
+                if vids is not None:
+                    vids.discard(video_id)
+                    if not vids:
+                        del self.by_tag[tag]
+            for view in self._views.values():
+                if video_id in view.candidates:
+                    view.candidates.discard(video_id)
+                    view.tag_score.pop(video_id, None)
+                    view.generation += 1
+
+    def remove_tags(self, tags):
+        """Saca los tags de todos los videos que los tenían (tag/grupo borrado)."""
+        tags = set(tags)
+        with self._lock:
+            afectados = set()
+            for tag in tags:
+                afectados |= self.by_tag.get(tag, set())
+            for video_id in afectados:
+                self.update_video(video_id, self.tags_of[video_id] - tags)
+
+    # --- Vistas por canal ---------------------------------------------------
+    def channel_view(self, canal_id, prioridad, incluidos, excluidos=()):
+        view = self._views.get(canal_id)
+        signature = (tuple(prioridad), tuple(sorted(incluidos)), tuple(sorted(excluidos)))
+        if view is not None and view.signature == signature:
+            return view
+        with self._lock:
+            nueva = ChannelView(canal_id, prioridad, incluidos, excluidos)
+            if view is not None:
+                nueva.generation = view.generation + 1
+            self._fill_view(nueva)
+            self._views[canal_id] = nueva
+            return nueva
+
+    def _fill_view(self, view):
+        candidates = set()
+        for tag in view.incluidos:
+            candidates |= self.by_tag.get(tag, set())
+        for tag in view.excluidos:
+            candidates -= self.by_tag.get(tag, set())
+        view.candidates = candidates
+        view.tag_score = {vid: view.score(self.tags_of[vid]) for vid in candidates}
+        view.generation += 1
+
+    def _update_view(self, view, video_id, tags):
+        if view.admits(tags):
+            score = view.score(tags)
+            if video_id not in view.candidates or view.tag_score.get(video_id) != score:
+                view.candidates.add(video_id)
+                view.tag_score[video_id] = score
+                view.generation += 1
+        elif video_id in view.candidates:
+            view.candidates.discard(video_id)
+            view.tag_score.pop(video_id, None)
+            view.generation += 1
+
+
+tag_index = TagIndex()
@@ -0,0 +1,189 @@
+# SPDX-License-Identifier: LicenseRef-TVArgenta-NC-Attribution-Consult-First
+# Proyecto: TVArgenta — Retro TV
+# Autor: Ricardo Sappia contact:rsflightronics@gmail.com
+# © 2025 Ricardo Sappia. Todos los derechos reservados.
+# Licencia: No comercial, atribución y consulta previa. Se distribuye TAL CUAL, sin garantías.
+# Ver LICENSE para términos completos.
+
+"""
+Cola de generación de thumbnails con N workers.
+
+Cada worker es un hilo que lanza su propio ffmpeg (el trabajo pesado corre en
+el subproceso, así que N hilos = N ffmpeg en paralelo). Por defecto
+N = núcleos - 1 para dejarle un núcleo libre a la reproducción.
+
+- `enqueue(video_id)` vuelve al toque; si ese video ya está en cola o en
+  curso, no se duplica (salvo `forzar` con el job ya corriendo: ese frame
+  puede ser del archivo viejo, así que se vuelve a encolar al terminar).
+- `progress()` devuelve contadores y el tiempo de los últimos jobs.
+- `extraer_thumbnail()` es el ffmpeg en sí (lo usan Flask y el importador):
+  además del JPEG saca derivados WebP chicos (THUMB_SIZES, para las grillas)
+  y un placeholder de 16px como data URI que va a metadata["thumb_ph"].
+"""
+
+import base64
+import logging
+import os
+import queue
+import subprocess
+import threading
+import time
+from collections import deque
+
+from modules.governor import governor
+
+logger = logging.getLogger("tvargenta")
+
+
+THUMB_SIZES = {"sm": 160, "md": 480}   # ancho (px) de los derivados WebP
+PLACEHOLDER_W = 16                      # el placeholder inline (data URI) de metadata
+
+
+def rutas_derivados(thumbnail_path):
+    """{size: path} de los WebP derivados de <vid>.jpg (<vid>.sm.webp, ...)."""
+    base = os.path.splitext(str(thumbnail_path))[0]
+    return {size: f"{base}.{size}.webp" for size in THUMB_SIZES}
+
+
+def _derivar(entrada, thumbnail_path, desde_video, segundo):
+    """
+    Un solo ffmpeg: decodifica un frame una vez y con split saca el JPEG
+    completo (si viene del video), los WebP sm/md y el placeholder por stdout.
+    Devuelve el placeholder como data URI (o None).
+    """
+    ramas = (["full"] if desde_video else []) + list(THUMB_SIZES) + ["ph"]
+    grafo = f"[0:v]split={len(ramas)}" + "".join(f"[{r}]" for r in ramas)
+    for size, ancho in THUMB_SIZES.items():
+        grafo += f";[{size}]scale={ancho}:-2[{size}o]"
+    grafo += f";[ph]scale={PLACEHOLDER_W}:-2[pho]"
+
+    cmd = ["ffmpeg", "-y", "-loglevel", "error"]
+    if desde_video:
+        cmd += ["-ss", f"00:00:{int(segundo):02d}"]
+    cmd += ["-i", str(entrada), "-filter_complex", grafo,
+            "-threads", str(governor.ffmpeg_threads())]
+    if desde_video:
+        cmd += ["-map", "[full]", "-frames:v", "1", "-q:v", "4", str(thumbnail_path)]
+    for size, path in rutas_derivados(thumbnail_path).items():
+        cmd += ["-map", f"[{size}o]", "-frames:v", "1", "-c:v", "libwebp", "-quality", "70", path]
+    cmd += ["-map", "[pho]", "-frames:v", "1", "-c:v", "libwebp", "-quality", "30", "-f", "webp", "pipe:1"]
+
+    result = governor.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+    if not result.stdout:
+        return None
+    return "data:image/webp;base64," + base64.b64encode(result.stdout).decode("ascii")
+
+
+def extraer_thumbnail(video_path, thumbnail_path, segundo=2):
+    """
+    JPEG + derivados WebP + placeholder desde el video (gobernado). Devuelve
+    el placeholder (data URI) o None. Si el ffmpeg no tiene libwebp, queda
+    al menos el JPEG; si ni eso, lanza CalledProcessError.
+    """
+    try:
+        return _derivar(video_path, thumbnail_path, True, segundo)
+    except subprocess.CalledProcessError as e:
+        logger.warning(f"[THUMBS] sin derivados WebP para {video_path}: {(e.stderr or b'')[-200:]!r}")
+    governor.run([
+        "ffmpeg", "-y",
+        "-ss", f"00:00:{int(segundo):02d}",
+        "-i", str(video_path),
+        "-frames:v", "1",
+        "-q:v", "4",
+        "-threads", str(governor.ffmpeg_threads()),
+        str(thumbnail_path)
+    ], check=True)
+    return None
+
+
+def derivar_thumbnail(thumbnail_path):
+    """Derivados + placeholder a partir de un JPEG ya existente (backfill barato)."""
+    return _derivar(thumbnail_path, thumbnail_path, False, 0)
+
+
+class ThumbnailQueue:
+    def __init__(self, fn, workers=1, historial=50):
+        self.fn = fn                 # (video_id, forzar) -> bool
+        self.workers = max(1, int(workers))
+        self._q = queue.Queue()
+        self._lock = threading.Lock()
+        self._en_vuelo = {}          # video_id -> job (en cola o corriendo)
+        self._hechos = deque(maxlen=historial)
+        self._threads = []
+        self._ok = 0
+        self._fallidos = 0
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                t = threading.Thread(target=self._run, name=f"thumb-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+        logger.info(f"[THUMBS] {self.workers} worker(s)")
+
+    def enqueue(self, video_id, forzar=False):
+        """Encola y vuelve. False si ya estaba pedido."""
+        with self._lock:
+            job = self._en_vuelo.get(video_id)
+            if job is not None:
+                if not forzar:
+                    return False
+                if job["estado"] == "corriendo":
+                    job["repetir"] = True   # lo re-encola _run al terminar
+                else:
+                    job["forzar"] = True
+                return True
+            job = {"video_id": video_id, "forzar": forzar, "estado": "en_cola",
+                   "encolado": time.time(), "inicio": None}
+            self._en_vuelo[video_id] = job
+        self._q.put(job)
+        if not self._threads:
+            self.start()
+        return True
+
+    def progress(self):
+        with self._lock:
+            en_vuelo = list(self._en_vuelo.values())
+            hechos = list(self._hechos)
+            ok, fallidos = self._ok, self._fallidos
+        corriendo = [j for j in en_vuelo if j["estado"] == "corriendo"]
+        ms = [j["ms"] for j in hechos]
+        return {
+            "workers": self.workers,
+            "en_cola": len(en_vuelo) - len(corriendo),
+            "corriendo": [j["video_id"] for j in corriendo],
+            "ok": ok,
+            "fallidos": fallidos,
+            "ms_promedio": round(sum(ms) / len(ms)) if ms else None,
+            "recientes": hechos[-10:],
+        }
+
+    def _run(self):
+        while True:
+            job = self._q.get()
+            with self._lock:
+                job["estado"] = "corriendo"
+                job["inicio"] = time.time()
+                forzar = job["forzar"]
+            t0 = time.monotonic()
+            try:
+                ok = bool(self.fn(job["video_id"], forzar))
+            except Exception as e:
+                logger.warning(f"[THUMBS] {job['video_id']}: {e}")
+                ok = False
+            ms = round((time.monotonic() - t0) * 1000)
+            with self._lock:
+                self._en_vuelo.pop(job["video_id"], None)
+                self._hechos.append({
+                    "video_id": job["video_id"], "ok": ok, "ms": ms,
+                    "espera_ms": round((job["inicio"] - job["encolado"]) * 1000),
+                })
+                if ok:
+                    self._ok += 1
+                else:
+                    self._fallidos += 1
+            logger.info(f"[THUMBS] {job['video_id']} {'ok' if ok else 'falló'} en {ms}ms")
+            if job.get("repetir"):
+                self.enqueue(job["video_id"], forzar=True)
@@ -1,27 +1,32 @@
 #!/usr/bin/env python3
 import os
+import select
 import subprocess
 import time
 import json
 import sys
 from pathlib import Path
 from player_utils import cambiar_canal
+from modules.repository import repo
 
 APP_DIR = Path(__file__).resolve().parents[1]
 
 try:
     sys.path.insert(0, str(APP_DIR))  # asegurar que 'settings.py' esté en sys.path
     from settings import APP_DIR as SETTINGS_APP_DIR  # type: ignore
+    from settings import IPC_SOCKET, IPC_MODE  # type: ignore
     APP_DIR = SETTINGS_APP_DIR
 except Exception:
     # si falla, seguimos con el APP_DIR físico
-    pass
+    IPC_SOCKET, IPC_MODE = "/tmp/tvargenta.sock", "socket"
 
+from modules.ipc import IpcClient
+
+# Canal directo con Flask; si no responde, caemos a los triggers por archivo
+ipc = IpcClient(IPC_SOCKET) if IPC_MODE == "socket" else None
 
-ENCODER_BIN = APP_DIR / "native" / "encoder_reader"
 
-CANAL_JSON_PATH = "/srv/tvargenta/content/canales.json"
-CANAL_ACTIVO_PATH = "/srv/tvargenta/content/canal_activo.json"
+ENCODER_BIN = APP_DIR / "native" / "encoder_reader"
 
 # --- Nuevo: trigger para menú (front hace polling de mtime) ---
 MENU_TRIGGER_PATH = "/tmp/trigger_menu.json"
@@ -29,6 +34,13 @@ MENU_STATE_PATH  = "/tmp/menu_state.json"
 MENU_NAV_PATH    = "/tmp/trigger_menu_nav.json"
 MENU_SELECT_PATH = "/tmp/trigger_menu_select.json"
 
+# --- Zapping: ráfagas de giro se juntan en un solo cambio de canal ---
+ZAP_SETTLE_S = 0.25      # sin detents durante esto => se confirma el canal destino
+ZAP_ACCEL = [            # (intervalo entre detents, canales por detent)
+    (0.04, 3),
+    (0.09, 2),
+]
+
 estado = "idle"          # idle | evaluando | volume
 hubo_giro = False
 ultimo_estado = "idle"
@@ -37,19 +49,39 @@ last_volume_activity = 0.0
 def ts():
     return time.strftime("%Y-%m-%d %H:%M:%S")
 
+# Fallback sin IPC: leer por el repositorio (JSON o SQLite, según
+# TVARGENTA_STORAGE), el mismo que escribe cambiar_canal().
 def get_canal_actual():
-    if Path(CANAL_ACTIVO_PATH).exists():
-        with open(CANAL_ACTIVO_PATH, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return data.get("canal_id", "default")
-    return "default"
+    return repo.canal_activo()
 
 def get_lista_canales():
-    with open(CANAL_JSON_PATH, "r", encoding="utf-8") as f:
-        return list(json.load(f).keys())
+    return list(repo.canales().keys())
+
+def ipc_event(tipo, **data):
+    """Manda un evento a Flask por el socket. None => usar modo archivos."""
+    if ipc is None:
+        return None
+    reply = ipc.event(tipo, **data)
+    if reply is None:
+        print(f"[{ts()}] [IPC] Flask no responde; uso triggers por archivo")
+        return None
+    if not reply.get("ok"):
+        print(f"[{ts()}] [IPC] {tipo} rechazado: {reply.get('error')}")
+    return reply
+
+def cambiar_al_siguiente(delta, t0=None):
+    # Flask conoce el canal activo y el orden: un solo mensaje y listo.
+    # t0 (primer giro de la ráfaga) es el arranque de la traza de zapping en Flask.
+    reply = ipc_event("canal", delta=delta, t0=t0 or time.time())
+    if reply is not None:
+        if reply.get("ok"):
+            print(f"[{ts()}] [ENCODER] Canal cambiado a: {reply.get('canal_id')}")
+        return
 
-def cambiar_al_siguiente(delta):
     canales = get_lista_canales()
+    if not canales:
+        print(f"[{ts()}] [ENCODER] No hay canales definidos")
+        return
     actual = get_canal_actual()
     try:
         idx = canales.index(actual)
@@ -69,6 +101,11 @@ def cambiar_al_siguiente(delta):
         print(f"[{ts()}] [ENCODER] Canal no cambió (circular)")
 
 def ajustar_volumen(delta):
+    reply = ipc_event("volume", delta=delta)
+    if reply is not None:
+        print(f"[{ts()}] [VOLUMEN] Ajustado a: {reply.get('valor')}")
+        return
+
     path = "/tmp/tvargenta_volumen.json"
     valor = 50
     if os.path.exists(path):
@@ -86,6 +123,9 @@ def ajustar_volumen(delta):
 
 # --- Nuevo: tocar archivo para abrir/cerrar menú (flanco de bajada sin giro) ---
 def trigger_menu():
+    if ipc_event("menu") is not None:
+        print(f"[{ts()}] [MENU] Trigger emitido (IPC)")
+        return
     try:
         with open(MENU_TRIGGER_PATH, "w") as f:
             json.dump({"timestamp": time.time()}, f)
@@ -94,6 +134,9 @@ def trigger_menu():
         print(f"[{ts()}] [MENU] Error al emitir trigger: {e}")
 
 def menu_is_open():
+    state = ipc.query() if ipc is not None else None
+    if state is not None:
+        return bool(state.get("menu_open", False))
     if Path(MENU_STATE_PATH).exists():
         try:
             with open(MENU_STATE_PATH, "r") as f:
@@ -104,6 +147,9 @@ def menu_is_open():
     return False
 
 def trigger_menu_nav(delta):
+    if ipc_event("menu_nav", delta=int(delta)) is not None:
+        print(f"[{ts()}] [MENU] NAV delta={delta}")
+        return
     try:
         with open(MENU_NAV_PATH, "w") as f:
             json.dump({"delta": int(delta), "timestamp": time.time()}, f)
@@ -112,6 +158,9 @@ def trigger_menu_nav(delta):
         print(f"[{ts()}] [MENU] Error NAV: {e}")
 
 def trigger_menu_select():
+    if ipc_event("menu_select") is not None:
+        print(f"[{ts()}] [MENU] SELECT")
+        return
     try:
         with open(MENU_SELECT_PATH, "w") as f:
             json.dump({"timestamp": time.time()}, f)
@@ -119,6 +168,65 @@ def trigger_menu_select():
     except Exception as e:
         print(f"[{ts()}] [MENU] Error SELECT: {e}")
 
+class Zapper:
+    """
+    Acumula giros en modo idle y confirma un único canal destino cuando la
+    ráfaga se calma ZAP_SETTLE_S. Girar rápido acelera (salta más canales por
+    detent); cambiar de sentido vuelve a paso 1.
+    """
+    def __init__(self):
+        self.pendiente = 0
+        self.ultimo = 0.0
+        self.inicio = 0.0   # primer giro de la ráfaga (t0 de la traza de zapping)
+        self.sentido = 0
+
+    def activo(self):
+        return self.pendiente != 0
+
+    def giro(self, sentido, now):
+        paso = 1
+        if not self.activo():
+            self.inicio = now
+        if self.activo() and sentido == self.sentido:
+            dt = now - self.ultimo
+            for umbral, n in ZAP_ACCEL:
+                if dt < umbral:
+                    paso = n
+                    break
+        self.sentido = sentido
+        self.pendiente += sentido * paso
+        self.ultimo = now
+
+    def vencido(self, now):
+        return self.activo() and now - self.ultimo >= ZAP_SETTLE_S
+
+    def confirmar(self):
+        delta, self.pendiente = self.pendiente, 0
+        if delta:
+            print(f"[{ts()}] [ENCODER] Zapping confirmado: delta={delta:+d}")
+            cambiar_al_siguiente(delta, self.inicio)
+
+def leer_lineas(proc, timeout):
+    """
+    Genera líneas del encoder_reader, o None si pasó `timeout` sin nada
+    (para poder vencer la ventana de zapping y el watchdog de volumen).
+    Lee el fd crudo: con el buffer de TextIOWrapper el select mentiría.
+    """
+    fd = proc.stdout.fileno()
+    buf = b""
+    while True:
+        listos, _, _ = select.select([fd], [], [], timeout)
+        if not listos:
+            yield None
+            continue
+        chunk = os.read(fd, 4096)
+        if not chunk:
+            return  # encoder_reader terminó
+        buf += chunk
+        *lineas, buf = buf.split(b"\n")
+        for linea in lineas:
+            yield linea.decode("utf-8", "replace")
+
 if __name__ == "__main__":
     print(f"[{ts()}] [ENCODER] Escuchando salida de {ENCODER_BIN}")
     if not ENCODER_BIN.exists():
@@ -126,18 +234,25 @@ if __name__ == "__main__":
     proc = subprocess.Popen(
         [str(ENCODER_BIN)],
         stdout=subprocess.PIPE,
-        text=True,
         cwd=str(ENCODER_BIN.parent)  # por las dudas
     )
+    zapper = Zapper()
 
     try:
-        for raw in proc.stdout:
+        for raw in leer_lineas(proc, timeout=0.05):
+            now = time.time()
+            # --- ventana de zapping vencida: se confirma el canal final ---
+            if zapper.vencido(now):
+                zapper.confirmar()
+
             # --- watchdog de volumen ---
-            if estado == "volume" and last_volume_activity and (time.time() - last_volume_activity) > 3.2:
+            if estado == "volume" and last_volume_activity and (now - last_volume_activity) > 3.2:
                 estado = ultimo_estado
                 last_volume_activity = 0.0
                 print(f"[{ts()}] [ENCODER] Volume timeout → volvemos a {estado}")
-            
+
+            if raw is None:
+                continue
             line = raw.strip()
             if not line:
                 continue
@@ -147,14 +262,13 @@ if __name__ == "__main__":
             # --- Giro del encoder ---
             if line.startswith("ROTARY_"):
                 if estado == "idle":
-                    if menu_is_open():
-                        delta = +1 if line == "ROTARY_CW" else -1
+                    delta = +1 if line == "ROTARY_CW" else -1
+                    # en medio de una ráfaga de zapping no hace falta preguntar por el menú
+                    if not zapper.activo() and menu_is_open():
                         trigger_menu_nav(delta)
                     else:
-                        # Giro sin apretar: zapping de canales
-                        print(f"[{ts()}] [ENCODER] Gesto = cambio de canal")
-                        delta = +1 if line == "ROTARY_CW" else -1
-                        cambiar_al_siguiente(delta)
+                        # Giro sin apretar: zapping de canales (se confirma al calmarse)
+                        zapper.giro(delta, now)
 
                 elif estado == "evaluando":
                     # Se estaba apretando: si gira, esto es volumen
@@ -171,6 +285,7 @@ if __name__ == "__main__":
 
             # --- Botón: flanco ascendente (apretó) ---
             elif line == "BTN_PRESS":
+                zapper.confirmar()  # un botón corta la ráfaga: no dejar el canal a medias
                 if estado == "idle":
                     ultimo_estado = estado
                     estado = "evaluando"
@@ -201,6 +316,7 @@ if __name__ == "__main__":
                     print(f"[{ts()}] [ENCODER] Fin de ajuste de volumen, volvemos a {estado}")
 
 
+        zapper.confirmar()
     except KeyboardInterrupt:
         print(f"\n[{ts()}] [ENCODER] Interrumpido por teclado.")
     finally:
@@ -21,6 +21,7 @@ APP_DIR     = ROOT_DIR / "software" / "app"
 CONTENT_DIR = ROOT_DIR / "content"
 VIDEO_DIR   = CONTENT_DIR / "videos"
 THUMB_DIR   = CONTENT_DIR / "thumbnails"
+STAGING_DIR = VIDEO_DIR / ".staging"   # uploads en curso: mismo fs que VIDEO_DIR (rename atómico)
 
 # Archivos de estado (en /tmp por defecto)
 TMP_DIR = Path("/tmp")
@@ -39,6 +40,14 @@ CONFIG_FILE         = CONTENT_DIR / "configuracion.json"
 CANALES_FILE        = CONTENT_DIR / "canales.json"
 CANAL_ACTIVO_FILE   = CONTENT_DIR / "canal_activo.json"
 PLAYS_FILE          = SYSTEM_DATA_DIR / "content" / "plays.json"  # persiste fuera del repo si corres en /srv
+PLAYS_JOURNAL_FILE  = SYSTEM_DATA_DIR / "content" / "plays.log"   # journal append-only, se compacta en PLAYS_FILE
+
+# Backend de almacenamiento: "json" (default) o "sqlite" (ver modules/repository.py)
+STORAGE_BACKEND     = os.environ.get("TVARGENTA_STORAGE", "json").lower()
+SQLITE_DB_FILE      = SYSTEM_DATA_DIR / "content" / "tvargenta.db"
+PROBE_CACHE_FILE    = SYSTEM_DATA_DIR / "content" / "probe_cache.json"  # ffprobe por (path, size, mtime)
+IMPORT_CHECKPOINT_FILE = SYSTEM_DATA_DIR / "content" / "import_checkpoint.json"  # ver modules/importer.py
+ROTATION_FILE       = SYSTEM_DATA_DIR / "content" / "rotation.json"  # "ya mostrados" por canal, ver modules/rotation.py
 
 SPLASH_STATE_FILE   = SYSTEM_DATA_DIR / "Splash" / "splash_state.json"
 INTRO_PATH          = SPLASH_DIR / "splash_1.mp4"
@@ -46,4 +55,29 @@ INTRO_PATH          = SPLASH_DIR / "splash_1.mp4"
 # Usuario que corre el kiosk 
 USER = os.environ.get("TVARGENTA_USER") or getpass.getuser()
 
-UPLOAD_STATUS = TMP_DIR / "upload_status.txt"
+# Transcodes simultáneos de la cola de uploads (en una Pi, de a uno)
+TRANSCODE_WORKERS = int(os.environ.get("TVARGENTA_TRANSCODE_WORKERS") or 1)
+
+# Gobernador de subprocesos de medios (ver modules/governor.py)
+MEDIA_MAX_JOBS      = int(os.environ.get("TVARGENTA_MEDIA_JOBS") or 2)     # ffmpeg simultáneos, global
+FFMPEG_THREADS      = int(os.environ.get("TVARGENTA_FFMPEG_THREADS") or max(1, (os.cpu_count() or 2) - 1))
+MEDIA_NICE          = int(os.environ.get("TVARGENTA_MEDIA_NICE") or 10)
+MEDIA_CPUS          = os.environ.get("TVARGENTA_MEDIA_CPUS", "")          # p.ej. "1-3" (taskset); vacío = todos
+MEDIA_WHILE_PLAYING = os.environ.get("TVARGENTA_MEDIA_WHILE_PLAYING", "throttle").lower()  # throttle|pause|ignore
+
+# Próximos picks reservados por canal para que el player precargue (1-3)
+LOOKAHEAD = min(3, max(1, int(os.environ.get("TVARGENTA_LOOKAHEAD") or 2)))
+
+# Workers de thumbnails: por defecto núcleos - 1 (un núcleo queda para reproducir)
+THUMB_WORKERS = int(os.environ.get("TVARGENTA_THUMB_WORKERS") or max(1, (os.cpu_count() or 2) - 1))
+
+# Servidor HTTP: "prod" (waitress multihilo, si está instalado) o "dev" (werkzeug)
+SERVER_MODE    = os.environ.get("TVARGENTA_SERVER", "prod").lower()
+SERVER_HOST    = os.environ.get("TVARGENTA_HOST", "0.0.0.0")
+SERVER_PORT    = int(os.environ.get("TVARGENTA_PORT") or 5000)
+SERVER_THREADS = int(os.environ.get("TVARGENTA_SERVER_THREADS") or 16)  # cada SSE ocupa uno
+X_SENDFILE     = os.environ.get("TVARGENTA_X_SENDFILE", "") == "1"      # sólo detrás de un proxy que lo entienda
+
+# IPC encoder <-> Flask: "socket" (default) o "files" (triggers en /tmp, modo viejo)
+IPC_SOCKET = TMP_DIR / "tvargenta.sock"
+IPC_MODE   = os.environ.get("TVARGENTA_IPC", "socket").lower()
@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# los módulos se importan como en la app: `modules.*` y `settings` desde software/app
+APP_DIR = Path(__file__).resolve().parents[1]
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
@@ -0,0 +1,89 @@
+import json
+import os
+
+import pytest
+
+from modules.plays_journal import SEQ_KEY, PlaysJournal
+
+
+@pytest.fixture
+def rutas(tmp_path):
+    return tmp_path / "plays.json", tmp_path / "plays.log"
+
+
+def abrir(rutas):
+    return PlaysJournal(*rutas, compact_max_bytes=1 << 30)
+
+
+def rotar_sin_snapshot(journal):
+    """Lo que hace compact() antes de escribir el snapshot (corte de luz ahí)."""
+    with journal._lock:
+        journal._log.close()
+        journal._log = None
+        journal._rotar_log()
+
+
+def test_record_y_reapertura_sin_compactar(rutas):
+    journal = abrir(rutas)
+    journal.record("a")
+    journal.record("a")
+    journal.record("b")
+    otro = abrir(rutas)
+    assert otro.totals["a"]["plays"] == 2
+    assert otro.totals["b"]["plays"] == 1
+
+
+def test_compact_guarda_el_numero_en_el_snapshot(rutas):
+    snapshot, log = rutas
+    journal = abrir(rutas)
+    journal.record("a")
+    assert journal.compact()
+    assert not log.exists()
+    datos = json.loads(snapshot.read_text(encoding="utf-8"))
+    assert datos[SEQ_KEY] == 1
+    otro = abrir(rutas)
+    assert SEQ_KEY not in otro.totals
+    assert otro.totals["a"]["plays"] == 1
+
+
+def test_compacting_no_plegado_se_reaplica_aunque_sea_mas_viejo(rutas):
+    snapshot, _ = rutas
+    journal = abrir(rutas)
+    journal.record("a")
+    assert journal.compact()
+    journal.record("b")            # log nuevo, N=2
+    rotar_sin_snapshot(journal)
+    # os.replace conserva el mtime del log: puede quedar más viejo que el snapshot
+    viejo = os.stat(snapshot).st_mtime - 10
+    os.utime(journal.compacting_path, (viejo, viejo))
+
+    otro = abrir(rutas)
+    assert otro.totals["b"]["plays"] == 1
+    assert otro.totals["a"]["plays"] == 1
+
+
+def test_compacting_ya_plegado_se_descarta(rutas):
+    journal = abrir(rutas)
+    journal.record("a")
+    rotar_sin_snapshot(journal)
+    journal._pending = 1
+    assert journal.compact()       # el snapshot cubre el .compacting (N=1)...
+    journal.compacting_path.write_text(  # ...que sobrevivió al borrado
+        json.dumps({"compactacion": 1}) + "\n" + json.dumps(["a", "t"]) + "\n", encoding="utf-8")
+    otro = abrir(rutas)
+    assert otro.totals["a"]["plays"] == 1
+    assert not otro.compacting_path.exists()
+
+
+def test_compactacion_fallida_y_la_siguiente(rutas):
+    journal = abrir(rutas)
+    journal.record("a")
+    rotar_sin_snapshot(journal)    # N=1 queda en .compacting
+    journal.record("b")            # N=2
+    journal._pending = 2
+    assert journal.compact()       # se agrega al .compacting y el snapshot cubre ambos
+    assert not journal.compacting_path.exists()
+    otro = abrir(rutas)
+    assert otro.totals["a"]["plays"] == 1 and otro.totals["b"]["plays"] == 1
+    otro.record("c")
+    assert json.loads(otro.log_path.read_text(encoding="utf-8").splitlines()[0]) == {"compactacion": 3}
@@ -0,0 +1,46 @@
+import pytest
+
+from modules.catalog import Catalog
+from modules.repository import JsonRepository
+from modules.scheduler import SchedulerRegistry
+from modules.state_store import state_store
+from modules.tag_index import TagIndex
+
+
+@pytest.fixture
+def repo(tmp_path):
+    catalog = Catalog()
+    catalog.register("metadata", tmp_path / "metadata.json", {})
+    repo = JsonRepository()
+    repo._catalog = catalog
+    repo.save_metadata({"a": {"tags": ["dibujos"], "duracion": 60}})
+    state_store.flush()
+    return repo
+
+
+def test_put_videos_no_cambia_la_generacion(repo):
+    # por eso el lote del importador tiene que actualizar el índice a mano
+    gen = repo.generation()
+    repo.put_videos({"b": {"tags": ["dibujos"], "duracion": 60}})
+    assert "b" in repo.metadata()
+    assert repo.generation() == gen
+
+
+def test_lote_importado_llega_a_la_vista_y_al_scheduler(repo):
+    index = TagIndex().sync(repo.metadata(), repo.generation())
+    view = index.channel_view("1", ["dibujos"], ["dibujos"])
+    schedulers = SchedulerRegistry()
+    plays = {}
+    assert "b" not in schedulers.get("1", view, repo.metadata(), plays, repo.generation())
+    assert set(view.candidates) == {"a"}
+
+    # lo que hace el op "put_videos" del IPC
+    lote = {"b": {"tags": ["dibujos"], "duracion": 60}, "c": {"tags": ["noticias"], "duracion": 60}}
+    repo.put_videos(lote)
+    index = index.sync(repo.metadata(), repo.generation())   # no reconstruye: misma generación
+    for vid, info in lote.items():
+        index.update_video(vid, info["tags"])
+
+    assert set(view.candidates) == {"a", "b"}
+    sched = schedulers.get("1", view, repo.metadata(), plays, repo.generation())
+    assert "b" in sched and "c" not in sched
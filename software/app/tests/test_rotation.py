@@ -0,0 +1,127 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from modules.rotation import Rotation
+from modules.scheduler import ChannelScheduler
+from modules.state_store import state_store
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / "rotation.json"
+
+
+def leer(path):
+    state_store.flush()
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_mark_y_shown(path):
+    rot = Rotation(path)
+    rot.mark("1", "a")
+    rot.mark("1", "c")
+    rot.mark("2", "b")
+    shown = rot.shown("1")
+    assert "a" in shown and "c" in shown
+    assert "b" not in shown          # marcado en otro canal
+    assert "zzz" not in shown        # sin índice todavía
+    assert len(shown) == 2
+    assert len(rot.shown("sin_estado")) == 0
+
+
+def test_shown_es_una_foto(path):
+    rot = Rotation(path)
+    rot.mark("1", "a")
+    antes = rot.shown("1")
+    rot.mark("1", "b")
+    assert "b" not in antes
+    assert "b" in rot.shown("1")
+
+
+def test_new_epoch_vacia_y_sube_la_vuelta(path):
+    rot = Rotation(path)
+    rot.mark("1", "a")
+    rot.mark("2", "a")
+    assert rot.epoch("1") == 0
+    assert rot.new_epoch("1") == 1
+    assert rot.epoch("1") == 1
+    assert len(rot.shown("1")) == 0
+    assert "a" in rot.shown("2")     # los otros canales no se tocan
+
+
+def test_forget_suelta_el_indice_sin_reusarlo(path):
+    rot = Rotation(path)
+    rot.mark("1", "a")
+    rot.mark("1", "b")
+    rot.forget("a")
+    assert "a" not in rot.shown("1")
+    assert "b" in rot.shown("1")
+    rot.forget("no_existe")          # no-op
+    rot.mark("1", "c")
+    datos = leer(path)
+    assert datos["indices"] == {"b": 1, "c": 2}
+    assert datos["next"] == 3
+
+
+def test_formato_en_disco(path):
+    rot = Rotation(path)
+    for vid in ("a", "b", "c", "d", "e"):
+        rot.mark("1", vid)
+    rot.new_epoch("2")
+    datos = leer(path)
+    assert datos == {
+        "next": 5,
+        "indices": {"a": 0, "b": 1, "c": 2, "d": 3, "e": 4},
+        "canales": {"1": {"epoch": 0, "bits": "1f"}, "2": {"epoch": 1, "bits": "0"}},
+    }
+
+
+def test_ida_y_vuelta_por_disco(path):
+    rot = Rotation(path)
+    for i in range(70):              # más de 64 bits: int de Python sin tope
+        rot.mark("1", f"v{i}")
+    rot.new_epoch("2")
+    rot.mark("2", "v69")
+    rot.forget("v3")
+    state_store.flush()
+
+    otra = Rotation(path)
+    shown = otra.shown("1")
+    assert len(shown) == 69
+    assert "v0" in shown and "v69" in shown and "v3" not in shown
+    assert otra.epoch("2") == 1
+    assert "v69" in otra.shown("2")
+    otra.mark("1", "nuevo")          # índice nuevo, no el de v3
+    assert leer(path)["indices"]["nuevo"] == 70
+
+
+def test_archivo_ilegible_arranca_de_cero(path):
+    path.write_text("{roto", encoding="utf-8")
+    rot = Rotation(path)
+    assert len(rot.shown("1")) == 0
+    assert rot.epoch("1") == 0
+
+
+def test_drop_channel(path):
+    rot = Rotation(path)
+    rot.mark("1", "a")
+    rot.new_epoch("1")
+    rot.drop_channel("1")
+    assert rot.epoch("1") == 0
+    assert "1" not in leer(path)["canales"]
+
+
+def test_shown_sirve_de_exclude_del_scheduler(path):
+    rot = Rotation(path)
+    rot.mark("1", "a")
+    rot.mark("1", "b")
+    ids = {"a": 0, "b": 1, "c": 2}
+    view = SimpleNamespace(candidates=set(ids), tag_score={v: 0 for v in ids}, generation=1)
+    sched = ChannelScheduler("1")
+    sched.rebuild(view, {v: {"duracion": 60} for v in ids},
+                  {v: {"plays": n} for v, n in ids.items()}, exclude=rot.shown("1"))
+    assert "a" not in sched and "b" not in sched
+    assert sched.peek()[0] == "c"
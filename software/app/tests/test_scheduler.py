@@ -0,0 +1,113 @@
+from types import SimpleNamespace
+
+from modules.scheduler import ChannelScheduler, SchedulerRegistry
+
+# plays distintos => orden determinista (el jitter sólo desempata iguales)
+PLAYS = {"a": 0, "b": 1, "c": 2, "d": 3, "e": 4}
+
+
+def vista(ids=PLAYS, generation=1):
+    return SimpleNamespace(candidates=set(ids), tag_score={v: 0 for v in ids}, generation=generation)
+
+
+def metadata(ids=PLAYS):
+    return {v: {"duracion": 60} for v in ids}
+
+
+def plays_map(plays=PLAYS):
+    return {v: {"plays": n} for v, n in plays.items()}
+
+
+def armar(exclude=()):
+    sched = ChannelScheduler("1")
+    sched.rebuild(vista(), metadata(), plays_map(), exclude=exclude)
+    return sched
+
+
+def test_peek_sin_reservas_es_el_mejor_candidato():
+    assert armar().peek()[0] == "a"
+
+
+def test_el_reservado_de_adelante_sale_primero():
+    sched = armar()
+    assert sched.reservar(2) == ["a", "b"]
+    # aunque "c" pase a ser el mejor del heap, el reservado de adelante manda
+    sched.update("c", metadata(), plays_map({**PLAYS, "c": -1}))
+    assert sched.peek()[0] == "a"
+    sched.take("a")
+    assert sched.peek()[0] == "b"
+    assert sched.reservados() == ["b"]
+
+
+def test_reservar_completa_hasta_n_sin_repetir():
+    sched = armar()
+    sched.reservar(1)
+    sched.take("a")
+    assert sched.reservar(3) == ["b", "c", "d"]
+
+
+def test_update_de_un_reservado_conserva_su_lugar():
+    sched = armar()
+    sched.reservar(2)
+    # "a" se reprodujo mucho: su clave empeora, pero sigue primero en la cola
+    sched.update("a", metadata(), plays_map({**PLAYS, "a": 99}))
+    assert sched.reservados() == ["a", "b"]
+    assert sched.peek()[0] == "a"
+    # y no quedó duplicado en el heap
+    sched.take("a")
+    sched.take("b")
+    assert sched.peek()[0] == "c"
+    assert "a" not in sched
+
+
+def test_liberar_devuelve_los_reservados_al_heap():
+    sched = armar()
+    sched.reservar(2)
+    sched.liberar()
+    assert sched.reservados() == []
+    assert sched.peek()[0] == "a"
+    sched.take("a")
+    assert sched.peek()[0] == "b"
+
+
+def test_rebuild_limpia_las_reservas():
+    sched = armar()
+    sched.reservar(3)
+    sched.rebuild(vista(), metadata(), plays_map())
+    assert sched.reservados() == []
+    assert len(sched) == len(PLAYS)
+
+
+def test_rebuild_respeta_exclude():
+    sched = armar(exclude={"a", "b"})
+    assert sched.peek()[0] == "c"
+    assert "a" not in sched
+
+
+def test_canal_agotado_peek_none():
+    sched = armar()
+    for vid in PLAYS:
+        sched.take(vid)
+    assert sched.peek() is None
+    assert sched.reservar(2) == []
+
+
+def test_registry_peek_y_liberar_sin_crear_scheduler():
+    registry = SchedulerRegistry()
+    assert registry.peek_reservados("1") == []
+    sched = registry.get("1", vista(), metadata(), plays_map(), catalog_signature=0)
+    sched.reservar(2)
+    assert registry.peek_reservados("1") == ["a", "b"]
+    registry.liberar("1")
+    assert registry.peek_reservados("1") == []
+
+
+def test_registry_reconstruye_solo_si_cambia_la_firma():
+    registry = SchedulerRegistry()
+    view = vista()
+    sched = registry.get("1", view, metadata(), plays_map(), catalog_signature=0)
+    sched.reservar(1)
+    assert registry.get("1", view, metadata(), plays_map(), catalog_signature=0) is sched
+    assert sched.reservados() == ["a"]
+    registry.get("1", view, metadata(), plays_map(), catalog_signature=1)
+    assert sched.reservados() == []